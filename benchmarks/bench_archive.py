@@ -0,0 +1,79 @@
+"""Recording and querying a year of warning history for many sites.
+
+Run with: PYTHONPATH=. python benchmarks/bench_archive.py
+
+Every site is polled every ten minutes. A new warning phase begins every few hours, and about every tenth
+change only revises one (new chgid). Polls between changes repeat the previous warnings object.
+"""
+
+import json
+import random
+import statistics
+import time
+
+from custom_components.geosphere_at_warnings import geosphere, history
+
+SITES = 20
+POLLS_PER_SITE = 60 * 24 * 365 // 10
+POLL_INTERVAL = 600
+CHANGE_EVERY = 18
+REVISION_SHARE = 0.1
+QUERIES = 200
+YEAR_START = 1_735_689_600
+
+
+def polls(site: int) -> list[geosphere.GeosphereWarnings]:
+    rng = random.Random(site)
+    active: list[geosphere.GeosphereWarning] = []
+    warnings = geosphere.GeosphereWarnings([])
+    result = []
+    for poll in range(POLLS_PER_SITE):
+        now = YEAR_START + poll * POLL_INTERVAL
+        if poll % CHANGE_EVERY == 0:
+            active = [warning for warning in active if warning.end_ts > now]
+            if active and rng.random() < REVISION_SHARE:
+                revised = active.pop()
+                active.append(geosphere.GeosphereWarning(revised.type, revised.level, begin_ts=revised.begin_ts, end_ts=revised.end_ts + 3600, warnid=revised.warnid, chgid=revised.chgid + 1, verlaufid=revised.verlaufid))
+            else:
+                begin = now + rng.randrange(0, 86400)
+                active.append(geosphere.GeosphereWarning(geosphere.WarningType(rng.randint(1, 7)), geosphere.WarningLevel(rng.randint(1, 4)), begin_ts=begin, end_ts=begin + rng.randrange(3600, 3 * 86400), warnid=site * 1_000_000 + poll, chgid=1, verlaufid=1))
+            warnings = geosphere.GeosphereWarnings(list(active))
+        result.append(warnings)
+    return result
+
+
+def main() -> None:
+    sites = [polls(site) for site in range(SITES)]
+    archive = history.WarningArchive()
+
+    started = time.perf_counter()
+    for poll in range(POLLS_PER_SITE):
+        for site, site_polls in enumerate(sites):
+            archive.record(f"site {site}", site_polls[poll], area=90000 + site, seen_at=YEAR_START + poll * POLL_INTERVAL)
+    record_elapsed = time.perf_counter() - started
+    cycles = SITES * POLLS_PER_SITE
+    print(f"record   {cycles} poll cycles in {record_elapsed:.2f} s, {record_elapsed / cycles * 1e6:.2f} us per cycle, {len(archive)} rows")
+
+    rng = random.Random(0)
+    latencies = []
+    for _ in range(QUERIES):
+        start = YEAR_START + rng.randrange(0, 300) * 86400
+        began = time.perf_counter()
+        archive.query(f"site {rng.randrange(SITES)}", start=start, end=start + 30 * 86400, types=[geosphere.WarningType.THUNDERSTORM], min_level=geosphere.WarningLevel.RED)
+        latencies.append(time.perf_counter() - began)
+    print(f"query    one site, one month, type and level: median {statistics.median(latencies) * 1000:.3f} ms, max {max(latencies) * 1000:.3f} ms")
+
+    began = time.perf_counter()
+    year = archive.query(start=YEAR_START, end=YEAR_START + 365 * 86400, types=[geosphere.WarningType.THUNDERSTORM], min_level=geosphere.WarningLevel.RED)
+    print(f"query    all sites, whole year, type and level: {(time.perf_counter() - began) * 1000:.1f} ms, {len(year)} episodes")
+
+    began = time.perf_counter()
+    stored = json.dumps(archive.as_dict())
+    dumped = time.perf_counter() - began
+    began = time.perf_counter()
+    history.WarningArchive.from_dict(json.loads(stored))
+    print(f"persist  {len(stored) / 1024:.0f} KiB, dump {dumped * 1000:.1f} ms, load {(time.perf_counter() - began) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Recorder payload of the binary sensor attributes with warning texts inline versus referenced by id.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_attributes.py
+
+Every state write stores the attributes again, so their serialized size multiplies with sites and writes.
+"""
+
+import json
+
+import geosphere
+import payloads
+
+SITES = 300
+WRITES_PER_DAY = 24
+SCALE = payloads.Scale(warnings=5, vertices=20, text_size=2_000)
+
+
+def attributes(warning: geosphere.GeosphereWarning, *, inline: bool) -> dict:
+    base = {"attribution": "Data by Geosphere Austria", "id": "0123456789abcdef0123456789abcdef", "integration": "geosphere_at_warnings", "stale": False, "eventType": warning.type.name, "eventLevel": warning.level.name}
+    if inline:
+        return {**base, "text": warning.text, "effects": warning.effects, "recommendations": warning.recommendations}
+    return {**base, "textId": warning.text_id, "effectsId": warning.effects_id, "recommendationsId": warning.recommendations_id}
+
+
+def main() -> None:
+    highest = [max(geosphere._parse_data(payloads.feature(90000 + site, SCALE, seed=site)), key=lambda x: x.level) for site in range(SITES)]
+    for inline in (True, False):
+        size = sum(len(json.dumps(attributes(warning, inline=inline))) for warning in highest)
+        label = "texts inline" if inline else "text ids"
+        print(f"{label:<14} {size / SITES:>8.0f} B per write  {size * WRITES_PER_DAY / 1024 / 1024:>8.2f} MiB per day for {SITES} sites")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Refresh latency of many entries against a local stand-in server that adds connection and request latency.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_connection.py
+
+The server delays the first request on every new connection (standing in for TCP and TLS handshakes) and
+every request (round trip), and compresses responses when asked to. Compared are a session opening a fresh
+connection per request without limits, and the tuned session from geosphere.create_session with the hub's
+concurrency limit, with and without jittered starts.
+"""
+
+import asyncio
+import datetime
+import json
+import statistics
+import time
+from unittest.mock import patch
+
+import aiohttp
+import geosphere
+import payloads
+from aiohttp import web
+
+ENTRIES = 40
+ROUNDS = 5
+HANDSHAKE_LATENCY = 0.06
+REQUEST_LATENCY = 0.02
+JITTER = datetime.timedelta(seconds=0.5)
+SCALE = payloads.Scale(warnings=5, vertices=500, text_size=1_000)
+
+
+class StandIn:
+    def __init__(self) -> None:
+        self.bodies = {index: json.dumps(payloads.feature(90000 + index, SCALE, seed=index)).encode() for index in range(ENTRIES)}
+        self.connections: set[int] = set()
+        self.active = 0
+        self.peak = 0
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if id(request.transport) not in self.connections:
+                self.connections.add(id(request.transport))
+                await asyncio.sleep(HANDSHAKE_LATENCY)
+            await asyncio.sleep(REQUEST_LATENCY)
+            response = web.Response(body=self.bodies[round((float(request.query["lat"]) - 47) * 100)], content_type="application/json")
+            response.enable_compression()
+            return response
+        finally:
+            self.active -= 1
+
+
+async def scenario(stand_in: StandIn, session: aiohttp.ClientSession, max_concurrency: int, start_jitter: datetime.timedelta) -> dict[str, float]:
+    hub = geosphere.Hub(session, max_age=datetime.timedelta(0), max_concurrency=max_concurrency, start_jitter=start_jitter)
+    clients = [geosphere.Client(geosphere.ClientConfig(geosphere.Location(47 + index / 100, 10.0), datetime.timedelta(0)), hub) for index in range(ENTRIES)]
+    stand_in.connections.clear()
+    stand_in.peak = 0
+
+    latencies = []
+
+    async def refresh(client: geosphere.Client) -> None:
+        started = time.perf_counter()
+        await client.async_get_data()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await asyncio.gather(*(refresh(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    await session.close()
+
+    quantiles = statistics.quantiles(latencies, n=20)
+    return {
+        "p50_ms": quantiles[9] * 1000,
+        "p95_ms": quantiles[18] * 1000,
+        "total_s": elapsed,
+        "connections": len(stand_in.connections),
+        "peak_concurrency": stand_in.peak,
+    }
+
+
+async def main() -> None:
+    stand_in = StandIn()
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", stand_in.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    scenarios = {
+        "fresh connection, unbounded": lambda: scenario(stand_in, aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True, limit=0)), ENTRIES, datetime.timedelta(0)),
+        "pooled, bounded": lambda: scenario(stand_in, geosphere.create_session(), geosphere.MAX_CONCURRENT_REQUESTS, datetime.timedelta(0)),
+        "pooled, bounded, jittered": lambda: scenario(stand_in, geosphere.create_session(), geosphere.MAX_CONCURRENT_REQUESTS, JITTER),
+    }
+    try:
+        with patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{port}"):
+            print(f"{ENTRIES} entries x {ROUNDS} rounds, handshake {HANDSHAKE_LATENCY * 1000:.0f} ms, request {REQUEST_LATENCY * 1000:.0f} ms")
+            for name, run in scenarios.items():
+                result = await run()
+                print(f"{name:<28} " + "  ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}" for key, value in result.items()))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
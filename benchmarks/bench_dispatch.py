@@ -0,0 +1,71 @@
+"""Coalescing the escalations of a storm front crossing thousands of sites.
+
+Run with: PYTHONPATH=. python benchmarks/bench_dispatch.py
+
+Fronts of growing size cross Austria from west to east within FRONT_SECONDS. Every site gets an orange
+warning that escalates to red, some a violet thunderstorm warning too. The dispatcher is flushed after every
+transition as the coordinator would, and the batches that reach the event bus are counted.
+"""
+
+import itertools
+import operator
+import random
+import statistics
+import time
+
+from custom_components.geosphere_at_warnings import escalations, geosphere
+
+SITES = (1_000, 10_000, 50_000)
+DISTRICTS = 94
+FRONT_SECONDS = 600
+ESCALATION_DELAY = 120
+BEGIN = 1_750_000_000
+VIOLET_SHARE = 0.2
+
+
+def front(sites: int) -> list[tuple[float, str, int, list[geosphere.WarningEvent]]]:
+    rng = random.Random(sites)
+    transitions = []
+    for site in range(sites):
+        district = site % DISTRICTS
+        area = (district % 9 + 1) * 10_000 + (district // 9 + 1) * 100 + rng.randrange(1, 30)
+        seen = district / DISTRICTS * FRONT_SECONDS + rng.uniform(0, 30)
+        type_ = geosphere.WarningType(rng.choice((1, 2, 5)))
+        orange = geosphere.GeosphereWarning(type_, geosphere.WarningLevel.ORANGE, begin_ts=BEGIN, end_ts=BEGIN + 86400, warnid=site, chgid=1, verlaufid=1)
+        red = geosphere.GeosphereWarning(type_, geosphere.WarningLevel.RED, begin_ts=BEGIN, end_ts=BEGIN + 86400, warnid=site, chgid=2, verlaufid=1)
+        transitions.extend(
+            (
+                (seen, f"site {site}", area, [geosphere.WarningEvent(geosphere.WarningChange.ADDED, orange)]),
+                (seen + rng.uniform(0, ESCALATION_DELAY), f"site {site}", area, [geosphere.WarningEvent(geosphere.WarningChange.ESCALATED, red, orange)]),
+            ),
+        )
+        if rng.random() < VIOLET_SHARE:
+            violet = geosphere.GeosphereWarning(geosphere.WarningType.THUNDERSTORM, geosphere.WarningLevel.VIOLET, begin_ts=BEGIN, end_ts=BEGIN + 7200, warnid=sites + site, chgid=1, verlaufid=1)
+            transitions.append((seen + rng.uniform(0, 60), f"site {site}", area, [geosphere.WarningEvent(geosphere.WarningChange.ADDED, violet)]))
+    transitions.sort(key=operator.itemgetter(0))
+    return transitions
+
+
+def main() -> None:
+    for sites, grouping in itertools.product(SITES, (escalations.AreaGrouping.STATE, escalations.AreaGrouping.DISTRICT)):
+        transitions = front(sites)
+        batches: list[escalations.EscalationBatch] = []
+        dispatcher = escalations.EscalationDispatcher(batches.append, grouping=grouping, clock=lambda: 0.0)
+
+        started = time.perf_counter()
+        for seen, site, area, events in transitions:
+            dispatcher.add(site, area, events, now=seen)
+            dispatcher.flush(now=seen)
+        while (due := dispatcher.next_due()) is not None:
+            dispatcher.flush(now=due)
+        elapsed = time.perf_counter() - started
+
+        delays = [batch.emitted_at - batch.opened_at for batch in batches]
+        violet = [batch.emitted_at - batch.opened_at for batch in batches if batch.level == geosphere.WarningLevel.VIOLET]
+        print(
+            f"{sites:>6} sites {len(transitions):>6} transitions by {grouping.name.lower():<8}: {elapsed * 1000:.0f} ms, {elapsed / len(transitions) * 1e6:.1f} us per transition, {len(batches)} batches ({dispatcher.stats.counters['escalations.moved']} moved), delay median {statistics.median(delays):.0f} s max {max(delays):.0f} s, violet max {max(violet):.0f} s",
+        )
+
+
+if __name__ == "__main__":
+    main()
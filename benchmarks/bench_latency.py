@@ -0,0 +1,125 @@
+"""Tail latencies the tests only check by counts: hedged requests, concurrent bulk fetches and pushed warnings.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_latency.py
+
+Against a local stand-in server that answers every request after REQUEST_LATENCY and every SLOW_EVERY-th
+after SLOW_LATENCY, measured are refreshes without and with hedging, get_warnings_many over LOCATIONS at
+several concurrency limits, and the time from posting a warning to a relay until the client serves it.
+"""
+
+import asyncio
+import datetime
+import json
+import statistics
+import time
+from unittest.mock import patch
+
+import aiohttp
+import geosphere
+import payloads
+from aiohttp import web
+
+LOCATIONS = 40
+ROUNDS = 200
+REQUEST_LATENCY = 0.005
+SLOW_LATENCY = 0.5
+SLOW_EVERY = 20
+HEDGE_DELAY = 0.05
+SCALE = payloads.Scale(warnings=5, vertices=500, text_size=1_000)
+
+
+class StandIn:
+    def __init__(self) -> None:
+        self.bodies = {index: json.dumps(payloads.feature(90000 + index, SCALE, seed=index)).encode() for index in range(LOCATIONS)}
+        self.requests = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        await asyncio.sleep(SLOW_LATENCY if self.requests % SLOW_EVERY == 0 else REQUEST_LATENCY)
+        return web.Response(body=self.bodies[round((float(request.query["lat"]) - 47) * 100)], content_type="application/json")
+
+
+def location(index: int) -> geosphere.Location:
+    return geosphere.Location(47 + index / 100, 10.0)
+
+
+def quantiles(latencies: list[float]) -> str:
+    cuts = statistics.quantiles(latencies, n=100)
+    return f"p50 {cuts[49] * 1000:.1f} ms  p99 {cuts[98] * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms"
+
+
+async def bench_hedging(hedge_delay: float | None) -> str:
+    async with aiohttp.ClientSession() as session:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0), retry_policy=geosphere.RetryPolicy(hedge_delay=hedge_delay))
+        client = geosphere.Client(geosphere.ClientConfig(location(0), datetime.timedelta(0)), hub)
+        latencies = []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            await client.async_get_data()
+            latencies.append(time.perf_counter() - started)
+        return f"{quantiles(latencies)}  hedged {hub.stats.counters['fetch.hedged']}"
+
+
+def bench_many(max_concurrency: int) -> str:
+    locations = [location(index) for index in range(LOCATIONS)]
+    started = time.perf_counter()
+    results = geosphere.get_warnings_many(locations, max_concurrency=max_concurrency, retry_policy=geosphere.RetryPolicy(hedge_delay=None))
+    elapsed = time.perf_counter() - started
+    return f"{elapsed * 1000:.0f} ms for {sum(warnings is not None for warnings in results.values())} locations"
+
+
+async def bench_push() -> str:
+    hub = geosphere.Hub(max_age=datetime.timedelta(hours=1))
+    client = geosphere.Client(geosphere.ClientConfig(location(0), datetime.timedelta(0)), hub)
+    await client.async_get_data()
+
+    async def ingest(request: web.Request) -> web.Response:
+        return web.json_response({"areas": sorted(hub.ingest(await request.json()))})
+
+    app = web.Application()
+    app.router.add_post("/ingest", ingest)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/ingest"
+    feature = payloads.feature(90000, SCALE, seed=0)
+    latencies = []
+    try:
+        async with aiohttp.ClientSession() as publisher:
+            for round_ in range(ROUNDS):
+                feature["properties"]["warnings"][0]["properties"]["chgid"] = round_ + 1
+                started = time.perf_counter()
+                async with publisher.post(url, json=feature) as response:
+                    await response.read()
+                await client.async_get_data()
+                latencies.append(time.perf_counter() - started)
+    finally:
+        await runner.cleanup()
+        await hub.async_close()
+    return f"{quantiles(latencies)}  upstream requests {hub.stats.counters['fetch.ok']}"
+
+
+async def main() -> None:
+    stand_in = StandIn()
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", stand_in.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    port = runner.addresses[0][1]
+
+    try:
+        with patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{port}"):
+            print(f"request {REQUEST_LATENCY * 1000:.0f} ms, every {SLOW_EVERY}th {SLOW_LATENCY * 1000:.0f} ms")
+            print(f"{'refresh, no hedging':<32} {await bench_hedging(None)}")
+            print(f"{'refresh, hedged':<32} {await bench_hedging(HEDGE_DELAY)}")
+            for max_concurrency in (1, geosphere.MAX_CONCURRENT_REQUESTS, LOCATIONS):
+                # the blocking wrapper runs its own event loop, so it is called off this one
+                print(f"{f'get_warnings_many, {max_concurrency} at once':<32} {await asyncio.to_thread(bench_many, max_concurrency)}")
+            print(f"{'push to served':<32} {await bench_push()}")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
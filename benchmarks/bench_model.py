@@ -0,0 +1,79 @@
+"""Memory and comparison cost of parsed warnings, compared with the former plain dataclass model.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_model.py
+"""
+
+import datetime
+import json
+import operator
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+import geosphere
+import payloads
+
+AREAS = 300
+SCALE = payloads.Scale(warnings=10, vertices=20, text_size=2_000)
+
+
+@dataclass
+class DataclassWarning:
+    type: geosphere.WarningType
+    level: geosphere.WarningLevel
+    begin: datetime.datetime
+    end: datetime.datetime
+    text: str | None = None
+    effects: str | None = None
+    recommendations: str | None = None
+
+
+def parse_dataclass(data: dict) -> list[DataclassWarning]:
+    warnings = []
+    for x in data["properties"]["warnings"]:
+        properties = x["properties"]
+        warnings.append(
+            DataclassWarning(
+                type=geosphere.WarningType(properties["rawinfo"]["wtype"]),
+                level=geosphere.WarningLevel(properties["rawinfo"]["wlevel"]),
+                begin=datetime.datetime.fromtimestamp(int(properties["rawinfo"]["start"]), tz=datetime.UTC),
+                end=datetime.datetime.fromtimestamp(int(properties["rawinfo"]["end"]), tz=datetime.UTC),
+                text=properties.get("text"),
+                effects=properties.get("auswirkungen"),
+                recommendations=properties.get("empfehlungen"),
+            ),
+        )
+    return warnings
+
+
+def retained(parse: object, bodies: list[bytes]) -> tuple[list, int]:
+    tracemalloc.start()
+    # every area decodes its own copy of the (identical) texts, as after separate responses
+    parsed = [parse(json.loads(body)) for body in bodies]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return parsed, size
+
+
+def compare_time(first: list, second: list, begin: str) -> float:
+    key = operator.attrgetter(begin, "level")
+    started = time.perf_counter()
+    for _ in range(20):
+        sorted(first, key=key)
+        assert first == second
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    bodies = [json.dumps(payloads.feature(10_000 + i, SCALE, seed=i)).encode() for i in range(AREAS)]
+    count = AREAS * SCALE.warnings
+
+    for name, parse, begin in (("dataclass", parse_dataclass, "begin"), ("slotted", geosphere._parse_data, "begin_ts")):
+        first, size = retained(parse, bodies)
+        second, _ = retained(parse, bodies)
+        duration = compare_time([w for ws in first for w in ws], [w for ws in second for w in ws], begin)
+        print(f"{name:>9}: {size / count:>8.0f} bytes/warning retained, sort+compare {duration * 1000:.1f} ms for {count} warnings")
+
+
+if __name__ == "__main__":
+    main()
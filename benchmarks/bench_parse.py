@@ -0,0 +1,60 @@
+"""Compare json.loads + _parse_data with the streaming, geometry-skipping parser.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_parse.py
+"""
+
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import geosphere
+import payloads
+
+CHUNK_SIZE = 64 * 1024
+SCALES = [
+    payloads.Scale(warnings=7, vertices=20, text_size=500),
+    payloads.Scale(warnings=7, vertices=50_000, text_size=500),
+    payloads.Scale(warnings=50, vertices=200_000, text_size=2_000),
+    payloads.Scale(warnings=500, vertices=500_000, text_size=4_000),
+]
+
+
+def parse_json(body: bytes) -> list[geosphere.GeosphereWarning]:
+    return geosphere._parse_data(json.loads(body))
+
+
+def parse_stream(body: bytes) -> list[geosphere.GeosphereWarning]:
+    parser = geosphere._FeatureStreamParser()
+    for start in range(0, len(body), CHUNK_SIZE):
+        parser.feed(body[start : start + CHUNK_SIZE])
+    parser.close()
+    return parser.features[0].warnings
+
+
+def measure(function: Callable[[bytes], list], body: bytes, repeat: int = 5) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(body)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    function(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    print(f"{'warnings':>8} {'vertices':>8} {'text':>6} {'size':>9} | {'json ms':>8} {'json peak':>10} | {'stream ms':>9} {'stream peak':>11}")
+    for scale in SCALES:
+        body = json.dumps(payloads.feature(91901, scale)).encode()
+        assert parse_json(body) == parse_stream(body)
+        json_time, json_peak = measure(parse_json, body)
+        stream_time, stream_peak = measure(parse_stream, body)
+        print(f"{scale.warnings:>8} {scale.vertices:>8} {scale.text_size:>6} {len(body) / 1024:>7.0f}KB | {json_time * 1000:>8.1f} {json_peak / 1024:>8.0f}KB | {stream_time * 1000:>9.1f} {stream_peak / 1024:>9.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
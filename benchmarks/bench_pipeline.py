@@ -0,0 +1,139 @@
+"""Fetch/parse/evaluate pipeline benchmarks at several payload scales, compared against a stored baseline.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_pipeline.py [--save-baseline]
+
+Every case reports the best time per call in microseconds. Without --save-baseline the results are compared
+with benchmarks/baseline.json and the run fails when a case got slower than the tolerated ratio.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from unittest.mock import patch
+
+import aiohttp
+import geosphere
+import payloads
+from aiohttp import web
+
+BASELINE = Path(__file__).with_name("baseline.json")
+TOLERATED_RATIO = 1.25
+MIN_DURATION = 0.2
+REPEAT = 5
+MAX_NUMBER = 1_000_000
+ADVANCE = datetime.timedelta(hours=6)
+NOW = payloads.START + 3 * 24 * 3600
+SCALES = {
+    "small": payloads.Scale(warnings=7, vertices=20, text_size=200),
+    "texts": payloads.Scale(warnings=7, vertices=20, text_size=5_000),
+    "warnings": payloads.Scale(warnings=1_000, vertices=20, text_size=200),
+    "polygon": payloads.Scale(warnings=7, vertices=100_000, text_size=200),
+}
+
+
+def best_of(function: Callable[[], object]) -> float:
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - started >= MIN_DURATION or number >= MAX_NUMBER:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings)
+
+
+async def async_best_of(function: Callable[[], Awaitable[object]], number: int = 20) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        for _ in range(number):
+            await function()
+        timings.append((time.perf_counter() - started) / number)
+    return min(timings)
+
+
+def parse_stream(body: bytes) -> list[geosphere.GeosphereWarning]:
+    parser = geosphere._FeatureStreamParser()
+    for start in range(0, len(body), geosphere.STREAM_CHUNK_SIZE):
+        parser.feed(body[start : start + geosphere.STREAM_CHUNK_SIZE])
+    parser.close()
+    return parser.features[0].warnings
+
+
+async def bench_client(body: bytes) -> float:
+    async def handler(_: web.Request) -> web.Response:  # noqa: RUF029
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+            client = geosphere.Client(geosphere.ClientConfig(geosphere.Location(48.25, 16.35), ADVANCE), hub)
+            with patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{port}"):
+                return await async_best_of(client.async_get_data)
+    finally:
+        await runner.cleanup()
+
+
+def run() -> dict[str, float]:
+    results = {}
+    for name, scale in SCALES.items():
+        body = json.dumps(payloads.feature(91901, scale)).encode()
+        data = json.loads(body)
+        warnings = geosphere._parse_data(data)
+        indexed = geosphere.GeosphereWarnings(warnings=warnings)
+
+        results[f"{name}/parse_json"] = best_of(lambda body=body: geosphere._parse_data(json.loads(body)))
+        results[f"{name}/parse_stream"] = best_of(lambda body=body: parse_stream(body))
+        results[f"{name}/get_relevant_cold"] = best_of(lambda warnings=warnings: geosphere.GeosphereWarnings(warnings=warnings).get_relevant(ADVANCE, now=NOW))
+        results[f"{name}/get_relevant_warm"] = best_of(lambda indexed=indexed: indexed.get_relevant(ADVANCE, now=NOW))
+        results[f"{name}/client"] = asyncio.run(bench_client(body))
+    return {case: round(seconds * 1_000_000, 3) for case, seconds in results.items()}
+
+
+def main() -> int:
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument("--save-baseline", action="store_true")
+    save_baseline = arguments.parse_args().save_baseline
+
+    results = run()
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    regressions = []
+    for case, microseconds in results.items():
+        reference = baseline.get(case)
+        ratio = microseconds / reference if reference else None
+        if ratio is not None and ratio > TOLERATED_RATIO:
+            regressions.append(case)
+        print(f"{case:<32} {microseconds:>14.3f} us" + (f"  x{ratio:.2f}" if ratio is not None else ""))
+
+    if save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2) + "\n")
+        return 0
+    if regressions:
+        print(f"Slower than baseline by more than x{TOLERATED_RATIO}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Warnings within a radius for thousands of points against hundreds of warned municipalities.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_proximity.py
+
+The vectorized geosphere.nearby_warnings is compared against a naive per point, per edge Python loop on a
+sample of the points, whose results it has to match.
+"""
+
+import math
+import random
+import time
+
+import geosphere
+import payloads
+
+POINTS = 5_000
+AREAS = 400
+SCALE = payloads.Scale(warnings=2, vertices=200, text_size=100)
+RADIUS = 10_000
+SAMPLE = 50
+NOW = payloads.START
+
+
+def reference(location: geosphere.Location, areas: dict[int, geosphere.GeosphereWarnings], index: geosphere.AreaIndex) -> dict[int, float]:
+    x, y = index.projection.project(location)
+    distances = {}
+    for area in areas:
+        rings = index.rings(area)
+        if sum(geosphere._ring_contains(ring, x, y) for ring in rings) % 2 == 1:
+            distances[area] = 0.0
+            continue
+        best = math.inf
+        for ring in rings:
+            for (a_x, a_y), (b_x, b_y) in zip(ring, ring[1:] + ring[:1], strict=True):
+                d_x, d_y = b_x - a_x, b_y - a_y
+                t = max(0.0, min(1.0, ((x - a_x) * d_x + (y - a_y) * d_y) / (d_x * d_x + d_y * d_y or 1.0)))
+                best = min(best, math.hypot(a_x + t * d_x - x, a_y + t * d_y - y))
+        distances[area] = best
+    return {area: distance for area, distance in distances.items() if distance <= RADIUS}
+
+
+def main() -> None:
+    index = geosphere.AreaIndex()
+    areas = {}
+    for feature in payloads.snapshot(AREAS, SCALE)["features"]:
+        area = feature["properties"]["location"]["properties"]["gemeindenr"]
+        index.add(area, feature["geometry"])
+        areas[area] = geosphere.GeosphereWarnings(geosphere._parse_data(feature))
+    # the warned grid spans roughly 46.3 to 47.6 N and 10.2 to 12 E
+    rng = random.Random(0)
+    locations = [geosphere.Location(rng.uniform(46.3, 47.6), rng.uniform(10.2, 12.0)) for _ in range(POINTS)]
+    # every warning has to last beyond NOW for the comparison below
+    areas = {area: geosphere.GeosphereWarnings([warning for warning in warnings.warnings if warning.end_ts > NOW]) for area, warnings in areas.items()}
+    areas = {area: warnings for area, warnings in areas.items() if warnings.has_warnings()}
+    edges = sum(len(ring) for area in areas for ring in index.rings(area))
+
+    started = time.perf_counter()
+    nearby = geosphere.nearby_warnings(locations, areas, index, RADIUS, now=NOW)
+    vectorized = time.perf_counter() - started
+    with_warnings = sum(proximity.highest is not None for proximity in nearby.values())
+    print(f"vectorized  {POINTS} points x {len(areas)} areas ({edges} edges): {vectorized * 1000:.0f} ms, {with_warnings} points with warnings within {RADIUS / 1000:.0f} km")
+
+    started = time.perf_counter()
+    for location in locations[:SAMPLE]:
+        expected = reference(location, areas, index)
+        assert expected.keys() == nearby[location].distances.keys()
+        assert all(math.isclose(distance, nearby[location].distances[area], abs_tol=1e-6) for area, distance in expected.items())
+    per_point = (time.perf_counter() - started) / SAMPLE
+    print(f"python loop {SAMPLE} sample points: {per_point * 1000:.1f} ms per point, {per_point * POINTS:.1f} s extrapolated, {per_point * POINTS / vectorized:.0f}x slower")
+
+
+if __name__ == "__main__":
+    main()
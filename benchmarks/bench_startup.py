@@ -0,0 +1,98 @@
+"""Import and setup cost of the integration, checked against per-entry targets.
+
+Run with: PYTHONPATH=custom_components/geosphere_at_warnings:benchmarks python benchmarks/bench_startup.py
+
+Import time is measured in fresh interpreters with aiohttp already loaded, as it is in Home Assistant.
+Setup time covers adding config entries to a bare Home Assistant instance until they are loaded,
+while the stand-in GeoSphere server takes longer to answer than the whole run, so any setup waiting
+for the network would show up immediately.
+"""
+
+import asyncio
+import inspect
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from unittest.mock import patch
+
+from aiohttp import web
+from homeassistant import bootstrap, config_entries, loader
+from homeassistant.core import HomeAssistant
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from custom_components.geosphere_at_warnings import geosphere  # noqa: E402
+
+IMPORT_RUNS = 5
+IMPORT_TARGET = 0.05
+ENTRIES = 50
+SETUP_TARGET_PER_ENTRY = 0.02
+NETWORK_DELAY = 30
+
+
+def import_time() -> tuple[float, bool]:
+    code = "import sys, time, aiohttp; started = time.perf_counter(); import geosphere; print(time.perf_counter() - started, 'requests' in sys.modules)"
+    runs = []
+    for _ in range(IMPORT_RUNS):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True).stdout.split()  # noqa: S603
+        runs.append((float(output[0]), output[1] == "True"))
+    return statistics.median(seconds for seconds, _ in runs), any(imported for _, imported in runs)
+
+
+def config_entry(index: int) -> config_entries.ConfigEntry:
+    location = {"id": uuid.uuid4().hex, "name": f"site {index}", "latitude": 47 + index / 100, "longitude": 13.0, "advanced_warning_time_minutes": 0}
+    arguments = {"version": 2, "minor_version": 1, "domain": "geosphere_at_warnings", "title": f"site {index}", "data": {"locations": [location]}, "source": config_entries.SOURCE_USER}
+    # newer Home Assistant versions added required arguments, their empty defaults suffice here
+    for name, parameter in inspect.signature(config_entries.ConfigEntry).parameters.items():
+        if parameter.kind is parameter.KEYWORD_ONLY and parameter.default is parameter.empty and name not in arguments:
+            arguments[name] = {} if "data" in name or "keys" in name else None
+    return config_entries.ConfigEntry(**arguments)
+
+
+async def setup_time() -> float:
+    async def slow(_: web.Request) -> web.Response:
+        await asyncio.sleep(NETWORK_DELAY)
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", slow)
+    runner = web.AppRunner(app, shutdown_timeout=0)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+
+    with tempfile.TemporaryDirectory() as config_dir, patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{runner.addresses[0][1]}"):
+        (Path(config_dir) / "custom_components").symlink_to(ROOT / "custom_components")
+        hass = HomeAssistant(config_dir)
+        loader.async_setup(hass)
+        hass.config_entries = config_entries.ConfigEntries(hass, {})
+        await bootstrap.async_load_base_functionality(hass)
+
+        started = time.perf_counter()
+        for index in range(ENTRIES):
+            await hass.config_entries.async_add(config_entry(index))
+        elapsed = time.perf_counter() - started
+
+        loaded = sum(entry.state is config_entries.ConfigEntryState.LOADED for entry in hass.config_entries.async_entries("geosphere_at_warnings"))
+        assert loaded == ENTRIES, f"only {loaded} of {ENTRIES} entries loaded"
+        await hass.async_stop(force=True)
+    await runner.cleanup()
+    return elapsed
+
+
+def main() -> int:
+    seconds, imports_requests = import_time()
+    print(f"import geosphere      {seconds * 1000:8.1f} ms (target {IMPORT_TARGET * 1000:.0f} ms), imports requests: {imports_requests}")
+
+    elapsed = asyncio.run(setup_time())
+    print(f"setup {ENTRIES} entries      {elapsed * 1000:8.1f} ms, {elapsed / ENTRIES * 1000:.1f} ms per entry (target {SETUP_TARGET_PER_ENTRY * 1000:.0f} ms), network answers after {NETWORK_DELAY} s")
+
+    return int(seconds > IMPORT_TARGET or imports_requests or elapsed / ENTRIES > SETUP_TARGET_PER_ENTRY)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
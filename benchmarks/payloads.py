@@ -0,0 +1,59 @@
+"""Synthetic getWarningsForCoords payloads for the benchmarks."""
+
+import math
+import random
+from typing import NamedTuple
+
+
+class Scale(NamedTuple):
+    warnings: int
+    vertices: int
+    text_size: int
+
+
+TEXT = "* Meiden Sie direktes Sonnenlicht! Achten Sie darauf, dass Kinder vor der Sonne geschützt sind!\n"
+START = 1750888800
+
+
+def warning(warnid: int, text_size: int, rng: random.Random) -> dict:
+    start = START + rng.randrange(0, 7 * 24) * 3600
+    text = (TEXT * (text_size // len(TEXT) + 1))[:text_size]
+    return {
+        "type": "Warning",
+        "properties": {
+            "warnid": warnid,
+            "chgid": rng.randrange(1_000_000),
+            "verlaufid": rng.randrange(100),
+            "warntypid": rng.randint(1, 7),
+            "text": text,
+            "auswirkungen": text,
+            "empfehlungen": text,
+            "meteotext": None,
+            "rawinfo": {"wtype": rng.randint(1, 7), "wlevel": rng.randint(1, 4), "start": str(start), "end": str(start + rng.randrange(1, 48) * 3600)},
+        },
+    }
+
+
+def polygon(center_x: float, center_y: float, vertices: int, radius: float = 3_000) -> list[list[list[list[int]]]]:
+    ring = [[round(center_x + radius * math.cos(2 * math.pi * i / vertices)), round(center_y + radius * math.sin(2 * math.pi * i / vertices))] for i in range(vertices)]
+    return [[[*ring, ring[0]]]]
+
+
+def feature(gemeindenr: int, scale: Scale, seed: int = 0, center: tuple[float, float] = (622_000, 488_000)) -> dict:
+    rng = random.Random(seed)
+    return {
+        "type": "Feature",
+        "geometry": {"type": "MultiPolygon", "coordinates": polygon(*center, scale.vertices)},
+        "properties": {
+            "location": {"type": "Municipal", "properties": {"gemeindenr": gemeindenr, "name": f"Gemeinde {gemeindenr}", "urlname": f"gemeinde_{gemeindenr}"}},
+            "warnings": [warning(i, scale.text_size, rng) for i in range(scale.warnings)],
+        },
+    }
+
+
+def snapshot(areas: int, scale: Scale) -> dict:
+    side = math.ceil(math.sqrt(areas))
+    return {
+        "type": "FeatureCollection",
+        "features": [feature(10_000 + i, scale, seed=i, center=(120_000 + 7_000 * (i % side), 300_000 + 7_000 * (i // side))) for i in range(areas)],
+    }
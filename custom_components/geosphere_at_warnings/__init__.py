@@ -2,38 +2,298 @@
 
 from __future__ import annotations
 
+import asyncio
+import datetime
 import logging
+import operator
+from http import HTTPStatus
+from typing import TYPE_CHECKING
 
+import voluptuous as vol
+from aiohttp import web
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE, Platform
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.helpers import config_validation
+from homeassistant.helpers.storage import Store
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
 
-from . import const, geosphere
+from . import const, coordinator, geosphere, history
+
+if TYPE_CHECKING:
+    from homeassistant.core import Event
+    from homeassistant.helpers.typing import ConfigType
 
 logger = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.SENSOR]
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR]
+
+CONFIG_SCHEMA = config_validation.config_entry_only_config_schema(const.DOMAIN)
+GET_TEXTS_SCHEMA = vol.Schema({vol.Required(const.ATTR_TEXT_IDS): vol.All(config_validation.ensure_list, [config_validation.string])})
+GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(const.ATTR_LOCATION_ID): config_validation.string,
+        vol.Optional(const.ATTR_START): config_validation.datetime,
+        vol.Optional(const.ATTR_END): config_validation.datetime,
+        vol.Optional(const.ATTR_TYPES): vol.All(config_validation.ensure_list, [vol.All(vol.Upper, vol.In(geosphere.WarningType.__members__))]),
+        vol.Optional(const.ATTR_MIN_LEVEL): vol.All(vol.Upper, vol.In(geosphere.WarningLevel.__members__)),
+    },
+)
+GET_NEARBY_WARNINGS_SCHEMA = vol.Schema(
+    {
+        vol.Required(const.ATTR_RADIUS): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(const.ATTR_POINTS): [vol.Schema({vol.Required(const.CONF_LATITUDE): config_validation.latitude, vol.Required(const.CONF_LONGITUDE): config_validation.longitude})],
+    },
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:  # noqa: ARG001, RUF029
+    async def async_get_texts(call: ServiceCall) -> ServiceResponse:  # noqa: RUF029
+        text_ids = call.data[const.ATTR_TEXT_IDS]
+        if any(geosphere.get_text(text_id) is None for text_id in text_ids):
+            for coordinator_ in hass.data.get(const.DOMAIN, {}).values():
+                for location in (coordinator_.data or {}).values():
+                    # entities reference the texts in their location's language, see coordinator.texts
+                    geosphere.register_texts(location["warnings"], location.get("texts", {}).values())
+        return {"texts": {text_id: geosphere.get_text(text_id) for text_id in text_ids}}
+
+    async def async_get_history(call: ServiceCall) -> ServiceResponse:
+        archive: history.WarningArchive = await _async_get_archive(hass)
+        start, end = call.data.get(const.ATTR_START), call.data.get(const.ATTR_END)
+        episodes = archive.query(
+            call.data.get(const.ATTR_LOCATION_ID),
+            start=dt_util.as_utc(start).timestamp() if start is not None else None,
+            end=dt_util.as_utc(end).timestamp() if end is not None else None,
+            types=[geosphere.WarningType[type_] for type_ in call.data[const.ATTR_TYPES]] if const.ATTR_TYPES in call.data else None,
+            min_level=geosphere.WarningLevel[call.data[const.ATTR_MIN_LEVEL]] if const.ATTR_MIN_LEVEL in call.data else None,
+        )
+        return {
+            "warnings": [
+                {
+                    "location_id": episode.site,
+                    "warnid": episode.warnid,
+                    "verlaufid": episode.verlaufid,
+                    "type": episode.type.name,
+                    "level": episode.level.name,
+                    "begin": dt_util.utc_from_timestamp(episode.begin_ts).isoformat(),
+                    "end": dt_util.utc_from_timestamp(episode.end_ts).isoformat(),
+                    "area": episode.area,
+                    "chgids": list(episode.chgids),
+                    "first_seen": dt_util.utc_from_timestamp(episode.first_seen).isoformat(),
+                    "last_changed": dt_util.utc_from_timestamp(episode.last_changed).isoformat(),
+                }
+                for episode in episodes
+            ],
+        }
+
+    async def async_get_nearby_warnings(call: ServiceCall) -> ServiceResponse:
+        if const.DOMAIN_DATA not in hass.data:
+            return {"complete": False, "locations": []}
+        hub: geosphere.Hub = await hass.data[const.DOMAIN_DATA]
+        points = _service_points(hass, call)
+        # without a snapshot only fetched municipalities are known, so those of the points are fetched if they are not yet;
+        # neighbouring ones are covered once fetched for another location, which complete reports
+        if missing := [location for _, location in points if hub.get_cached(location) is None]:
+            await hub.async_get_warnings_many(missing)
+        # NumPy work over all points and warned areas, kept off the event loop
+        nearby = await hass.async_add_executor_job(geosphere.nearby_warnings, [location for _, location in points], hub.warned_areas(), hub.index, call.data[const.ATTR_RADIUS] * 1000)
+        return {
+            "complete": hub.covers_all_areas,
+            "locations": [
+                {
+                    "location_id": location_id,
+                    "latitude": location.latitude,
+                    "longitude": location.longitude,
+                    "highest": proximity.highest.name if proximity.highest is not None else None,
+                    "areas": [{"area": area, "distance_km": round(distance / 1000, 3)} for area, distance in sorted(proximity.distances.items(), key=operator.itemgetter(1))],
+                }
+                for location_id, location in points
+                for proximity in (nearby[location],)
+            ],
+        }
+
+    hass.services.async_register(const.DOMAIN, const.SERVICE_GET_TEXTS, async_get_texts, schema=GET_TEXTS_SCHEMA, supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(const.DOMAIN, const.SERVICE_GET_HISTORY, async_get_history, schema=GET_HISTORY_SCHEMA, supports_response=SupportsResponse.ONLY)
+    hass.services.async_register(const.DOMAIN, const.SERVICE_GET_NEARBY_WARNINGS, async_get_nearby_warnings, schema=GET_NEARBY_WARNINGS_SCHEMA, supports_response=SupportsResponse.ONLY)
+    return True
+
+
+def _service_points(hass: HomeAssistant, call: ServiceCall) -> list[tuple[str | None, geosphere.Location]]:
+    # the points given in the call, otherwise every configured location with its id
+    if const.ATTR_POINTS in call.data:
+        return [(None, geosphere.Location(latitude=point[const.CONF_LATITUDE], longitude=point[const.CONF_LONGITUDE])) for point in call.data[const.ATTR_POINTS]]
+    return [(location_id, client.config.location) for coordinator_ in hass.data[const.DOMAIN].values() for location_id, client in coordinator_.clients.items()]
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     hass.data.setdefault(const.DOMAIN, {})
+    if const.DOMAIN_DATA not in hass.data:
+        hass.data[const.DOMAIN_DATA] = hass.async_create_task(_async_create_hub(hass))
+    hub: geosphere.Hub = await hass.data[const.DOMAIN_DATA]
+    archive = await _async_get_archive(hass)
 
-    client_config = geosphere.ClientConfig(
-        location=geosphere.Location(latitude=config_entry.data["latitude"], longitude=config_entry.data["longitude"]),
-        advanced_warning_time=config_entry.data["advanced_warning_time"],
+    language = hass.config.language.split("-")[0]
+    if language not in const.WARNING_TEXT_LANGUAGES:
+        language = const.WARNING_TEXT_LANGUAGES[0]
+    clients = {
+        location[const.CONF_LOCATION_ID]: geosphere.Client(
+            geosphere.ClientConfig(
+                location=geosphere.Location(latitude=location[const.CONF_LATITUDE], longitude=location[const.CONF_LONGITUDE]),
+                advanced_warning_time=datetime.timedelta(minutes=location.get(const.CONF_ADVANCED_WARNING_TIME_MINUTES, 0)),
+                language=language,
+            ),
+            hub,
+        )
+        for location in config_entry.data[const.CONF_LOCATIONS]
+    }
+    push = const.CONF_WEBHOOK_ID in config_entry.options
+    coordinator_ = coordinator.GeosphereAtWarningsDataUpdateCoordinator(
+        hass,
+        hub,
+        clients,
+        min_poll_interval=datetime.timedelta(seconds=const.PUSH_SAFETY_POLL_INTERVAL if push else config_entry.options.get(const.CONF_MIN_POLL_INTERVAL, const.DEFAULT_MIN_POLL_INTERVAL)),
+        max_poll_interval=datetime.timedelta(seconds=const.PUSH_SAFETY_POLL_INTERVAL if push else config_entry.options.get(const.CONF_MAX_POLL_INTERVAL, const.DEFAULT_MAX_POLL_INTERVAL)),
+        archive=archive,
+        escalation_window=datetime.timedelta(seconds=config_entry.options.get(const.CONF_ESCALATION_WINDOW, const.DEFAULT_ESCALATION_WINDOW)),
     )
-    client = geosphere.Client(client_config, async_get_clientsession(hass))
+    # setup never waits for the network: persisted warnings are served right away, locations without
+    # them stay unavailable until the background refresh filled them in
+    coordinator_.async_set_cached_data()
+    config_entry.async_create_background_task(hass, coordinator_.async_refresh(), f"{const.DOMAIN} refresh {config_entry.entry_id}")
+    config_entry.async_on_unload(coordinator_.async_shutdown)
+    config_entry.async_on_unload(config_entry.add_update_listener(_async_reload_entry))
 
-    hass.data[const.DOMAIN][config_entry.entry_id] = client
+    hass.data[const.DOMAIN][config_entry.entry_id] = coordinator_
+    if push:
+        await _async_register_webhook(hass, config_entry)
 
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:  # noqa: RUF029
+    if config_entry.version == 1:
+        # single location entries become the first location of a list, keeping the entry id as
+        # location id so entity unique ids stay the same
+        data = config_entry.data
+        location = {
+            const.CONF_LOCATION_ID: config_entry.entry_id,
+            const.CONF_NAME: data.get(const.CONF_NAME, const.DEFAULT_NAME),
+            const.CONF_LATITUDE: data[const.CONF_LATITUDE],
+            const.CONF_LONGITUDE: data[const.CONF_LONGITUDE],
+            const.CONF_ADVANCED_WARNING_TIME_MINUTES: data.get(const.CONF_ADVANCED_WARNING_TIME_MINUTES, 0),
+        }
+        hass.config_entries.async_update_entry(config_entry, data={const.CONF_LOCATIONS: [location]}, version=2)
+        logger.info("Migrated %s to version 2", config_entry.title)
+
+    return True
+
+
+async def _async_register_webhook(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    # only set up when push is enabled, so the http server is not required otherwise
+    from homeassistant.components import webhook  # noqa: PLC0415
+
+    if not await async_setup_component(hass, webhook.DOMAIN, {}):
+        logger.error("Webhook integration unavailable, %s falls back to the safety poll", config_entry.title)
+        return
+    webhook_id = config_entry.options[const.CONF_WEBHOOK_ID]
+    webhook.async_register(hass, const.DOMAIN, config_entry.title, webhook_id, _async_handle_webhook, allowed_methods=["POST"])
+    config_entry.async_on_unload(lambda: webhook.async_unregister(hass, webhook_id))
+    logger.info("Accepting pushed warnings for %s at %s", config_entry.title, webhook.async_generate_path(webhook_id))
+
+
+async def _async_handle_webhook(hass: HomeAssistant, _: str, request: web.Request) -> web.Response:
+    # getWarningsForCoords responses or snapshots from a relay; any entry's webhook feeds the shared hub
+    try:
+        data = await request.json()
+    except ValueError:
+        return web.Response(status=HTTPStatus.BAD_REQUEST)
+    hub: geosphere.Hub = await hass.data[const.DOMAIN_DATA]
+    try:
+        areas = hub.ingest(data)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        logger.warning("Ignoring malformed pushed warnings")
+        return web.Response(status=HTTPStatus.BAD_REQUEST)
+
+    for entry_id, coordinator_ in hass.data[const.DOMAIN].items():
+        hass.async_create_background_task(coordinator_.async_handle_push(areas), f"{const.DOMAIN} push {entry_id}")
+    return web.json_response({"areas": sorted(areas)})
+
+
+async def _async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    await hass.config_entries.async_reload(config_entry.entry_id)
+
+
+async def _async_create_hub(hass: HomeAssistant) -> geosphere.Hub:
+    # loaded once for all entries, so startup does not grow with the number of entries
+    index_store: Store[dict] = Store(hass, const.AREA_INDEX_STORAGE_VERSION, const.AREA_INDEX_STORAGE_KEY)
+    cache_store: Store[dict] = Store(hass, const.WARNING_CACHE_STORAGE_VERSION, const.WARNING_CACHE_STORAGE_KEY)
+    stored_index, stored_cache = await asyncio.gather(index_store.async_load(), cache_store.async_load())
+    index = geosphere.AreaIndex.from_dict(stored_index) if stored_index else geosphere.AreaIndex()
+
+    hub: geosphere.Hub
+
+    def on_update(update: geosphere.HubUpdate) -> None:
+        if update == geosphere.HubUpdate.INDEX:
+            index_store.async_delay_save(index.as_dict, const.AREA_INDEX_SAVE_DELAY)
+        else:
+            cache_store.async_delay_save(hub.dump_cache, const.WARNING_CACHE_SAVE_DELAY)
+
+    # without a session the hub creates its pooled one on first use and closes it in async_close, which runs
+    # when Home Assistant closes or, with the listener removed, when the last entry unloads
+    hub = geosphere.Hub(
+        max_age=const.FETCH_MAX_AGE,
+        index=index,
+        on_update=on_update,
+        snapshot_url=const.SNAPSHOT_URL,
+        start_jitter=const.FETCH_START_JITTER,
+    )
+    if stored_cache:
+        try:
+            hub.load_cache(stored_cache)
+        except (KeyError, TypeError, ValueError):
+            logger.exception("Ignoring unreadable warning cache")
+
+    async def async_close_hub(_: Event) -> None:
+        hass.data.pop(const.DOMAIN_CLOSE_LISTENER, None)
+        await hub.async_close()
+
+    hass.data[const.DOMAIN_CLOSE_LISTENER] = hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, async_close_hub)
+    return hub
+
+
+async def _async_get_archive(hass: HomeAssistant) -> history.WarningArchive:
+    # shared by all entries and kept across reloads, loaded on first use
+    if const.DOMAIN_ARCHIVE not in hass.data:
+        hass.data[const.DOMAIN_ARCHIVE] = hass.async_create_task(_async_load_archive(hass))
+    return await hass.data[const.DOMAIN_ARCHIVE]
+
+
+async def _async_load_archive(hass: HomeAssistant) -> history.WarningArchive:
+    store: Store[dict] = Store(hass, const.ARCHIVE_STORAGE_VERSION, const.ARCHIVE_STORAGE_KEY)
+    archive: history.WarningArchive
+
+    def on_update() -> None:
+        store.async_delay_save(archive.as_dict, const.ARCHIVE_SAVE_DELAY)
+
+    archive = history.WarningArchive(on_update)
+    if stored := await store.async_load():
+        try:
+            archive = history.WarningArchive.from_dict(stored, on_update)
+        except (KeyError, TypeError, ValueError):
+            logger.exception("Ignoring unreadable warning archive")
+    return archive
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[const.DOMAIN].pop(entry.entry_id)
+        if not hass.data[const.DOMAIN] and (hub_task := hass.data.pop(const.DOMAIN_DATA, None)) is not None:
+            hub: geosphere.Hub = await hub_task
+            if (unsub_close := hass.data.pop(const.DOMAIN_CLOSE_LISTENER, None)) is not None:
+                unsub_close()
+            await hub.async_close()
 
     return unload_ok
@@ -1,10 +1,8 @@
-"""Binary Sensor for MeteoAlarm.eu."""
+"""Binary Sensor for GeoSphere AT Warnings."""
 
 from __future__ import annotations
 
-import datetime
 import logging
-from datetime import timedelta
 from typing import TYPE_CHECKING
 
 import homeassistant.const
@@ -17,86 +15,85 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
 )
+from homeassistant.config_entries import SOURCE_IMPORT
 from homeassistant.helpers import config_validation
 
-from . import geosphere
+from . import const, entity
 
 if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
     from homeassistant.core import HomeAssistant
     from homeassistant.helpers.entity_platform import AddEntitiesCallback
-    from homeassistant.helpers.typing import ConfigType
+    from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
-logger = logging.getLogger(__name__)
-
-ATTRIBUTION = "Data by Geosphere Austria"
-
-CONF_LATITUDE = "latitude"
-CONF_LONGITUDE = "longitude"
-CONF_ADVANCED_WARNING_TIME_MINUTES = "advanced_warning_time_minutes"
-
-DEFAULT_NAME = "geosphere-at"
+    from . import coordinator, geosphere
 
-SCAN_INTERVAL = timedelta(minutes=5)
+logger = logging.getLogger(__name__)
 
 PLATFORM_SCHEMA = BINARY_SENSOR_PLATFORM_SCHEMA.extend(
     {
-        voluptuous.Required(CONF_LATITUDE): config_validation.latitude,
-        voluptuous.Required(CONF_LONGITUDE): config_validation.longitude,
-        voluptuous.Required(CONF_ADVANCED_WARNING_TIME_MINUTES): config_validation.positive_int,
+        voluptuous.Optional(homeassistant.const.CONF_NAME, default=const.DEFAULT_NAME): config_validation.string,
+        voluptuous.Required(const.CONF_LATITUDE): config_validation.latitude,
+        voluptuous.Required(const.CONF_LONGITUDE): config_validation.longitude,
+        voluptuous.Required(const.CONF_ADVANCED_WARNING_TIME_MINUTES): config_validation.positive_int,
     },
 )
 ENTITY_DESCRIPTION = BinarySensorEntityDescription(
     key="geosphere_at_warnings",
-    icon="mdi:weather-lightning",
+    icon=const.ICON,
 )
 
 
-def setup_platform(
-    hass: HomeAssistant,  # noqa: ARG001
+async def async_setup_platform(
+    hass: HomeAssistant,
     config: ConfigType,
-    add_entities: AddEntitiesCallback,
+    async_add_entities: AddEntitiesCallback,  # noqa: ARG001
+    discovery_info: DiscoveryInfoType | None = None,  # noqa: ARG001
 ) -> None:
-    latitude = config[CONF_LATITUDE]
-    longitude = config[CONF_LONGITUDE]
-    name = config[homeassistant.const.CONF_NAME]
-    advanced_warning_time = datetime.timedelta(minutes=config[CONF_ADVANCED_WARNING_TIME_MINUTES])
-
-    add_entities(
-        new_entities=[GeosphereAtBinarySensor(name=name, latitude=latitude, longitude=longitude, advanced_warning_time=advanced_warning_time, entity_description=ENTITY_DESCRIPTION)],
-        update_before_add=True,
+    # YAML sensors are imported as config entries, so they share the hub and coordinator instead of polling on their own
+    logger.warning("Configuring %s binary sensors in YAML is deprecated, the configuration has been imported into a config entry", const.DOMAIN)
+    await hass.config_entries.flow.async_init(
+        const.DOMAIN,
+        context={"source": SOURCE_IMPORT},
+        data={
+            "name": config[homeassistant.const.CONF_NAME],
+            "latitude": config[const.CONF_LATITUDE],
+            "longitude": config[const.CONF_LONGITUDE],
+            const.CONF_ADVANCED_WARNING_TIME_MINUTES: config[const.CONF_ADVANCED_WARNING_TIME_MINUTES],
+        },
     )
 
 
-class GeosphereAtBinarySensor(BinarySensorEntity):
-    _attr_attribution = ATTRIBUTION
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback) -> None:  # noqa: RUF029
+    coordinator_ = hass.data[const.DOMAIN][entry.entry_id]
+    async_add_entities([GeosphereAtBinarySensor(coordinator_, entry, location, ENTITY_DESCRIPTION) for location in entry.data[const.CONF_LOCATIONS]])
+
+
+class GeosphereAtBinarySensor(entity.GeosphereAtWarningsEntity, BinarySensorEntity):
+    _attr_attribution = const.ATTRIBUTION
     _attr_device_class = BinarySensorDeviceClass.SAFETY
 
-    def __init__(self, name: str, latitude: float, longitude: float, advanced_warning_time: datetime.timedelta, entity_description: BinarySensorEntityDescription) -> None:
-        super().__init__()
+    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry, location: dict, entity_description: BinarySensorEntityDescription) -> None:
+        super().__init__(coordinator_, config_entry, location)
         self.entity_description = entity_description
-        self._attr_name = name
-        self.location = geosphere.Location(latitude=latitude, longitude=longitude)
-        self.advanced_warning_time = advanced_warning_time
-
-    def update(self) -> None:
-        self._attr_extra_state_attributes = {}
-        self._attr_is_on = False
-
-        try:
-            all_warnings = geosphere.get_relevant_warnings(self.location)
-        except Exception:
-            logger.exception("Error fetching warnings")
-            return
-
-        relevant_warnings = all_warnings.get_relevant(advanced_warning_time=timedelta(hours=0))
-        if len(relevant_warnings) == 0:
-            return
-
-        relevant_warnings_sorted = sorted(relevant_warnings, key=lambda w: w.level, reverse=True)
-        highest_warning = relevant_warnings_sorted[0]
-
-        self._attr_is_on = True
-        self._attr_extra_state_attributes = {
-            "eventType": highest_warning.type.name,
-            "eventLevel": highest_warning.level.name,
-        }
+        self._attr_name = location.get(const.CONF_NAME, const.DEFAULT_NAME)
+
+    @property
+    def is_on(self) -> bool:
+        return self._highest_warning() is not None
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        attributes = super().extra_state_attributes
+        if (highest_warning := self._highest_warning()) is not None:
+            attributes["eventType"] = highest_warning.type.name
+            attributes["eventLevel"] = highest_warning.level.name
+            # texts are only referenced, the get_texts service resolves them
+            texts = self.coordinator.texts(self.location_id, highest_warning)
+            attributes["textId"] = texts.text_id
+            attributes["effectsId"] = texts.effects_id
+            attributes["recommendationsId"] = texts.recommendations_id
+        return attributes
+
+    def _highest_warning(self) -> geosphere.GeosphereWarning | None:
+        return self.view.highest_active
@@ -3,39 +3,118 @@
 from __future__ import annotations
 
 import logging
+import secrets
+import uuid
+from typing import TYPE_CHECKING
 
 import homeassistant.helpers.selector as input_selector
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigFlowResult
+from homeassistant.core import callback
 
 from . import const
 
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+
 logger = logging.getLogger(__name__)
 
 
+def _location(*, name: str, latitude: float, longitude: float, advanced_warning_time_minutes: int) -> dict:
+    return {
+        const.CONF_LOCATION_ID: uuid.uuid4().hex,
+        const.CONF_NAME: name,
+        const.CONF_LATITUDE: latitude,
+        const.CONF_LONGITUDE: longitude,
+        const.CONF_ADVANCED_WARNING_TIME_MINUTES: advanced_warning_time_minutes,
+    }
+
+
 class ConfigFlow(config_entries.ConfigFlow, domain=const.DOMAIN):
+    VERSION = 2
+
+    def __init__(self) -> None:
+        self._locations: list[dict] = []
+
     async def async_step_user(self, user_input: dict | None = None) -> ConfigFlowResult:
+        return await self._async_step_location("user", user_input)
+
+    async def async_step_location(self, user_input: dict | None = None) -> ConfigFlowResult:
+        return await self._async_step_location("location", user_input)
+
+    async def _async_step_location(self, step_id: str, user_input: dict | None) -> ConfigFlowResult:
+        # the first location names the entry, further ones are added until add_another is left unchecked
         errors = {}
         if user_input is not None:
             location = user_input.get("location", {})
             if location:
-                return self.async_create_entry(
-                    title=user_input.get("name", "Geosphere AT Warnings"),
-                    data={
-                        "latitude": location.get("latitude"),
-                        "longitude": location.get("latitude"),
-                        "name": user_input.get("name", "Geosphere AT Warnings"),
-                    },
+                self._locations.append(
+                    _location(
+                        name=user_input.get(const.CONF_NAME, "Geosphere AT Warnings"),
+                        latitude=location.get("latitude"),
+                        longitude=location.get("longitude"),
+                        advanced_warning_time_minutes=user_input.get(const.CONF_ADVANCED_WARNING_TIME_MINUTES, 0),
+                    ),
                 )
+                if user_input.get(const.CONF_ADD_ANOTHER):
+                    return await self.async_step_location()
+                return self.async_create_entry(title=self._locations[0][const.CONF_NAME], data={const.CONF_LOCATIONS: self._locations})
             logger.error("user input missing location")
             errors["invalid_location"] = "invalid_location"
         return self.async_show_form(
-            step_id="user",
+            step_id=step_id,
             data_schema=vol.Schema(
                 {
-                    vol.Required("name"): str,
+                    vol.Required(const.CONF_NAME): str,
                     vol.Required("location"): input_selector.LocationSelector(),
+                    vol.Required(const.CONF_ADVANCED_WARNING_TIME_MINUTES, default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(const.CONF_ADD_ANOTHER, default=False): bool,
+                },
+            ),
+            errors=errors,
+        )
+
+    async def async_step_import(self, import_data: dict) -> ConfigFlowResult:
+        # YAML configuration is imported on every start, the unique id keeps it to a single entry
+        await self.async_set_unique_id(f"{import_data['latitude']}_{import_data['longitude']}_{import_data[const.CONF_ADVANCED_WARNING_TIME_MINUTES]}")
+        self._abort_if_unique_id_configured()
+        location = _location(
+            name=import_data[const.CONF_NAME],
+            latitude=import_data[const.CONF_LATITUDE],
+            longitude=import_data[const.CONF_LONGITUDE],
+            advanced_warning_time_minutes=import_data[const.CONF_ADVANCED_WARNING_TIME_MINUTES],
+        )
+        return self.async_create_entry(title=import_data[const.CONF_NAME], data={const.CONF_LOCATIONS: [location]})
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:  # noqa: ARG004
+        return OptionsFlow()
+
+
+class OptionsFlow(config_entries.OptionsFlow):
+    async def async_step_init(self, user_input: dict | None = None) -> ConfigFlowResult:
+        errors = {}
+        options = self.config_entry.options
+        if user_input is not None:
+            if user_input[const.CONF_MAX_POLL_INTERVAL] >= user_input[const.CONF_MIN_POLL_INTERVAL]:
+                data = {key: value for key, value in user_input.items() if key != const.CONF_PUSH}
+                if user_input[const.CONF_PUSH]:
+                    # the webhook id is the secret relays push with, kept while push stays enabled; generated like
+                    # webhook.async_generate_id does, without loading the webhook and http components into the flow
+                    data[const.CONF_WEBHOOK_ID] = options.get(const.CONF_WEBHOOK_ID) or secrets.token_hex(32)
+                return self.async_create_entry(data=data)
+            errors["base"] = "invalid_poll_interval"
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(const.CONF_MIN_POLL_INTERVAL, default=options.get(const.CONF_MIN_POLL_INTERVAL, const.DEFAULT_MIN_POLL_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                    vol.Required(const.CONF_MAX_POLL_INTERVAL, default=options.get(const.CONF_MAX_POLL_INTERVAL, const.DEFAULT_MAX_POLL_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                    vol.Required(const.CONF_ESCALATION_WINDOW, default=options.get(const.CONF_ESCALATION_WINDOW, const.DEFAULT_ESCALATION_WINDOW)): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(const.CONF_PUSH, default=const.CONF_WEBHOOK_ID in options): bool,
                 },
             ),
             errors=errors,
@@ -3,9 +3,58 @@ import datetime
 NAME = "GeoSphere AT Warnings"
 DOMAIN = "geosphere_at_warnings"
 DOMAIN_DATA = f"{DOMAIN}_data"
+DOMAIN_ARCHIVE = f"{DOMAIN}_archive"
+DOMAIN_CLOSE_LISTENER = f"{DOMAIN}_close_listener"
 VERSION = "0.1.0"
 
-QUERY_INTERVAL = datetime.timedelta(seconds=10)
+# Entries polling within this window share one upstream fetch per area.
+FETCH_MAX_AGE = datetime.timedelta(seconds=10)
+# Spreads the requests of entries refreshing at the same time.
+FETCH_START_JITTER = datetime.timedelta(seconds=2)
+
+# Upstream polling backs off from the minimum to the maximum interval while nothing changes
+# and returns to the minimum when data changed or a warning boundary is imminent.
+DEFAULT_MIN_POLL_INTERVAL = 60
+DEFAULT_MAX_POLL_INTERVAL = 900
+IMMINENT_WINDOW = datetime.timedelta(hours=1)
+# With push enabled relays deliver warnings to a webhook and polling only guards against missed pushes.
+PUSH_SAFETY_POLL_INTERVAL = 1800
+STALE_AFTER_MAX_POLL_INTERVALS = 2
+
+# Austria-wide warning set, fetched once per interval and fanned out to all entries locally.
+# Disabled (None) until an upstream bulk endpoint in the snapshot format is available.
+SNAPSHOT_URL: str | None = None
+
+AREA_INDEX_STORAGE_KEY = f"{DOMAIN}.area_index"
+AREA_INDEX_STORAGE_VERSION = 1
+AREA_INDEX_SAVE_DELAY = 60
+
+WARNING_CACHE_STORAGE_KEY = f"{DOMAIN}.warnings"
+WARNING_CACHE_STORAGE_VERSION = 1
+WARNING_CACHE_SAVE_DELAY = 30
+
+# History of the warning episodes seen per location, see history.WarningArchive.
+ARCHIVE_STORAGE_KEY = f"{DOMAIN}.archive"
+ARCHIVE_STORAGE_VERSION = 1
+ARCHIVE_SAVE_DELAY = 300
+
+# Fired per added, removed, escalated or updated warning, see geosphere.diff_warnings.
+EVENT_WARNING_CHANGED = f"{DOMAIN}_warning_changed"
+# Fired per batch of escalations sharing type, level and state, see escalations.EscalationDispatcher.
+EVENT_WARNING_ESCALATIONS = f"{DOMAIN}_warning_escalations"
+DEFAULT_ESCALATION_WINDOW = 60
+
+SERVICE_GET_TEXTS = "get_texts"
+ATTR_TEXT_IDS = "text_ids"
+SERVICE_GET_HISTORY = "get_history"
+ATTR_LOCATION_ID = "location_id"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_TYPES = "types"
+ATTR_MIN_LEVEL = "min_level"
+SERVICE_GET_NEARBY_WARNINGS = "get_nearby_warnings"
+ATTR_RADIUS = "radius"
+ATTR_POINTS = "points"
 
 ATTRIBUTION = "Data by Geosphere Austria"
 ISSUE_URL = "https://github.com/aliebig/ha-geosphere-at/issues"
@@ -14,13 +63,25 @@ ICON = "mdi:weather-lightning"
 SENSOR = "sensor"
 PLATFORMS = [SENSOR]
 
+CONF_LOCATIONS = "locations"
+CONF_LOCATION_ID = "id"
+CONF_NAME = "name"
+CONF_ADD_ANOTHER = "add_another"
 CONF_LATITUDE = "latitude"
 CONF_LONGITUDE = "longitude"
 CONF_ADVANCED_WARNING_TIME_MINUTES = "advanced_warning_time_minutes"
+CONF_MIN_POLL_INTERVAL = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL = "max_poll_interval"
+CONF_PUSH = "push"
+CONF_WEBHOOK_ID = "webhook_id"
+CONF_ESCALATION_WINDOW = "escalation_window"
 
 # Defaults
 DEFAULT_NAME = DOMAIN
 
+# Languages the warning texts are available in; other Home Assistant languages get the first.
+WARNING_TEXT_LANGUAGES = ("en", "de")
+
 
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
@@ -1,28 +1,297 @@
+import asyncio
+import datetime
 import logging
+import math
+import time
 from typing import Any
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from . import const, geosphere
+from . import const, escalations, geosphere, history
 
 logger = logging.getLogger(__name__)
 
 
 class GeosphereAtWarningsDataUpdateCoordinator(DataUpdateCoordinator):
-    def __init__(
+    """Refreshes all locations of a config entry in one batch.
+
+    data maps location ids to {"warnings": GeosphereWarnings, "stale": bool}; the hub dedupes the
+    requests of locations sharing an area and bounds their concurrency. views holds the LocationView
+    of every location, rebuilt on each refresh and boundary so entities read them without evaluating warnings.
+    Fresh warnings are recorded to the archive, if given, under the location id. Besides an event per
+    change, escalations are batched by the dispatcher into one event per type, level and state.
+    """
+
+    def __init__(  # noqa: PLR0913
         self,
         hass: HomeAssistant,
-        client: geosphere.Client,
+        hub: geosphere.Hub,
+        clients: dict[str, geosphere.Client],
+        min_poll_interval: datetime.timedelta = datetime.timedelta(seconds=const.DEFAULT_MIN_POLL_INTERVAL),
+        max_poll_interval: datetime.timedelta = datetime.timedelta(seconds=const.DEFAULT_MAX_POLL_INTERVAL),
+        *,
+        archive: history.WarningArchive | None = None,
+        escalation_window: datetime.timedelta = datetime.timedelta(seconds=const.DEFAULT_ESCALATION_WINDOW),
     ) -> None:
         """Initialize."""
-        self.api = client
+        self.hub = hub
+        self.archive = archive
+        self.clients = clients
         self.platforms = []
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max(min_poll_interval, max_poll_interval)
+        self.stale_after = self.max_poll_interval * const.STALE_AFTER_MAX_POLL_INTERVALS
+        self.last_success: datetime.datetime | None = None
+        self._unsub_boundary: CALLBACK_TYPE | None = None
+        self._unsub_dispatch: CALLBACK_TYPE | None = None
+        self.dispatcher = escalations.EscalationDispatcher(self._emit_escalations, window=escalation_window.total_seconds())
+        self.views: dict[str, geosphere.LocationView] = {}
+        self.stats = geosphere.Stats()
+        self._stats_listeners: list[CALLBACK_TYPE] = []
+
+        super().__init__(hass, logger, name=const.DOMAIN, update_interval=min_poll_interval, always_update=False)
+
+    @property
+    def is_stale(self) -> bool:
+        return self.last_success is None or dt_util.utcnow() - self.last_success > self.stale_after
+
+    def is_location_stale(self, location_id: str) -> bool:
+        location = (self.data or {}).get(location_id)
+        return location is None or location["stale"] or self.is_stale
+
+    @callback
+    def async_add_stats_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        # listeners are only notified when the data changed, the stats move on every refresh
+        self._stats_listeners.append(update_callback)
+        return lambda: self._stats_listeners.remove(update_callback)
+
+    @callback
+    def _async_refresh_finished(self) -> None:
+        for update_callback in list(self._stats_listeners):
+            update_callback()
+
+    def texts(self, location_id: str, warning: geosphere.GeosphereWarning) -> geosphere.WarningTexts:
+        # texts in the language of the location's client, falling back to those the warning came with
+        texts = (self.data or {}).get(location_id, {}).get("texts", {}).get(geosphere.texts_key(warning))
+        return texts if texts is not None else geosphere.WarningTexts.of(warning)
+
+    @callback
+    def async_set_cached_data(self) -> None:
+        # serve the persisted warnings right away, the first refresh then revalidates them in the background
+        data = {}
+        fetched_at = []
+        for location_id, client in self.clients.items():
+            if (cached := client.get_cached_data()) is not None:
+                data[location_id] = {"warnings": cached.warnings, "stale": False}
+                fetched_at.append(cached.fetched_at)
+        if not data:
+            return
+
+        self.data = data
+        self.last_success = min(fetched_at)
+        self._schedule_boundary(self.data)
+
+    async def _async_update_data(self) -> dict[str, dict[str, Any]]:
+        started = time.perf_counter()
+        previous = self.data or {}
+        results = await asyncio.gather(*(client.async_get_data() for client in self.clients.values()), return_exceptions=True)
+
+        data = {}
+        errors = []
+        for location_id, result in zip(self.clients, results, strict=True):
+            if isinstance(result, Exception):
+                self.stats.increment(f"update.failed.{type(result).__name__}")
+                errors.append(result)
+                if location_id in previous:
+                    # the last known warnings of a failing location are served, flagged stale like the hub's
+                    data[location_id] = {**previous[location_id], "stale": True}
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                data[location_id] = result
+
+        if not data:
+            raise UpdateFailed from errors[0]
+        if errors:
+            logger.warning("Error fetching warnings for %d of %d locations: %s", len(errors), len(self.clients), errors[0])
+
+        if all(location["stale"] for location in data.values()):
+            # the hub served the last known warnings, upstream is failing or paused by its circuit breaker
+            self.stats.increment("update.stale")
+            logger.warning("GeoSphere API unavailable, serving warnings from %s", self.last_success)
+            self.update_interval = self.min_poll_interval
+            self._schedule_boundary(data)
+            return data
+
+        self.last_success = dt_util.utcnow()
+        self._process(previous, data)
+        changed = data != self.data
+        self.stats.increment("update.changed" if changed else "update.unchanged")
+        self.update_interval = self._next_poll_interval(changed=changed, failed=bool(errors) or any(location["stale"] for location in data.values()))
+        self.stats.observe("update", time.perf_counter() - started)
+        return data
+
+    async def async_handle_push(self, areas: set[int]) -> None:
+        # the hub took pushed warnings for these areas as freshly fetched, so the locations in them are
+        # updated right away without a request; translations of changed warnings follow once fetched
+        started = time.perf_counter()
+        location_ids = [location_id for location_id, client in self.clients.items() if self.hub.area_of(client.config.location) in areas]
+        previous = self.data or {}
+        data = dict(previous)
+        for location_id in location_ids:
+            if (cached := self.clients[location_id].get_cached_data()) is not None:
+                data[location_id] = {**previous.get(location_id, {}), "warnings": cached.warnings, "stale": False}
+        if data == previous:
+            self.stats.increment("push.unchanged")
+            return
+
+        self.stats.increment("push.changed")
+        self._process(previous, data)
+        self.async_set_updated_data(data)
+        self.stats.observe("push", time.perf_counter() - started)
+        await self._async_update_texts([location_id for location_id in location_ids if location_id in data and self.clients[location_id].config.language != geosphere.DEFAULT_LANGUAGE])
+
+    async def _async_update_texts(self, location_ids: list[str]) -> None:
+        if not location_ids:
+            return
+        clients = [self.clients[location_id] for location_id in location_ids]
+        texts = await asyncio.gather(*(client.hub.async_get_texts(client.config.location, self.data[location_id]["warnings"], client.config.language) for location_id, client in zip(location_ids, clients, strict=True)))
+        data = dict(self.data)
+        for location_id, location_texts in zip(location_ids, texts, strict=True):
+            data[location_id] = {**data[location_id], "texts": location_texts}
+        if data != self.data:
+            self.async_set_updated_data(data)
+
+    @callback
+    def _process(self, previous: dict[str, dict[str, Any]], data: dict[str, dict[str, Any]]) -> None:
+        for location_id, location in data.items():
+            if location_id in previous:
+                self._fire_events(location_id, geosphere.diff_warnings(previous[location_id]["warnings"], location["warnings"]))
+        self._archive(data)
+        self._schedule_boundary(data)
+        self._schedule_dispatch()
+
+    @callback
+    def _fire_events(self, location_id: str, events: list[geosphere.WarningEvent]) -> None:
+        self.dispatcher.add(location_id, self.hub.area_of(self.clients[location_id].config.location), events)
+        entry_id = self.config_entry.entry_id if self.config_entry is not None else None
+        for event in events:
+            self.stats.increment(f"event.{event.change.value}")
+            self.hass.bus.async_fire(
+                const.EVENT_WARNING_CHANGED,
+                {
+                    "entry_id": entry_id,
+                    "location_id": location_id,
+                    "change": event.change.value,
+                    "warnid": event.warning.warnid,
+                    "verlaufid": event.warning.verlaufid,
+                    "type": event.warning.type.name,
+                    "level": event.warning.level.name,
+                    "previous_level": event.previous.level.name if event.previous is not None else None,
+                    "begin": event.warning.begin.isoformat(),
+                    "end": event.warning.end.isoformat(),
+                },
+            )
+
+    @callback
+    def _emit_escalations(self, batch: escalations.EscalationBatch) -> None:
+        self.hass.bus.async_fire(
+            const.EVENT_WARNING_ESCALATIONS,
+            {
+                "entry_id": self.config_entry.entry_id if self.config_entry is not None else None,
+                "type": batch.type.name,
+                "level": batch.level.name,
+                "state": batch.region,
+                "locations": [
+                    {
+                        "location_id": escalation.site,
+                        "area": escalation.area,
+                        "change": escalation.event.change.value,
+                        "warnid": escalation.event.warning.warnid,
+                        "verlaufid": escalation.event.warning.verlaufid,
+                        "previous_level": escalation.event.previous.level.name if escalation.event.previous is not None else None,
+                        "begin": escalation.event.warning.begin.isoformat(),
+                        "end": escalation.event.warning.end.isoformat(),
+                    }
+                    for escalation in batch.escalations
+                ],
+            },
+        )
+
+    @callback
+    def _schedule_dispatch(self) -> None:
+        # wakes up when the next batch closes or the rate limit lets a waiting one out
+        self._cancel_dispatch()
+        if (due := self.dispatcher.next_due()) is not None:
+            self._unsub_dispatch = async_call_later(self.hass, max(0.0, due - self.dispatcher.clock()), self._handle_dispatch)
+
+    @callback
+    def _handle_dispatch(self, _: datetime.datetime) -> None:
+        self._unsub_dispatch = None
+        self.dispatcher.flush()
+        self._schedule_dispatch()
+
+    @callback
+    def _cancel_dispatch(self) -> None:
+        if self._unsub_dispatch is not None:
+            self._unsub_dispatch()
+            self._unsub_dispatch = None
+
+    def _archive(self, data: dict[str, dict[str, Any]]) -> None:
+        if self.archive is None:
+            return
+        for location_id, location in data.items():
+            if not location["stale"]:
+                self.archive.record(location_id, location["warnings"], area=self.hub.area_of(self.clients[location_id].config.location))
+
+    def _update_views(self, data: dict[str, dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        self.views = {location_id: location["warnings"].view(self.clients[location_id].config.advanced_warning_time) for location_id, location in data.items()}
+        self.stats.observe("relevance", time.perf_counter() - started)
+
+    def _next_boundary(self) -> float:
+        return min((view.valid_until for view in self.views.values()), default=math.inf)
+
+    def _next_poll_interval(self, *, changed: bool, failed: bool) -> datetime.timedelta:
+        if changed or failed:
+            return self.min_poll_interval
+
+        if self._next_boundary() - self.last_success.timestamp() < const.IMMINENT_WINDOW.total_seconds():
+            return self.min_poll_interval
+
+        return min(self.update_interval * 2, self.max_poll_interval)
+
+    @callback
+    def _schedule_boundary(self, data: dict[str, dict[str, Any]]) -> None:
+        # state changes at warning begin/end without new data, so views are rebuilt and listeners notified exactly then
+        self._cancel_boundary()
+
+        self._update_views(data)
+        boundary = self._next_boundary()
+        if self.last_success is not None and not self.is_stale:
+            boundary = min(boundary, (self.last_success + self.stale_after).timestamp())
+        if boundary == math.inf:
+            return
+
+        self._unsub_boundary = async_track_point_in_utc_time(self.hass, self._handle_boundary, dt_util.utc_from_timestamp(boundary))
+
+    @callback
+    def _handle_boundary(self, _: datetime.datetime) -> None:
+        self._unsub_boundary = None
+        self.stats.increment("boundary")
+        self._schedule_boundary(self.data)
+        self.async_update_listeners()
 
-        super().__init__(hass, logger, name=const.DOMAIN, update_interval=const.QUERY_INTERVAL)
+    @callback
+    def _cancel_boundary(self) -> None:
+        if self._unsub_boundary is not None:
+            self._unsub_boundary()
+            self._unsub_boundary = None
 
-    async def _async_update_data(self) -> dict[str, Any]:
-        try:
-            return await self.api.async_get_data()
-        except Exception as exception:
-            raise UpdateFailed from exception
+    async def async_shutdown(self) -> None:
+        self._cancel_boundary()
+        self._cancel_dispatch()
+        await super().async_shutdown()
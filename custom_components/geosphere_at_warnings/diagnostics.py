@@ -0,0 +1,54 @@
+"""Diagnostics support for GeoSphere AT Warnings."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.diagnostics import async_redact_data
+
+from . import const
+
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+    from . import coordinator
+
+TO_REDACT = {const.CONF_LATITUDE, const.CONF_LONGITUDE, const.CONF_WEBHOOK_ID}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:  # noqa: RUF029
+    coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator = hass.data[const.DOMAIN][entry.entry_id]
+    hub = coordinator_.hub
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "coordinator": {
+            "last_success": coordinator_.last_success,
+            "stale": coordinator_.is_stale,
+            "update_interval": coordinator_.update_interval.total_seconds() if coordinator_.update_interval else None,
+            "stats": coordinator_.stats.as_dict(),
+        },
+        "locations": {
+            location_id: {
+                "stale": coordinator_.is_location_stale(location_id),
+                "stats": client.stats.as_dict(),
+            }
+            for location_id, client in coordinator_.clients.items()
+        },
+        "hub": {
+            "snapshot_mode": hub.snapshot_url is not None,
+            "indexed_areas": len(hub.index),
+            "circuits": {endpoint: state.value for endpoint, state in hub.circuit_states.items()},
+            "stats": hub.stats.as_dict(),
+        },
+        "escalations": {
+            "pending": len(coordinator_.dispatcher),
+            "stats": coordinator_.dispatcher.stats.as_dict(),
+        },
+        "archive": {
+            "rows": len(coordinator_.archive) if coordinator_.archive is not None else None,
+        },
+    }
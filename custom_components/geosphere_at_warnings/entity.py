@@ -1,32 +1,73 @@
+import datetime
+from typing import Any
+
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from . import const, coordinator
+from . import const, coordinator, geosphere
 
 
 class GeosphereAtWarningsEntity(CoordinatorEntity):
-    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry) -> None:
+    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry, location: dict) -> None:
         super().__init__(coordinator_)
         self.config_entry = config_entry
+        self.location = location
+        self._written_view: Any = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._written_view = self._view()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # refreshes and boundaries notify every entity, only those whose rendering changed write state
+        view = self._view()
+        if view == self._written_view:
+            return
+        self._written_view = view
+        self.async_write_ha_state()
+
+    def _view(self) -> Any:  # noqa: ANN401
+        if not self.available:
+            return (False,)
+        return True, self.state, self.extra_state_attributes
+
+    @property
+    def location_id(self) -> str:
+        return self.location[const.CONF_LOCATION_ID]
+
+    @property
+    def view(self) -> geosphere.LocationView | None:
+        return self.coordinator.views.get(self.location_id)
+
+    @property
+    def advanced_warning_time(self) -> datetime.timedelta:
+        return self.coordinator.clients[self.location_id].config.advanced_warning_time
+
+    @property
+    def available(self) -> bool:
+        return super().available and self.view is not None
 
     @property
     def unique_id(self) -> str:
-        return self.config_entry.entry_id
+        return self.location_id
 
     @property
     def device_info(self) -> dict:
         return {
-            "identifiers": {(const.DOMAIN, self.unique_id)},
-            "name": const.NAME,
+            "identifiers": {(const.DOMAIN, self.location_id)},
+            "name": self.location.get(const.CONF_NAME, const.NAME),
             "model": const.VERSION,
             "manufacturer": const.NAME,
         }
 
     @property
-    def device_state_attributes(self) -> dict:
+    def extra_state_attributes(self) -> dict:
         """Return the state attributes."""
         return {
             "attribution": const.ATTRIBUTION,
-            "id": str(self.coordinator.data.get("id")),
+            "id": self.location_id,
             "integration": const.DOMAIN,
+            "stale": self.coordinator.is_location_stale(self.location_id),
         }
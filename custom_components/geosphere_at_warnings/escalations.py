@@ -0,0 +1,161 @@
+import heapq
+import math
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from . import geosphere
+
+ESCALATION_WINDOW = 60.0
+ESCALATION_RATE = 6
+ESCALATION_RATE_PERIOD = 60.0
+
+
+class AreaGrouping(IntEnum):
+    # divisor of the municipality number (gemeindenr) giving the region, its digits are state, district, municipality
+    MUNICIPALITY = 1
+    DISTRICT = 100
+    STATE = 10_000
+
+
+@dataclass(frozen=True, slots=True)
+class Escalation:
+    site: str
+    area: int | None
+    event: geosphere.WarningEvent
+
+
+@dataclass(frozen=True, slots=True)
+class EscalationBatch:
+    type: geosphere.WarningType
+    level: geosphere.WarningLevel
+    region: int | None
+    escalations: tuple[Escalation, ...]
+    opened_at: float
+    emitted_at: float
+
+
+@dataclass(slots=True)
+class _EscalationGroup:
+    sequence: int
+    opened_at: float
+    escalations: dict[tuple[str, tuple], Escalation] = field(default_factory=dict)
+
+
+class EscalationDispatcher:
+    """Coalesces the escalations of many sites into one batch per warning type, level and region.
+
+    An added warning or raised level of at least min_level opens a group for its type, level and region
+    (the area divided by grouping) that collects for window seconds. A warning escalating again while its
+    group is pending moves to the group of its new level, so every warning is reported once, at its latest
+    level. Closed groups are emitted highest level first and at most rate per period, groups waiting for
+    their turn keep collecting. Times are clock() seconds, add and flush take now to replay a front.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        emit: Callable[[EscalationBatch], None],
+        *,
+        window: float = ESCALATION_WINDOW,
+        rate: int = ESCALATION_RATE,
+        period: float = ESCALATION_RATE_PERIOD,
+        min_level: geosphere.WarningLevel = geosphere.WarningLevel.YELLOW,
+        grouping: AreaGrouping = AreaGrouping.STATE,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.emit = emit
+        self.window = window
+        self.rate = rate
+        self.period = period
+        self.min_level = min_level
+        self.grouping = grouping
+        self.clock = clock
+        self.stats = geosphere.Stats()
+        self._groups: dict[tuple[geosphere.WarningType, geosphere.WarningLevel, int | None], _EscalationGroup] = {}
+        self._pending: dict[tuple[str, tuple], tuple[geosphere.WarningType, geosphere.WarningLevel, int | None]] = {}
+        # (closes at, sequence, group) and (-level, opened at, sequence, group); entries of groups emptied by
+        # moves are skipped when popped, as their sequence no longer matches
+        self._closing: list[tuple[float, int, tuple]] = []
+        self._ready: list[tuple[int, float, int, tuple]] = []
+        self._sequence = 0
+        # generic cell rate algorithm: a batch may go out once this time is reached, rate at once at most
+        self._interval = period / rate
+        self._arrival = -math.inf
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, site: str, area: int | None, events: Iterable[geosphere.WarningEvent], now: float | None = None) -> int:
+        # returns the number of escalations taken, other changes and lower levels are ignored
+        now = self.clock() if now is None else now
+        region = area // self.grouping if area is not None else None
+        accepted = 0
+        for event in events:
+            warning = event.warning
+            if event.change not in {geosphere.WarningChange.ADDED, geosphere.WarningChange.ESCALATED} or warning.level < self.min_level:
+                continue
+            pending_key = (site, geosphere.warning_key(warning))
+            key = (warning.type, warning.level, region)
+            if (moved := self._pending.get(pending_key)) is not None and moved != key:
+                self.stats.increment("escalations.moved")
+                group = self._groups[moved]
+                del group.escalations[pending_key]
+                if not group.escalations:
+                    del self._groups[moved]
+
+            group = self._groups.get(key)
+            if group is None:
+                self._sequence += 1
+                group = self._groups[key] = _EscalationGroup(self._sequence, now)
+                heapq.heappush(self._closing, (now + self.window, self._sequence, key))
+            group.escalations[pending_key] = Escalation(site, area, event)
+            self._pending[pending_key] = key
+            accepted += 1
+        self.stats.increment("escalations.accepted", accepted)
+        return accepted
+
+    def flush(self, now: float | None = None) -> int:
+        # emits the closed groups the rate allows, returns how many
+        now = self.clock() if now is None else now
+        while self._closing and self._closing[0][0] <= now:
+            _, sequence, key = heapq.heappop(self._closing)
+            if (group := self._current(key, sequence)) is not None:
+                heapq.heappush(self._ready, (-key[1], group.opened_at, sequence, key))
+
+        emitted = 0
+        while self._ready and self._allowed_at() <= now:
+            _, _, sequence, key = heapq.heappop(self._ready)
+            if (group := self._current(key, sequence)) is None:
+                continue
+            del self._groups[key]
+            for pending_key in group.escalations:
+                del self._pending[pending_key]
+            self._arrival = max(self._arrival, now) + self._interval
+            emitted += 1
+            self.emit(EscalationBatch(key[0], key[1], key[2], tuple(group.escalations.values()), group.opened_at, now))
+        if emitted:
+            self.stats.increment("batches.emitted", emitted)
+        if self._ready:
+            self.stats.increment("batches.throttled")
+        return emitted
+
+    def next_due(self) -> float | None:
+        # clock() time at which flush has something to emit, None while nothing is pending
+        while self._ready and self._current(self._ready[0][3], self._ready[0][2]) is None:
+            heapq.heappop(self._ready)
+        while self._closing and self._current(self._closing[0][2], self._closing[0][1]) is None:
+            heapq.heappop(self._closing)
+        due = []
+        if self._ready:
+            due.append(self._allowed_at())
+        if self._closing:
+            due.append(self._closing[0][0])
+        return min(due, default=None)
+
+    def _allowed_at(self) -> float:
+        return self._arrival - (self.rate - 1) * self._interval
+
+    def _current(self, key: tuple, sequence: int) -> _EscalationGroup | None:
+        group = self._groups.get(key)
+        return group if group is not None and group.sequence == sequence else None
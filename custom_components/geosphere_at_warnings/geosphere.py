@@ -1,17 +1,63 @@
+import abc
+import asyncio
+import bisect
+import codecs
 import datetime
+import hashlib
+import json
 import logging
+import math
+import operator
+import random
+import re
 import socket
-from dataclasses import dataclass
-from enum import IntEnum
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Self
 
 import aiohttp
-import async_timeout
-import requests
+
+if TYPE_CHECKING:
+    import numpy as np
 
 logger = logging.getLogger(__name__)
 
 BASE_URL = "https://warnungen.zamg.at/wsapp/api"
 HTTP_TIMEOUT = 15
+ATTEMPT_TIMEOUT = 6
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 4.0
+HEDGE_DELAY = 2.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+BREAKER_COOLDOWN_MAX = 600.0
+COORDINATE_PRECISION = 5
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_THRESHOLD = 1 << 20
+TEXT_POOL_SIZE = 4096
+TEXT_ID_SIZE = 8
+TRANSLATION_CACHE_SIZE = 4096
+TRANSLATION_MISS_TTL = 900.0
+DEFAULT_LANGUAGE = "de"
+WARNING_CACHE_VERSION = 1
+DEFAULT_MAX_AGE = datetime.timedelta(seconds=10)
+AREA_INDEX_CRS = "EPSG:3416"
+AREA_INDEX_CELL_SIZE = 10_000
+CONNECTION_LIMIT_PER_HOST = 4
+KEEPALIVE_TIMEOUT = 60
+DNS_CACHE_TTL = 300
+MAX_CONCURRENT_REQUESTS = 4
+PROXIMITY_CHUNK_SIZE = 1 << 20
+HISTOGRAM_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class GeosphereError(Exception):
+    pass
 
 
 class WarningLevel(IntEnum):
@@ -31,7 +77,7 @@ class WarningType(IntEnum):
     COLD = 7  # Cold warnings
 
 
-@dataclass
+@dataclass(frozen=True)
 class Location:
     latitude: float
     longitude: float
@@ -41,54 +87,347 @@ class Location:
 class ClientConfig:
     location: Location
     advanced_warning_time: datetime.timedelta
+    language: str = DEFAULT_LANGUAGE
 
 
-@dataclass
+class _TextPool:
+    """Size-bounded intern pool, so identical warning texts across areas and cycles share one string.
+
+    Texts are also content addressed: text_id hands out a short digest under which get finds the text
+    again, so entity attributes can reference texts instead of carrying them.
+    """
+
+    def __init__(self, max_size: int = TEXT_POOL_SIZE) -> None:
+        self.max_size = max_size
+        self._texts: OrderedDict[str, str] = OrderedDict()
+        self._ids: dict[str, str] = {}
+        self._by_id: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def intern(self, text: str | None) -> str | None:
+        if text is None:
+            return None
+
+        pooled = self._texts.get(text)
+        if pooled is not None:
+            self._texts.move_to_end(pooled)
+            return pooled
+
+        self._texts[text] = text
+        if len(self._texts) > self.max_size:
+            evicted, _ = self._texts.popitem(last=False)
+            if (text_id := self._ids.pop(evicted, None)) is not None:
+                del self._by_id[text_id]
+        return text
+
+    def text_id(self, text: str | None) -> str | None:
+        # digests are computed on first use only, parsing does not pay for them
+        if text is None:
+            return None
+
+        text_id = self._ids.get(text)
+        if text_id is None:
+            pooled = self.intern(text)
+            text_id = self._ids[pooled] = hashlib.blake2b(pooled.encode(), digest_size=TEXT_ID_SIZE).hexdigest()
+            self._by_id[text_id] = pooled
+        return text_id
+
+    def get(self, text_id: str) -> str | None:
+        return self._by_id.get(text_id)
+
+
+_TEXT_POOL = _TextPool()
+
+
+def get_text(text_id: str) -> str | None:
+    return _TEXT_POOL.get(text_id)
+
+
+@dataclass(frozen=True, slots=True, init=False)
 class GeosphereWarning:
     type: WarningType
     level: WarningLevel
-    begin: datetime.datetime
-    end: datetime.datetime
-    text: str | None = None
-    effects: str | None = None
-    recommendations: str | None = None
+    begin_ts: int
+    end_ts: int
+    text: str | None
+    effects: str | None
+    recommendations: str | None
+    warnid: int | None
+    chgid: int | None
+    verlaufid: int | None
+
+    def __init__(  # noqa: PLR0913
+        self,
+        type: WarningType,  # noqa: A002
+        level: WarningLevel,
+        *,
+        begin: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        text: str | None = None,
+        effects: str | None = None,
+        recommendations: str | None = None,
+        warnid: int | None = None,
+        chgid: int | None = None,
+        verlaufid: int | None = None,
+        begin_ts: int | None = None,
+        end_ts: int | None = None,
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, "type", type)
+        set_(self, "level", level)
+        set_(self, "begin_ts", begin_ts if begin_ts is not None else int(begin.timestamp()))
+        set_(self, "end_ts", end_ts if end_ts is not None else int(end.timestamp()))
+        set_(self, "text", _TEXT_POOL.intern(text))
+        set_(self, "effects", _TEXT_POOL.intern(effects))
+        set_(self, "recommendations", _TEXT_POOL.intern(recommendations))
+        set_(self, "warnid", warnid)
+        set_(self, "chgid", chgid)
+        set_(self, "verlaufid", verlaufid)
+
+    @property
+    def text_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.text)
+
+    @property
+    def effects_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.effects)
+
+    @property
+    def recommendations_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.recommendations)
+
+    @property
+    def begin(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.begin_ts, tz=datetime.UTC)
+
+    @property
+    def end(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.end_ts, tz=datetime.UTC)
 
     def is_relevant(self, advanced_warning_time: datetime.timedelta) -> bool:
-        now_ = datetime.datetime.now(tz=datetime.UTC)
+        now_ = datetime.datetime.now(tz=datetime.UTC).timestamp()
 
-        if self.end < now_:
+        if self.end_ts < now_:
             return False
-        return not self.begin > now_ + advanced_warning_time
+        return not self.begin_ts > now_ + advanced_warning_time.total_seconds()
 
     def is_current(self, advanced_warning_time: datetime.timedelta) -> bool:
-        now_ = datetime.datetime.now(tz=datetime.UTC)
+        now_ = datetime.datetime.now(tz=datetime.UTC).timestamp()
 
-        if self.end < now_:
+        if self.end_ts < now_:
             return False
-        return not self.begin > now_ + advanced_warning_time
+        return not self.begin_ts > now_ + advanced_warning_time.total_seconds()
+
+
+@dataclass(frozen=True, slots=True)
+class WarningTexts:
+    text: str | None
+    effects: str | None
+    recommendations: str | None
+
+    @classmethod
+    def of(cls, warning: GeosphereWarning) -> Self:
+        return cls(text=warning.text, effects=warning.effects, recommendations=warning.recommendations)
+
+    @property
+    def text_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.text)
+
+    @property
+    def effects_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.effects)
+
+    @property
+    def recommendations_id(self) -> str | None:
+        return _TEXT_POOL.text_id(self.recommendations)
+
+
+def texts_key(warning: GeosphereWarning) -> tuple[int | None, int | None, int | None]:
+    # texts of a warning phase only change along with its chgid
+    return (warning.warnid, warning.verlaufid, warning.chgid)
+
+
+@dataclass(frozen=True, slots=True)
+class _Relevance:
+    computed_at: float
+    valid_until: float
+    warnings: tuple[GeosphereWarning, ...]
+    highest: GeosphereWarning | None
+
+
+@dataclass(frozen=True, slots=True)
+class LocationView:
+    """What the entities of one location show, precomputed once per refresh and boundary.
+
+    levels holds the highest relevant level per WarningType in declaration order (None without a warning),
+    highest_active the highest warning in effect right now, and valid_until the epoch second from which
+    the view has to be recomputed.
+    """
+
+    levels: tuple[WarningLevel | None, ...]
+    count: int
+    highest: GeosphereWarning | None
+    highest_active: GeosphereWarning | None
+    next_begin: datetime.datetime | None
+    next_end: datetime.datetime | None
+    valid_until: float
+
+    def level(self, type_: WarningType) -> WarningLevel | None:
+        return self.levels[_TYPE_INDEX[type_]]
+
+
+_TYPE_INDEX = {type_: index for index, type_ in enumerate(WarningType)}
 
 
 @dataclass
 class GeosphereWarnings:
+    """Warnings of one area, indexed by begin so relevance queries are answered from a cache until the next boundary."""
+
     warnings: list[GeosphereWarning]
+    _by_begin: list[GeosphereWarning] = field(init=False, repr=False, compare=False)
+    _begins: list[int] = field(init=False, repr=False, compare=False)
+    _relevance: dict[float, _Relevance] = field(init=False, repr=False, compare=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._by_begin = sorted(self.warnings, key=operator.attrgetter("begin_ts"))
+        self._begins = [x.begin_ts for x in self._by_begin]
+
+    def get_relevant(self, advanced_warning_time: datetime.timedelta, now: float | None = None) -> list[GeosphereWarning]:
+        return list(self._get_relevance(advanced_warning_time, now).warnings)
 
-    def get_relevant(self, advanced_warning_time: datetime.timedelta) -> list[GeosphereWarning]:
-        return [x for x in self.warnings if x.is_relevant(advanced_warning_time=advanced_warning_time)]
+    def highest_relevant(self, advanced_warning_time: datetime.timedelta, now: float | None = None) -> GeosphereWarning | None:
+        return self._get_relevance(advanced_warning_time, now).highest
+
+    def next_boundary(self, advanced_warning_time: datetime.timedelta, now: float | None = None) -> float:
+        # epoch seconds at which the relevant warnings change next, math.inf if they never do
+        return self._get_relevance(advanced_warning_time, now).valid_until
 
     def has_warnings(self) -> bool:
         return len(self.warnings) > 0
 
+    def view(self, advanced_warning_time: datetime.timedelta, now: float | None = None) -> LocationView:
+        if now is None:
+            now = datetime.datetime.now(tz=datetime.UTC).timestamp()
+        relevance = self._get_relevance(advanced_warning_time, now)
+
+        levels: list[WarningLevel | None] = [None] * len(_TYPE_INDEX)
+        highest_active = None
+        next_end = math.inf
+        for warning in relevance.warnings:
+            index = _TYPE_INDEX[warning.type]
+            if levels[index] is None or warning.level > levels[index]:
+                levels[index] = warning.level
+            if warning.begin_ts <= now:
+                next_end = min(next_end, warning.end_ts)
+                if highest_active is None or warning.level > highest_active.level:
+                    highest_active = warning
+
+        upcoming = bisect.bisect_right(self._begins, now)
+        next_begin = self._begins[upcoming] if upcoming < len(self._begins) else math.inf
+        return LocationView(
+            levels=tuple(levels),
+            count=len(relevance.warnings),
+            highest=relevance.highest,
+            highest_active=highest_active,
+            next_begin=_from_timestamp(next_begin),
+            next_end=_from_timestamp(next_end),
+            valid_until=min(relevance.valid_until, next_begin),
+        )
+
+    def _get_relevance(self, advanced_warning_time: datetime.timedelta, now: float | None) -> _Relevance:
+        if now is None:
+            now = datetime.datetime.now(tz=datetime.UTC).timestamp()
+        advance = advanced_warning_time.total_seconds()
+
+        relevance = self._relevance.get(advance)
+        if relevance is not None and relevance.computed_at <= now < relevance.valid_until:
+            return relevance
+
+        # warnings begin in order, so everything beginning after the horizon is cut off by bisection
+        candidates = bisect.bisect_right(self._begins, now + advance)
+        warnings = tuple(x for x in self._by_begin[:candidates] if x.end_ts >= now)
+
+        valid_until = min((math.nextafter(x.end_ts, math.inf) for x in warnings), default=math.inf)
+        if candidates < len(self._begins):
+            valid_until = min(valid_until, self._begins[candidates] - advance)
+
+        relevance = self._relevance[advance] = _Relevance(
+            computed_at=now,
+            valid_until=valid_until,
+            warnings=warnings,
+            highest=max(warnings, key=operator.attrgetter("level"), default=None),
+        )
+        return relevance
+
+
+def register_texts(warnings: GeosphereWarnings, translations: Iterable[WarningTexts] = ()) -> None:
+    # makes the texts of warnings and their translations resolvable by get_text again, after they left the bounded pool
+    for warning in warnings.warnings:
+        for text in (warning.text, warning.effects, warning.recommendations):
+            _TEXT_POOL.text_id(text)
+    for texts in translations:
+        for text in (texts.text, texts.effects, texts.recommendations):
+            _TEXT_POOL.text_id(text)
+
+
+def _from_timestamp(timestamp: float) -> datetime.datetime | None:
+    return None if timestamp == math.inf else datetime.datetime.fromtimestamp(timestamp, tz=datetime.UTC)
+
+
+class WarningChange(Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+    ESCALATED = "escalated"
+    UPDATED = "updated"
+
+
+@dataclass(frozen=True, slots=True)
+class WarningEvent:
+    change: WarningChange
+    warning: GeosphereWarning
+    previous: GeosphereWarning | None = None
+
+
+def warning_key(warning: GeosphereWarning) -> tuple:
+    # the phases of one warning share its warnid and are told apart by verlaufid
+    if warning.warnid is None:
+        return (None, warning.type, warning.begin_ts)
+    return (warning.warnid, warning.verlaufid)
+
+
+def diff_warnings(old: GeosphereWarnings | None, new: GeosphereWarnings) -> list[WarningEvent]:
+    if old is new or old is None:
+        return []
+
+    previous = {warning_key(x): x for x in old.warnings}
+    events = []
+    for warning in new.warnings:
+        before = previous.pop(warning_key(warning), None)
+        if before is None:
+            events.append(WarningEvent(WarningChange.ADDED, warning))
+        elif warning.level > before.level:
+            events.append(WarningEvent(WarningChange.ESCALATED, warning, before))
+        elif (warning.chgid, warning.level, warning.begin_ts, warning.end_ts) != (before.chgid, before.level, before.begin_ts, before.end_ts):
+            events.append(WarningEvent(WarningChange.UPDATED, warning, before))
+    events.extend(WarningEvent(WarningChange.REMOVED, warning) for warning in previous.values())
+    return events
+
 
 def _parse_warning(data: dict) -> GeosphereWarning:
     properties = data["properties"]
     return GeosphereWarning(
         type=WarningType(properties["rawinfo"]["wtype"]),
         level=WarningLevel(properties["rawinfo"]["wlevel"]),
-        begin=datetime.datetime.fromtimestamp(int(properties["rawinfo"]["start"]), tz=datetime.UTC),
-        end=datetime.datetime.fromtimestamp(int(properties["rawinfo"]["end"]), tz=datetime.UTC),
+        begin_ts=int(properties["rawinfo"]["start"]),
+        end_ts=int(properties["rawinfo"]["end"]),
         text=properties.get("text"),
         effects=properties.get("auswirkungen"),
         recommendations=properties.get("empfehlungen"),
+        warnid=properties.get("warnid"),
+        chgid=properties.get("chgid"),
+        verlaufid=properties.get("verlaufid"),
     )
 
 
@@ -106,8 +445,11 @@ def get_relevant_warnings(location: Location) -> GeosphereWarnings:
 
 
 def _fetch_data(location: Location) -> dict:
+    # blocking client for scripts only, imported on use so loading the module on the event loop stays cheap
+    import requests  # noqa: PLC0415
+
     response = requests.get(
-        f"{BASE_URL}/getWarningsForCoords?lat={location.latitude}&lon={location.longitude}&lang=de",
+        f"{BASE_URL}/getWarningsForCoords?lat={location.latitude}&lon={location.longitude}&lang={DEFAULT_LANGUAGE}",
         timeout=5,
     )
 
@@ -116,31 +458,1254 @@ def _fetch_data(location: Location) -> dict:
     return response.json()
 
 
-class Client:
-    def __init__(self, config: ClientConfig, session: aiohttp.ClientSession) -> None:
-        self.config = config
+def _parse_area(data: dict) -> int | None:
+    return data.get("properties", {}).get("location", {}).get("properties", {}).get("gemeindenr")
+
+
+@dataclass
+class _Feature:
+    area: int | None
+    geometry: dict | None
+    warnings: list[GeosphereWarning]
+
+
+def _parse_feature(data: dict) -> _Feature:
+    return _Feature(area=_parse_area(data), geometry=data.get("geometry"), warnings=_parse_data(data))
+
+
+# Snapshots are FeatureCollections of per-municipality features, each shaped like a getWarningsForCoords response.
+def _parse_snapshot(data: dict) -> list[_Feature]:
+    return [feature for feature in map(_parse_feature, data.get("features", [])) if feature.area is not None]
+
+
+def _signature(warnings: list[GeosphereWarning]) -> tuple[tuple[int | None, int | None, int | None], ...]:
+    return tuple((x.warnid, x.chgid, x.verlaufid) for x in warnings)
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+# Inside a container only its own brackets and string delimiters matter; everything else is skipped by the regex engine.
+_CONTAINER_TOKENS = {"{": re.compile(r'[{}"]'), "[": re.compile(r'[\[\]"]')}
+
+
+class _Action(IntEnum):
+    SKIP = 0
+    CAPTURE = 1
+    DESCEND = 2
+
+
+@dataclass
+class _Frame:
+    kind: str
+    path: tuple
+    state: str
+    index: int = 0
+    key: str | None = None
+
+
+@dataclass
+class _Value:
+    path: tuple
+    action: _Action
+    kind: str
+    start: int
+    depth: int = 1
+    in_string: bool = False
+
+
+class _StreamingJsonParser(abc.ABC):
+    """Incremental JSON scanner that only materialises the values selected by _action.
+
+    Bodies up to STREAM_THRESHOLD bytes are decoded by json.loads in one go and handed to _on_document,
+    which is several times faster than scanning them. Larger ones are scanned as they arrive: descended
+    containers are walked token by token, captured values are handed to _on_value as raw text and
+    skipped values are passed over without building any objects.
+    """
+
+    def __init__(self) -> None:
+        self._body: bytearray | None = bytearray()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        # text of the captured value scanned in earlier chunks, so each chunk is copied once
+        self._parts: list[str] = []
+        self._position = 0
+        self._stack: list[_Frame] = []
+        self._value: _Value | None = None
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self._body is not None:
+            self._body += chunk
+            if len(self._body) <= STREAM_THRESHOLD:
+                return
+            chunk, self._body = bytes(self._body), None
+
+        value = self._value
+        if value is not None and value.action == _Action.CAPTURE:
+            self._parts.append(self._buffer[value.start : self._position])
+            value.start = 0
+        self._buffer = self._buffer[self._position :] + self._decoder.decode(chunk)
+        self._position = 0
+        self._advance()
+
+    def close(self) -> None:
+        if self._body is not None:
+            self._on_document(json.loads(self._body))
+            return
+
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._value is not None and self._value.kind == "scalar":
+            self._position = len(self._buffer)
+            self._finish_value()
+        self._advance()
+        if not self._done:
+            msg = "Incomplete JSON document"
+            raise ValueError(msg)
+
+    @abc.abstractmethod
+    def _action(self, path: tuple) -> _Action: ...
+
+    @abc.abstractmethod
+    def _on_value(self, path: tuple, raw: str) -> None: ...
+
+    @abc.abstractmethod
+    def _on_document(self, data: Any) -> None: ...  # noqa: ANN401
+
+    def _on_end(self, path: tuple) -> None:  # noqa: B027
+        # optional hook, called when a descended container closed
+        pass
+
+    def _advance(self) -> None:  # noqa: C901, PLR0912
+        buffer = self._buffer
+        while True:
+            if self._value is not None:
+                if not self._scan_value():
+                    return
+                self._finish_value()
+                continue
+
+            self._position = _WHITESPACE.match(buffer, self._position).end()
+            if self._position >= len(buffer) or self._done:
+                return
+            char = buffer[self._position]
+
+            if not self._stack:
+                self._begin_value(())
+                continue
+
+            frame = self._stack[-1]
+            if frame.state == "end_or_comma":
+                self._position += 1
+                if char == ",":
+                    frame.state = "key" if frame.kind == "{" else "value"
+                else:
+                    self._end_container()
+            elif char in "}]" and frame.state == "first":
+                self._position += 1
+                self._end_container()
+            elif frame.kind == "[":
+                self._begin_value((*frame.path, frame.index))
+                frame.index += 1
+            elif frame.state in {"first", "key"}:
+                closed, end = self._string_end(self._position + 1)
+                if not closed:
+                    return
+                frame.key = json.loads(buffer[self._position : end])
+                frame.state = "colon"
+                self._position = end
+            elif frame.state == "colon":
+                self._position += 1
+                frame.state = "value"
+            else:
+                self._begin_value((*frame.path, frame.key))
+
+    def _string_end(self, position: int) -> tuple[bool, int]:
+        # (True, after the closing quote) or (False, where scanning resumes once more data arrived)
+        while (match := _STRING_END.search(self._buffer, position)) is not None:
+            if match.group() == '"':
+                return True, match.end()
+            if match.end() >= len(self._buffer):
+                return False, match.start()
+            position = match.end() + 1
+        return False, len(self._buffer)
+
+    def _begin_value(self, path: tuple) -> None:
+        char = self._buffer[self._position]
+        action = self._action(path)
+        if self._stack:
+            self._stack[-1].state = "end_or_comma"
+
+        if action == _Action.DESCEND and char in "{[":
+            self._stack.append(_Frame(kind=char, path=path, state="first"))
+            self._position += 1
+            return
+
+        action = _Action.SKIP if action == _Action.DESCEND else action
+        if char in "{[":
+            self._value = _Value(path=path, action=action, kind=char, start=self._position)
+            self._position += 1
+        elif char == '"':
+            self._value = _Value(path=path, action=action, kind='"', start=self._position, in_string=True)
+            self._position += 1
+        else:
+            self._value = _Value(path=path, action=action, kind="scalar", start=self._position)
+
+    def _scan_value(self) -> bool:
+        value = self._value
+        buffer = self._buffer
+        if value.kind == "scalar":
+            match = _SCALAR_END.search(buffer, self._position)
+            self._position = len(buffer) if match is None else match.start()
+            return match is not None
+
+        pattern = _CONTAINER_TOKENS.get(value.kind)
+        while True:
+            if value.in_string:
+                closed, self._position = self._string_end(self._position)
+                if not closed:
+                    return False
+                value.in_string = False
+                if pattern is None:
+                    return True
+                continue
+
+            match = pattern.search(buffer, self._position)
+            if match is None:
+                self._position = len(buffer)
+                return False
+            self._position = match.end()
+            char = match.group()
+            if char == '"':
+                value.in_string = True
+            elif char == value.kind:
+                value.depth += 1
+            else:
+                value.depth -= 1
+                if value.depth == 0:
+                    return True
+
+    def _finish_value(self) -> None:
+        value = self._value
+        self._value = None
+        if value.action == _Action.CAPTURE:
+            raw = "".join((*self._parts, self._buffer[value.start : self._position]))
+            self._parts.clear()
+            self._on_value(value.path, raw)
+        if not self._stack:
+            self._done = True
+
+    def _end_container(self) -> None:
+        frame = self._stack.pop()
+        self._on_end(frame.path)
+        if not self._stack:
+            self._done = True
+
+
+class _FeatureStreamParser(_StreamingJsonParser):
+    """Streams getWarningsForCoords responses (collection=False) or snapshots (collection=True) into _Feature records.
+
+    Warnings are built as soon as each one has been received. Geometries are kept as raw text until their feature is
+    complete and are only decoded when keep_geometry asks for them.
+    """
+
+    def __init__(self, *, collection: bool = False, keep_geometry: Callable[[int | None], bool] = lambda _: False) -> None:
+        super().__init__()
+        self.collection = collection
+        self.keep_geometry = keep_geometry
+        self.features: list[_Feature] = []
+        self._geometry: str | None = None
+        self._feature = _Feature(area=None, geometry=None, warnings=[])
+
+    def _relative_path(self, path: tuple) -> tuple | None:
+        if not self.collection:
+            return path
+        if len(path) < 2 or path[0] != "features":  # noqa: PLR2004
+            return None
+        return path[2:]
+
+    def _action(self, path: tuple) -> _Action:
+        if self.collection and path in {(), ("features",)}:
+            return _Action.DESCEND
+
+        match self._relative_path(path):
+            case () | ("properties",) | ("properties", "warnings"):
+                return _Action.DESCEND
+            case ("geometry",) | ("properties", "location") | ("properties", "warnings", int()):
+                return _Action.CAPTURE
+        return _Action.SKIP
+
+    def _on_value(self, path: tuple, raw: str) -> None:
+        match self._relative_path(path):
+            case ("geometry",):
+                self._geometry = raw
+            case ("properties", "location"):
+                self._feature.area = json.loads(raw).get("properties", {}).get("gemeindenr")
+            case ("properties", "warnings", int()):
+                self._feature.warnings.append(_parse_warning(json.loads(raw)))
+
+    def _on_document(self, data: dict) -> None:
+        for feature in map(_parse_feature, data.get("features", []) if self.collection else [data]):
+            if feature.geometry is not None and not self.keep_geometry(feature.area):
+                feature.geometry = None
+            if feature.area is not None or not self.collection:
+                self.features.append(feature)
+
+    def _on_end(self, path: tuple) -> None:
+        if self._relative_path(path) != ():
+            return
+
+        feature = self._feature
+        if self._geometry is not None and self.keep_geometry(feature.area):
+            feature.geometry = json.loads(self._geometry)
+        if feature.area is not None or not self.collection:
+            self.features.append(feature)
+        self._geometry = None
+        self._feature = _Feature(area=None, geometry=None, warnings=[])
+
+
+def _location_key(location: Location) -> tuple[float, float]:
+    return round(location.latitude, COORDINATE_PRECISION), round(location.longitude, COORDINATE_PRECISION)
+
+
+@dataclass(frozen=True)
+class _LambertConformalConicParameters:
+    semi_major_axis: float
+    flattening: float
+    latitude_of_origin: float
+    central_meridian: float
+    standard_parallel_1: float
+    standard_parallel_2: float
+    false_easting: float
+    false_northing: float
+
+
+class _LambertConformalConic:
+    """Ellipsoidal Lambert conformal conic projection with two standard parallels (EPSG method 9802)."""
+
+    def __init__(self, parameters: _LambertConformalConicParameters) -> None:
+        self.e = math.sqrt(2 * parameters.flattening - parameters.flattening**2)
+        self.central_meridian = math.radians(parameters.central_meridian)
+        self.false_easting = parameters.false_easting
+        self.false_northing = parameters.false_northing
+
+        phi_1 = math.radians(parameters.standard_parallel_1)
+        phi_2 = math.radians(parameters.standard_parallel_2)
+        m_1 = self._m(phi_1)
+        m_2 = self._m(phi_2)
+        t_1 = self._t(phi_1)
+        t_2 = self._t(phi_2)
+        self.n = (math.log(m_1) - math.log(m_2)) / (math.log(t_1) - math.log(t_2))
+        self.a_f = parameters.semi_major_axis * m_1 / (self.n * t_1**self.n)
+        self.r_0 = self.a_f * self._t(math.radians(parameters.latitude_of_origin)) ** self.n
+
+    def _m(self, phi: float) -> float:
+        return math.cos(phi) / math.sqrt(1 - (self.e * math.sin(phi)) ** 2)
+
+    def _t(self, phi: float) -> float:
+        e_sin = self.e * math.sin(phi)
+        return math.tan(math.pi / 4 - phi / 2) / ((1 - e_sin) / (1 + e_sin)) ** (self.e / 2)
+
+    def project(self, location: Location) -> tuple[float, float]:
+        r = self.a_f * self._t(math.radians(location.latitude)) ** self.n
+        theta = self.n * (math.radians(location.longitude) - self.central_meridian)
+        return self.false_easting + r * math.sin(theta), self.false_northing + self.r_0 - r * math.cos(theta)
+
+
+# Austria Lambert on ETRS89, which matches WGS84 within a metre. Warning geometries are delivered in this grid.
+AUSTRIA_LAMBERT = _LambertConformalConic(
+    _LambertConformalConicParameters(
+        semi_major_axis=6378137.0,
+        flattening=1 / 298.257222101,
+        latitude_of_origin=47.5,
+        central_meridian=13 + 20 / 60,
+        standard_parallel_1=49.0,
+        standard_parallel_2=46.0,
+        false_easting=400_000.0,
+        false_northing=400_000.0,
+    ),
+)
+
+_Ring = list[tuple[float, float]]
+_BoundingBox = tuple[float, float, float, float]
+
+
+def _parse_rings(geometry: dict) -> list[_Ring]:
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [[(float(x), float(y)) for x, y, *_ in ring] for polygon in polygons for ring in polygon]
+
+
+def _ring_contains(ring: _Ring, x: float, y: float) -> bool:
+    inside = False
+    x_1, y_1 = ring[-1]
+    for x_2, y_2 in ring:
+        if (y_1 > y) != (y_2 > y) and x < (x_2 - x_1) * (y - y_1) / (y_2 - y_1) + x_1:
+            inside = not inside
+        x_1, y_1 = x_2, y_2
+    return inside
+
+
+class AreaIndex:
+    """Municipality polygons bucketed on a grid of bounding boxes, resolving coordinates to a gemeindenr without a request."""
+
+    def __init__(self, cell_size: int = AREA_INDEX_CELL_SIZE, projection: _LambertConformalConic = AUSTRIA_LAMBERT) -> None:
+        self.cell_size = cell_size
+        self.projection = projection
+        self._rings: dict[int, list[_Ring]] = {}
+        self._bounding_boxes: dict[int, _BoundingBox] = {}
+        self._grid: dict[tuple[int, int], list[int]] = {}
+
+    def __contains__(self, area: int) -> bool:
+        return area in self._rings
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+    def rings(self, area: int) -> list[_Ring]:
+        return self._rings.get(area, [])
+
+    def add(self, area: int, geometry: dict) -> bool:
+        if area in self._rings:
+            return False
+        rings = _parse_rings(geometry)
+        if not rings:
+            return False
+
+        xs = [x for ring in rings for x, _ in ring]
+        ys = [y for ring in rings for _, y in ring]
+        bounding_box = (min(xs), min(ys), max(xs), max(ys))
+        self._rings[area] = rings
+        self._bounding_boxes[area] = bounding_box
+        for cell in self._cells(bounding_box):
+            self._grid.setdefault(cell, []).append(area)
+        return True
+
+    def lookup(self, location: Location) -> int | None:
+        x, y = self.projection.project(location)
+        for area in self._grid.get((int(x // self.cell_size), int(y // self.cell_size)), ()):
+            min_x, min_y, max_x, max_y = self._bounding_boxes[area]
+            if not (min_x <= x <= max_x and min_y <= y <= max_y):
+                continue
+            if sum(_ring_contains(ring, x, y) for ring in self._rings[area]) % 2 == 1:
+                return area
+        return None
+
+    def _cells(self, bounding_box: _BoundingBox) -> list[tuple[int, int]]:
+        min_x, min_y, max_x, max_y = (int(value // self.cell_size) for value in bounding_box)
+        return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+    def as_dict(self) -> dict:
+        return {
+            "crs": AREA_INDEX_CRS,
+            "areas": {str(area): [[list(point) for point in ring] for ring in rings] for area, rings in self._rings.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Self:
+        index = cls()
+        if data.get("crs") != AREA_INDEX_CRS:
+            return index
+        for area, rings in data.get("areas", {}).items():
+            index.add(int(area), {"type": "Polygon", "coordinates": rings})
+        return index
+
+
+@dataclass(frozen=True, slots=True)
+class Proximity:
+    distances: dict[int, float]
+    highest: WarningLevel | None
+
+
+def nearby_warnings(locations: Iterable[Location], areas: Mapping[int, GeosphereWarnings], index: AreaIndex, radius: float, now: float | None = None) -> dict[Location, Proximity]:
+    # warned areas within radius metres of every location, computed for all of them in one pass: distances
+    # maps each to the distance from its boundary (0 inside), highest is the level of the warnings not yet
+    # ended among them. Only areas with geometry in the index are considered.
+    now_ = now if now is not None else time.time()
+    unique = list(dict.fromkeys(locations))
+    levels = {}
+    for area, warnings in areas.items():
+        level = max((warning.level for warning in warnings.warnings if warning.end_ts > now_), default=None)
+        if level is not None and index.rings(area):
+            levels[area] = level
+    if not unique or not levels:
+        return {location: Proximity(distances={}, highest=None) for location in unique}
+
+    # only this batch computation needs NumPy, the integration loads without it
+    import numpy as np  # noqa: PLC0415
+
+    area_ids = list(levels)
+    distances = _boundary_distances(np.asarray([index.projection.project(location) for location in unique]), [index.rings(area) for area in area_ids], radius)
+    nearby = distances <= radius
+    highest = np.where(nearby, np.asarray([levels[area] for area in area_ids]), 0).max(axis=1)
+    return {
+        location: Proximity(
+            distances={area_ids[column]: float(distances[row, column]) for column in np.flatnonzero(nearby[row])},
+            highest=WarningLevel(int(highest[row])) if highest[row] else None,
+        )
+        for row, location in enumerate(unique)
+    }
+
+
+def _boundary_distances(points: "np.ndarray", areas: list[list[_Ring]], radius: float) -> "np.ndarray":  # noqa: PLR0914
+    # points x areas matrix of distances to the area boundaries, 0 inside and inf where the bounding box
+    # alone is farther than radius. One pass over the bounding boxes of all areas selects the points to
+    # evaluate per area, whose distances to its edges are then computed PROXIMITY_CHUNK_SIZE pairs at a time.
+    import numpy as np  # noqa: PLC0415
+
+    edges = []
+    for area in areas:
+        starts = np.concatenate([np.asarray(ring, dtype=float) for ring in area])
+        edges.append((starts, np.concatenate([np.roll(np.asarray(ring, dtype=float), -1, axis=0) for ring in area]) - starts))
+    minima = np.asarray([starts.min(axis=0) for starts, _ in edges])
+    maxima = np.asarray([(starts + deltas).max(axis=0) for starts, deltas in edges])
+    outside = np.maximum(np.maximum(minima - points[:, None, :], points[:, None, :] - maxima), 0.0)
+    candidates = np.hypot(outside[..., 0], outside[..., 1]) <= radius
+
+    distances = np.full((len(points), len(areas)), np.inf)
+    for column, (starts, deltas) in enumerate(edges):
+        a_x, a_y = starts.T
+        d_x, d_y = deltas.T
+        length_2 = np.where((d_x == 0) & (d_y == 0), 1.0, d_x * d_x + d_y * d_y)
+        safe_d_y = np.where(d_y == 0, 1.0, d_y)
+        rows = np.flatnonzero(candidates[:, column])
+        chunk = max(1, PROXIMITY_CHUNK_SIZE // len(a_x))
+        for first in range(0, len(rows), chunk):
+            selected = rows[first : first + chunk]
+            p_x, p_y = points[selected, 0:1], points[selected, 1:2]
+            t = np.clip(((p_x - a_x) * d_x + (p_y - a_y) * d_y) / length_2, 0.0, 1.0)
+            distance_2 = ((a_x + t * d_x - p_x) ** 2 + (a_y + t * d_y - p_y) ** 2).min(axis=1)
+            # even-odd rule over all rings of the area, as AreaIndex.lookup does
+            crossings = ((a_y > p_y) != (a_y + d_y > p_y)) & (p_x < d_x * (p_y - a_y) / safe_d_y + a_x)
+            inside = crossings.sum(axis=1) % 2 == 1
+            distances[selected, column] = np.where(inside, 0.0, np.sqrt(distance_2))
+    return distances
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "maximum", "total")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, quantile: float) -> float | None:
+        # upper bound of the bucket holding the quantile, the maximum for the overflow bucket
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BOUNDS, self.buckets, strict=False):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.maximum,
+            "buckets": dict(zip([*map(str, HISTOGRAM_BOUNDS), "inf"], self.buckets, strict=True)),
+        }
+
+
+class Stats:
+    """Counters and latency histograms (seconds), cheap enough to stay enabled on the hot path."""
+
+    def __init__(self) -> None:
+        self.counters: Counter[str] = Counter()
+        self.histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def total(self, prefix: str) -> int:
+        return sum(value for name, value in self.counters.items() if name.startswith(prefix))
+
+    def as_dict(self) -> dict:
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "histograms": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+        }
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = RETRY_ATTEMPTS
+    backoff: float = RETRY_BACKOFF
+    backoff_max: float = RETRY_BACKOFF_MAX
+    attempt_timeout: float = ATTEMPT_TIMEOUT
+    total_timeout: float = HTTP_TIMEOUT
+    hedge_delay: float | None = HEDGE_DELAY
+    breaker_threshold: int = BREAKER_THRESHOLD
+    breaker_cooldown: float = BREAKER_COOLDOWN
+    breaker_cooldown_max: float = BREAKER_COOLDOWN_MAX
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class _CircuitBreaker:
+    # opens after breaker_threshold consecutive failures; once the cooldown passed a single probe is let
+    # through, its failure reopens the breaker with a doubled cooldown
+    def __init__(self, policy: RetryPolicy) -> None:
+        self.policy = policy
+        self.failures = 0
+        self.cooldown = policy.breaker_cooldown
+        self.open_until = 0.0
+        self.probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self.failures < self.policy.breaker_threshold:
+            return CircuitState.CLOSED
+        if self.probing or time.monotonic() >= self.open_until:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN or self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.cooldown = self.policy.breaker_cooldown
+        self.probing = False
+
+    def record_failure(self) -> bool:
+        self.failures += 1
+        if self.failures < self.policy.breaker_threshold:
+            return False
+        if self.probing:
+            self.cooldown = min(self.cooldown * 2, self.policy.breaker_cooldown_max)
+        self.probing = False
+        self.open_until = time.monotonic() + self.cooldown
+        return True
+
+
+def _is_retryable_status(status: int) -> bool:
+    return status >= HTTPStatus.INTERNAL_SERVER_ERROR or status in {HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS}
+
+
+class HubUpdate(Enum):
+    INDEX = "index"
+    RESULTS = "results"
+
+
+@dataclass(frozen=True)
+class CachedWarnings:
+    warnings: GeosphereWarnings
+    fetched_at: datetime.datetime
+
+
+class _FetchResult(Enum):
+    NOT_MODIFIED = "not_modified"
+
+
+@dataclass
+class _AreaResult:
+    fetched_at: float
+    warnings: GeosphereWarnings
+    signature: tuple[tuple[int, int, int], ...]
+    stale: bool = False
+
+
+@dataclass
+class _Snapshot:
+    fetched_at: float
+    areas: dict[int, _AreaResult]
+    no_warnings: GeosphereWarnings
+    stale: bool = False
+
+
+def create_session() -> aiohttp.ClientSession:
+    # a dedicated pool for the GeoSphere endpoint, keeping connections and resolved addresses between polls
+    connector = aiohttp.TCPConnector(limit_per_host=CONNECTION_LIMIT_PER_HOST, keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL)
+    return aiohttp.ClientSession(connector=connector)
+
+
+class Hub:
+    """Fetch layer shared by all clients, deduplicating requests per coordinate and municipality.
+
+    While upstream is unchanged the hub hands out the same GeosphereWarnings object, so consumers
+    can detect changes by identity. Without a session the hub creates its own and closes it in
+    async_close.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        session: aiohttp.ClientSession | None = None,
+        max_age: datetime.timedelta = DEFAULT_MAX_AGE,
+        index: AreaIndex | None = None,
+        on_update: Callable[[HubUpdate], None] | None = None,
+        snapshot_url: str | None = None,
+        *,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        start_jitter: datetime.timedelta = datetime.timedelta(0),
+        retry_policy: RetryPolicy | None = None,
+    ) -> None:
         self.session = session
+        self._owns_session = session is None
+        self.max_age = max_age
+        self.index = index if index is not None else AreaIndex()
+        self.on_update = on_update
+        self.snapshot_url = snapshot_url
+        self.start_jitter = start_jitter
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._breakers: dict[str, _CircuitBreaker] = {}
+        self._areas: dict[tuple[float, float], int] = {}
+        self._results: dict[tuple, _AreaResult] = {}
+        self._snapshot: _Snapshot | None = None
+        self._validators: dict[str, dict[str, str]] = {}
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+        self._texts: OrderedDict[tuple, WarningTexts] = OrderedDict()
+        self._missing_texts: OrderedDict[tuple, float] = OrderedDict()
+        self.stats = Stats()
 
-    async def async_get_data(self) -> dict[str, GeosphereWarnings]:
-        data = await self._fetch_data()
+    async def async_get_warnings(self, location: Location, *, jitter: bool = False) -> GeosphereWarnings | None:
+        # jitter delays the start of a network fetch by up to start_jitter, meant for scheduled polls only
+        if self.snapshot_url is not None:
+            return await self._async_get_snapshot_warnings(location, jitter=jitter)
+
+        key = self._request_key(location)
+
+        result = self._results.get(key)
+        if result is not None and self._is_fresh(result.fetched_at):
+            self.stats.increment("cache.hit")
+            return result.warnings
+
+        self.stats.increment("cache.miss")
+        warnings = await self._async_shared(key, lambda: self._async_fetch(location, jitter=jitter))
+        if warnings is None and result is not None:
+            self.stats.increment("stale.served")
+            return result.warnings
+        return warnings
+
+    def ingest(self, data: dict) -> set[int]:
+        # warnings delivered by a relay instead of polled, as a getWarningsForCoords response or snapshot;
+        # returns the areas updated. Features without an area cannot be matched to locations and are skipped.
+        features = _parse_snapshot(data) if data.get("type") == "FeatureCollection" else [_parse_feature(data)]
+        if self.snapshot_url is not None and self._snapshot is None:
+            # areas missing from a snapshot have no warnings, so pushes wait for the first complete one
+            self.stats.increment("ingest.ignored", len(features))
+            return set()
+
+        now_ = time.time()
+        areas = set()
+        for feature in features:
+            if feature.area is None:
+                self.stats.increment("ingest.ignored")
+                continue
+            self._add_to_index(feature)
+            if self._snapshot is not None:
+                self._snapshot.areas[feature.area] = self._merge_result(self._snapshot.areas.get(feature.area), feature, now_)
+            else:
+                key = ("area", feature.area)
+                self._results[key] = self._merge_result(self._results.get(key), feature, now_)
+            areas.add(feature.area)
+        if areas:
+            # pushes may cover a few areas only, so the snapshot keeps its own age and pushed areas are fresh on their own
+            self.stats.increment("ingest.areas", len(areas))
+            self._notify(HubUpdate.RESULTS)
+        return areas
+
+    async def async_get_texts(self, location: Location, warnings: GeosphereWarnings, language: str) -> dict[tuple, WarningTexts]:
+        # texts of the warnings in language by texts_key; the warnings carry DEFAULT_LANGUAGE texts themselves
+        if language == DEFAULT_LANGUAGE:
+            return {}
+
+        now_ = time.time()
+        if any(self._wants_texts((language, *texts_key(warning)), now_) for warning in warnings.warnings):
+            self.stats.increment("texts.miss")
+            key = ("texts", language) if self.snapshot_url is not None else ("texts", language, *self._request_key(location))
+            fetched_at = await self._async_shared(key, lambda: self._async_fetch_texts(location, language))
+            if fetched_at is not None:
+                # the feeds of other languages lag behind at times, texts they lack are not requested again
+                # for every poll but after TRANSLATION_MISS_TTL, or right away once the warning changed
+                self._record_missing_texts([(language, *texts_key(warning)) for warning in warnings.warnings], fetched_at)
+        else:
+            self.stats.increment("texts.hit")
+
+        texts = {}
+        for warning in warnings.warnings:
+            cache_key = (language, *texts_key(warning))
+            if (cached := self._texts.get(cache_key)) is not None:
+                self._texts.move_to_end(cache_key)
+                texts[texts_key(warning)] = cached
+        return texts
+
+    def _wants_texts(self, cache_key: tuple, now_: float) -> bool:
+        if cache_key in self._texts:
+            return False
+        missed_at = self._missing_texts.get(cache_key)
+        return missed_at is None or now_ - missed_at >= TRANSLATION_MISS_TTL
+
+    def _record_missing_texts(self, cache_keys: list[tuple], fetched_at: float) -> None:
+        for cache_key in cache_keys:
+            if cache_key not in self._texts:
+                self.stats.increment("texts.missing")
+                self._missing_texts[cache_key] = fetched_at
+                self._missing_texts.move_to_end(cache_key)
+        while len(self._missing_texts) > TRANSLATION_CACHE_SIZE:
+            self._missing_texts.popitem(last=False)
+
+    async def async_get_warnings_many(self, locations: Iterable[Location]) -> dict[Location, GeosphereWarnings | None]:
+        # one call for many coordinates: duplicates are requested once, locations sharing a municipality
+        # or the snapshot share a request and the semaphore bounds how many run at once
+        unique = list(dict.fromkeys(locations))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.async_get_warnings(location) for location in unique))
+        self.stats.observe("get_many", time.perf_counter() - started)
+        return dict(zip(unique, results, strict=True))
+
+    async def async_close(self) -> None:
+        # fetches are shielded from their callers, so they are cancelled here before they could open a new session
+        in_flight = list(self._in_flight.values())
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.async_close()
+
+    async def _async_get_snapshot_warnings(self, location: Location, *, jitter: bool) -> GeosphereWarnings | None:
+        # an area is fresh while the snapshot is or, when pushed since, while its own result is
+        result = self._snapshot.areas.get(self.area_of(location)) if self._snapshot is not None else None
+        if self._snapshot is not None and (self._is_fresh(self._snapshot.fetched_at) or (result is not None and self._is_fresh(result.fetched_at))):
+            self.stats.increment("cache.hit")
+        else:
+            self.stats.increment("cache.miss")
+            await self._async_shared(("snapshot",), lambda: self._async_fetch_snapshot(jitter=jitter))
+            if self._snapshot is None:
+                return None
+            result = self._snapshot.areas.get(self.area_of(location))
+
+        return result.warnings if result is not None else self._snapshot.no_warnings
+
+    def get_cached(self, location: Location) -> CachedWarnings | None:
+        # last known warnings regardless of their age, without a request
+        if self._snapshot is not None:
+            result = self._snapshot.areas.get(self.area_of(location))
+            if result is None:
+                return CachedWarnings(warnings=self._snapshot.no_warnings, fetched_at=datetime.datetime.fromtimestamp(self._snapshot.fetched_at, tz=datetime.UTC))
+            # a pushed area is newer than the snapshot, an area of a revalidated snapshot as new as the snapshot
+            return CachedWarnings(warnings=result.warnings, fetched_at=datetime.datetime.fromtimestamp(max(result.fetched_at, self._snapshot.fetched_at), tz=datetime.UTC))
+        result = self._results.get(self._request_key(location))
+        if result is None:
+            return None
+        return CachedWarnings(warnings=result.warnings, fetched_at=datetime.datetime.fromtimestamp(result.fetched_at, tz=datetime.UTC))
+
+    def warned_areas(self) -> dict[int, GeosphereWarnings]:
+        # last known warnings of every municipality seen so far that has any; all of Austria in snapshot mode
+        results = self._snapshot.areas.items() if self._snapshot is not None else ((key[1], result) for key, result in self._results.items() if key[0] == "area")
+        return {area: result.warnings for area, result in results if result.warnings.has_warnings()}
+
+    @property
+    def covers_all_areas(self) -> bool:
+        # whether warned_areas holds every municipality of Austria, which only a loaded snapshot does
+        return self._snapshot is not None
+
+    @property
+    def circuit_states(self) -> dict[str, CircuitState]:
+        return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
+    def is_stale(self, location: Location) -> bool:
+        # whether the last refresh for the location failed and older warnings are being served
+        if self._snapshot is not None:
+            return self._snapshot.stale
+        result = self._results.get(self._request_key(location))
+        return result is None or result.stale
+
+    def dump_cache(self) -> dict:
+        texts: dict[str, int] = {}
+
+        def text_id(text: str | None) -> int | None:
+            return None if text is None else texts.setdefault(text, len(texts))
+
+        results = self._results.items() if self._snapshot is None else ((("area", area), result) for area, result in self._snapshot.areas.items())
+        return {
+            "version": WARNING_CACHE_VERSION,
+            "saved_at": time.time(),
+            "snapshot_at": self._snapshot.fetched_at if self._snapshot is not None else None,
+            "locations": [[latitude, longitude, area] for (latitude, longitude), area in self._areas.items()],
+            "results": [
+                [
+                    list(key),
+                    result.fetched_at,
+                    [[x.type, x.level, x.begin_ts, x.end_ts, x.warnid, x.chgid, x.verlaufid, text_id(x.text), text_id(x.effects), text_id(x.recommendations)] for x in result.warnings.warnings],
+                ]
+                for key, result in results
+            ],
+            "texts": list(texts),
+        }
+
+    def load_cache(self, data: dict) -> None:
+        if data.get("version") != WARNING_CACHE_VERSION:
+            return
+
+        texts = data["texts"]
+        for latitude, longitude, area in data["locations"]:
+            self._areas.setdefault((latitude, longitude), area)
+
+        results = {}
+        for key, fetched_at, warnings in data["results"]:
+            parsed = [
+                GeosphereWarning(
+                    type=WarningType(type_),
+                    level=WarningLevel(level),
+                    begin_ts=begin_ts,
+                    end_ts=end_ts,
+                    warnid=warnid,
+                    chgid=chgid,
+                    verlaufid=verlaufid,
+                    text=None if text is None else texts[text],
+                    effects=None if effects is None else texts[effects],
+                    recommendations=None if recommendations is None else texts[recommendations],
+                )
+                for type_, level, begin_ts, end_ts, warnid, chgid, verlaufid, text, effects, recommendations in warnings
+            ]
+            results[tuple(key)] = _AreaResult(fetched_at=fetched_at, warnings=GeosphereWarnings(warnings=parsed), signature=_signature(parsed))
+
+        if self.snapshot_url is not None and data.get("snapshot_at") is not None and self._snapshot is None:
+            areas = {key[1]: result for key, result in results.items() if key[0] == "area"}
+            self._snapshot = _Snapshot(fetched_at=data["snapshot_at"], areas=areas, no_warnings=GeosphereWarnings(warnings=[]))
+        else:
+            for key, result in results.items():
+                self._results.setdefault(key, result)
+
+    def _notify(self, update: HubUpdate) -> None:
+        if self.on_update is not None:
+            self.on_update(update)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.max_age.total_seconds()
+
+    async def _async_shared(self, key: tuple, factory: Callable[[], Awaitable[Any]]) -> Any:  # noqa: ANN401
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats.increment("request.shared")
+
+        return await asyncio.shield(task)
+
+    def area_of(self, location: Location) -> int | None:
+        location_key = _location_key(location)
+        area = self._areas.get(location_key)
+        if area is None and (area := self.index.lookup(location)) is not None:
+            self._areas[location_key] = area
+        return area
+
+    def _request_key(self, location: Location) -> tuple:
+        area = self.area_of(location)
+        if area is not None:
+            return ("area", area)
+        return ("coords", *_location_key(location))
+
+    async def _async_fetch(self, location: Location, *, jitter: bool) -> GeosphereWarnings | None:
+        url = f"{BASE_URL}/getWarningsForCoords?lat={location.latitude}&lon={location.longitude}&lang={DEFAULT_LANGUAGE}"
+        fetched = await self._fetch_data(url, lambda: _FeatureStreamParser(keep_geometry=lambda area: area is not None and area not in self.index), jitter=jitter)
+        now_ = time.time()
+
+        if fetched is None:
+            if (previous := self._results.get(self._request_key(location))) is not None:
+                previous.stale = True
+            return None
+        if fetched is _FetchResult.NOT_MODIFIED:
+            previous = self._results.get(self._request_key(location))
+            if previous is None:
+                self._validators.pop(url, None)
+                return None
+            previous.fetched_at = now_
+            previous.stale = False
+            self._notify(HubUpdate.RESULTS)
+            return previous.warnings
+        if not fetched.features:
+            return None
+
+        feature = fetched.features[0]
+        if feature.area is not None:
+            self._areas[_location_key(location)] = feature.area
+            self._add_to_index(feature)
+        key = self._request_key(location)
+        result = self._results[key] = self._merge_result(self._results.get(key), feature, now_)
+        self._notify(HubUpdate.RESULTS)
+
+        return result.warnings
+
+    async def _async_fetch_snapshot(self, *, jitter: bool) -> None:
+        url = f"{self.snapshot_url}?lang={DEFAULT_LANGUAGE}"
+        fetched = await self._fetch_data(url, lambda: _FeatureStreamParser(collection=True, keep_geometry=lambda area: area not in self.index), jitter=jitter)
+        now_ = time.time()
+
+        if fetched is None:
+            if self._snapshot is not None:
+                self._snapshot.stale = True
+            return
+        if fetched is _FetchResult.NOT_MODIFIED:
+            if self._snapshot is None:
+                self._validators.pop(url, None)
+                return
+            self._snapshot.fetched_at = now_
+            self._snapshot.stale = False
+            self._notify(HubUpdate.RESULTS)
+            return
+
+        previous = self._snapshot.areas if self._snapshot is not None else {}
+        areas = {}
+        for feature in fetched.features:
+            areas[feature.area] = self._merge_result(previous.get(feature.area), feature, now_)
+            self._add_to_index(feature)
+
+        no_warnings = self._snapshot.no_warnings if self._snapshot is not None else GeosphereWarnings(warnings=[])
+        self._snapshot = _Snapshot(fetched_at=now_, areas=areas, no_warnings=no_warnings)
+        self._notify(HubUpdate.RESULTS)
+
+    async def _async_fetch_texts(self, location: Location, language: str) -> float | None:
+        # geometries are not needed, and in snapshot mode one request covers all areas; returns when the
+        # texts were fetched, None if they were not
+        if self.snapshot_url is not None:
+            url = f"{self.snapshot_url}?lang={language}"
+            fetched = await self._fetch_data(url, lambda: _FeatureStreamParser(collection=True))
+        else:
+            url = f"{BASE_URL}/getWarningsForCoords?lat={location.latitude}&lon={location.longitude}&lang={language}"
+            fetched = await self._fetch_data(url, _FeatureStreamParser)
+        if fetched is _FetchResult.NOT_MODIFIED:
+            # texts evicted since, the next request fetches them in full
+            self._validators.pop(url, None)
+            return None
+        if fetched is None:
+            return None
+
+        for feature in fetched.features:
+            for warning in feature.warnings:
+                self._texts[language, *texts_key(warning)] = WarningTexts.of(warning)
+                self._missing_texts.pop((language, *texts_key(warning)), None)
+        while len(self._texts) > TRANSLATION_CACHE_SIZE:
+            self._texts.popitem(last=False)
+        return time.time()
+
+    @staticmethod
+    def _merge_result(previous: _AreaResult | None, feature: _Feature, fetched_at: float) -> _AreaResult:
+        signature = _signature(feature.warnings)
+        if previous is not None and previous.signature == signature:
+            return _AreaResult(fetched_at=fetched_at, warnings=previous.warnings, signature=signature)
+        return _AreaResult(fetched_at=fetched_at, warnings=GeosphereWarnings(warnings=feature.warnings), signature=signature)
+
+    def _add_to_index(self, feature: _Feature) -> None:
+        if feature.area is not None and feature.geometry and self.index.add(feature.area, feature.geometry):
+            self._notify(HubUpdate.INDEX)
+
+    async def _fetch_data(self, url: str, parser_factory: Callable[[], _FeatureStreamParser], *, jitter: bool = False) -> _FeatureStreamParser | _FetchResult | None:
+        breaker = self._breakers.get(endpoint := url.partition("?")[0])
+        if breaker is None:
+            breaker = self._breakers[endpoint] = _CircuitBreaker(self.retry_policy)
+        if not breaker.allow():
+            self.stats.increment("breaker.rejected")
+            return None
+
+        if jitter and self.start_jitter:
+            await asyncio.sleep(random.uniform(0, self.start_jitter.total_seconds()))  # noqa: S311
+
+        result = await self._fetch_with_retries(url, parser_factory)
+        if result is None:
+            if breaker.record_failure():
+                self.stats.increment("breaker.opened")
+                logger.warning("Pausing requests to %s for %.1f s after repeated failures", endpoint, breaker.open_until - time.monotonic())
+        else:
+            breaker.record_success()
+        return result
+
+    async def _fetch_with_retries(self, url: str, parser_factory: Callable[[], _FeatureStreamParser]) -> _FeatureStreamParser | _FetchResult | None:
+        policy = self.retry_policy
+        deadline = math.inf
+        for attempt in range(policy.attempts):
+            if attempt and not await self._async_backoff(attempt, deadline):
+                break
+
+            try:
+                # timeouts start once a slot is taken, waiting behind requests for other areas is no upstream slowness
+                async with self._semaphore:
+                    now = time.monotonic()
+                    deadline = min(deadline, now + policy.total_timeout)
+                    if now >= deadline:
+                        break
+                    async with asyncio.timeout(min(policy.attempt_timeout, deadline - now)):
+                        return await self._fetch_hedged(url, parser_factory)
+            except TimeoutError:
+                self.stats.increment("error.timeout")
+                logger.warning("Timeout fetching warnings (attempt %d)", attempt + 1)
+            except aiohttp.ClientResponseError as error:
+                self.stats.increment("error.status")
+                if not _is_retryable_status(error.status):
+                    logger.error("Error fetching warnings: %s", error)  # noqa: TRY400
+                    return None
+                logger.warning("Error fetching warnings (attempt %d): %s", attempt + 1, error)
+            except (aiohttp.ClientError, socket.gaierror) as error:
+                self.stats.increment("error.network")
+                logger.warning("Error fetching warnings (attempt %d): %s", attempt + 1, error)
+            except (KeyError, TypeError, ValueError):
+                self.stats.increment("error.parse")
+                logger.exception("Error parsing warnings json")
+                return None
+            except Exception:
+                self.stats.increment("error.unexpected")
+                logger.exception("Exception fetching warnings")
+                return None
+
+        logger.error("Giving up fetching warnings from %s", url.partition("?")[0])
+        return None
+
+    async def _async_backoff(self, attempt: int, deadline: float) -> bool:
+        # full jitter keeps retries of many entries from lining up, no retry if it would start past the deadline
+        policy = self.retry_policy
+        delay = random.uniform(0, min(policy.backoff_max, policy.backoff * 2 ** (attempt - 1)))  # noqa: S311
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.stats.increment("fetch.retry")
+        await asyncio.sleep(delay)
+        return True
+
+    async def _fetch_hedged(self, url: str, parser_factory: Callable[[], _FeatureStreamParser]) -> _FeatureStreamParser | _FetchResult:
+        # a second request is raced against one that is slower than hedge_delay, the first success wins; called
+        # holding a slot, the hedge needs another one and is skipped while all are taken
+        tasks = [asyncio.ensure_future(self._fetch_attempt(url, parser_factory()))]
         try:
-            warnings = _parse_data(data)
-            return {"warnings": GeosphereWarnings(warnings=warnings)}
-        except Exception:
-            logger.exception("Error parsing warnings json")
-            return {"warnings": GeosphereWarnings(warnings=[])}
+            if self.retry_policy.hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=self.retry_policy.hedge_delay)
+                if not done and self._semaphore.locked():
+                    self.stats.increment("fetch.hedge_skipped")
+                elif not done:
+                    self.stats.increment("fetch.hedged")
+                    tasks.append(asyncio.ensure_future(self._fetch_hedge(url, parser_factory())))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            raise tasks[0].exception()
+        finally:
+            for task in tasks:
+                task.cancel()
 
-    async def _fetch_data(self) -> dict | None:
+    async def _fetch_hedge(self, url: str, parser: _FeatureStreamParser) -> _FeatureStreamParser | _FetchResult:
+        async with self._semaphore:
+            return await self._fetch_attempt(url, parser)
+
+    async def _fetch_attempt(self, url: str, parser: _FeatureStreamParser) -> _FeatureStreamParser | _FetchResult:
+        # decoding and parsing are fused in the streaming parser, network time is the remainder of the request
+        started = time.perf_counter()
+        parsing = 0.0
+        if self.session is None:
+            self.session = create_session()
+        response = await self.session.get(url, headers=self._validators.get(url))
         try:
-            async with async_timeout.timeout(HTTP_TIMEOUT):
-                response = await self.session.get(f"{BASE_URL}/getWarningsForCoords?lat={self.config.location.latitude}&lon={self.config.location.longitude}&lang=de")
-                return await response.json()
-        except TimeoutError:
-            logger.exception("Timeout fetching warnings")
-        except (aiohttp.ClientError, socket.gaierror):
-            logger.exception("Error fetching warnings")
-        except (KeyError, TypeError):
-            logger.exception("Error parsing warnings json")
-        except Exception:
-            logger.exception("Exception fetching warnings")
-        return None
+            if response.status == HTTPStatus.NOT_MODIFIED:
+                self.stats.increment("fetch.not_modified")
+                self.stats.observe("fetch.network", time.perf_counter() - started)
+                return _FetchResult.NOT_MODIFIED
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                self.stats.increment("fetch.bytes", len(chunk))
+                parse_started = time.perf_counter()
+                parser.feed(chunk)
+                parsing += time.perf_counter() - parse_started
+            parse_started = time.perf_counter()
+            parser.close()
+            parsing += time.perf_counter() - parse_started
+        finally:
+            response.release()
+
+        self._store_validators(url, response.headers)
+        self.stats.increment("fetch.ok")
+        self.stats.observe("fetch.network", time.perf_counter() - started - parsing)
+        self.stats.observe("fetch.parse", parsing)
+        return parser
+
+    def _store_validators(self, url: str, headers: Mapping[str, str]) -> None:
+        validators = {}
+        if etag := headers.get("ETag"):
+            validators["If-None-Match"] = etag
+        if last_modified := headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = last_modified
+
+        if validators:
+            self._validators[url] = validators
+        else:
+            self._validators.pop(url, None)
+
+
+class Client:
+    def __init__(self, config: ClientConfig, hub: Hub) -> None:
+        self.config = config
+        self.hub = hub
+        self.stats = Stats()
+
+    async def async_get_data(self) -> dict[str, GeosphereWarnings]:
+        started = time.perf_counter()
+        warnings = await self.hub.async_get_warnings(self.config.location, jitter=True)
+        self.stats.observe("get_data", time.perf_counter() - started)
+        if warnings is None:
+            self.stats.increment("error.no_data")
+            msg = f"No warnings available for {self.config.location}"
+            raise GeosphereError(msg)
+        data = {"warnings": warnings, "stale": self.hub.is_stale(self.config.location)}
+        if self.config.language != DEFAULT_LANGUAGE:
+            data["texts"] = await self.hub.async_get_texts(self.config.location, warnings, self.config.language)
+        return data
+
+    def get_cached_data(self) -> CachedWarnings | None:
+        return self.hub.get_cached(self.config.location)
+
+
+def get_warnings_many(locations: Iterable[Location], **hub_options: Any) -> dict[Location, GeosphereWarnings | None]:  # noqa: ANN401
+    # blocking entry point for scripts, running all requests concurrently on a short-lived hub
+    async def run() -> dict[Location, GeosphereWarnings | None]:
+        async with Hub(**hub_options) as hub:
+            return await hub.async_get_warnings_many(locations)
+
+    return asyncio.run(run())
@@ -0,0 +1,252 @@
+import array
+import base64
+import bisect
+import sys
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Self
+
+from . import geosphere
+
+ARCHIVE_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class ArchivedWarning:
+    site: str
+    warnid: int | None
+    verlaufid: int | None
+    type: geosphere.WarningType
+    level: geosphere.WarningLevel
+    begin_ts: int
+    end_ts: int
+    area: int | None
+    chgids: tuple[int | None, ...]
+    first_seen: int
+    last_changed: int
+
+
+# column name, array typecode; None is stored as -1 in the id columns
+_ARCHIVE_COLUMNS = (
+    ("site", "I"),
+    ("warnid", "q"),
+    ("verlaufid", "q"),
+    ("chgid", "q"),
+    ("type", "b"),
+    ("level", "b"),
+    ("begin", "q"),
+    ("end", "q"),
+    ("area", "q"),
+    ("seen", "q"),
+    ("previous", "q"),
+)
+
+
+def _or_missing(value: int | None) -> int:
+    return -1 if value is None else value
+
+
+def _or_none(value: int) -> int | None:
+    return None if value == -1 else value
+
+
+class WarningArchive:
+    """Append-only columnar history of the warning episodes seen per site.
+
+    An episode is one phase of a warning, identified by geosphere.warning_key. Polls repeating an episode
+    unchanged add nothing, a new chgid, level or time range appends a revision row linked to the one it
+    supersedes, so the rows of an episode are its chgid history.
+
+    Per site the rows are also kept ordered by begin, together with the longest episode seen, so a time
+    range query bisects to the rows that can overlap the range instead of scanning the archive.
+    """
+
+    def __init__(self, on_update: Callable[[], None] | None = None) -> None:
+        self.on_update = on_update
+        self._columns = {name: array.array(typecode) for name, typecode in _ARCHIVE_COLUMNS}
+        self._sites: list[str] = []
+        self._site_index: dict[str, int] = {}
+        self._episodes: dict[tuple[int, tuple], int] = {}
+        self._superseded = bytearray()
+        self._begins: dict[int, array.array] = {}
+        self._rows: dict[int, array.array] = {}
+        self._max_duration: dict[int, int] = {}
+        self._recorded: dict[str, geosphere.GeosphereWarnings] = {}
+
+    def __len__(self) -> int:
+        return len(self._superseded)
+
+    def record(self, site: str, warnings: geosphere.GeosphereWarnings, *, area: int | None = None, seen_at: float | None = None) -> int:
+        # returns the number of rows appended; the warnings recorded last for the site are skipped without
+        # looking at a single warning
+        if self._recorded.get(site) is warnings:
+            return 0
+        self._recorded[site] = warnings
+
+        site_id = self._site_id(site)
+        seen = int(seen_at if seen_at is not None else time.time())
+        columns = self._columns
+        appended = 0
+        for warning in warnings.warnings:
+            key = (site_id, geosphere.warning_key(warning))
+            previous = self._episodes.get(key)
+            if previous is not None and (
+                columns["chgid"][previous],
+                columns["level"][previous],
+                columns["begin"][previous],
+                columns["end"][previous],
+            ) == (_or_missing(warning.chgid), warning.level, warning.begin_ts, warning.end_ts):
+                continue
+
+            row = self._append(
+                site=site_id,
+                warnid=_or_missing(warning.warnid),
+                verlaufid=_or_missing(warning.verlaufid),
+                chgid=_or_missing(warning.chgid),
+                type=warning.type,
+                level=warning.level,
+                begin=warning.begin_ts,
+                end=warning.end_ts,
+                area=_or_missing(area),
+                seen=seen,
+                previous=_or_missing(previous),
+            )
+            self._episodes[key] = row
+            appended += 1
+
+        if appended and self.on_update is not None:
+            self.on_update()
+        return appended
+
+    def query(
+        self,
+        site: str | None = None,
+        *,
+        start: float | None = None,
+        end: float | None = None,
+        types: Iterable[geosphere.WarningType] | None = None,
+        min_level: geosphere.WarningLevel | None = None,
+    ) -> list[ArchivedWarning]:
+        # latest revision of every episode overlapping [start, end), ordered by begin
+        if site is None:
+            site_ids = range(len(self._sites))
+        elif (site_id := self._site_index.get(site)) is not None:
+            site_ids = (site_id,)
+        else:
+            return []
+        type_set = None if types is None else set(types)
+        columns = self._columns
+
+        matches = []
+        for site_id in site_ids:
+            begins = self._begins[site_id]
+            rows = self._rows[site_id]
+            low = 0 if start is None else bisect.bisect_left(begins, start - self._max_duration[site_id])
+            high = len(begins) if end is None else bisect.bisect_left(begins, end)
+            for position in range(low, high):
+                row = rows[position]
+                if self._superseded[row] or (start is not None and columns["end"][row] <= start):
+                    continue
+                if (type_set is not None and columns["type"][row] not in type_set) or (min_level is not None and columns["level"][row] < min_level):
+                    continue
+                matches.append(row)
+
+        matches.sort(key=columns["begin"].__getitem__)
+        return [self._archived(row) for row in matches]
+
+    def as_dict(self) -> dict:
+        return {
+            "version": ARCHIVE_VERSION,
+            "byteorder": sys.byteorder,
+            "sites": self._sites,
+            "columns": {name: base64.b64encode(column.tobytes()).decode() for name, column in self._columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, on_update: Callable[[], None] | None = None) -> Self:
+        archive = cls(on_update)
+        if data.get("version") != ARCHIVE_VERSION:
+            return archive
+
+        columns = {}
+        for name, typecode in _ARCHIVE_COLUMNS:
+            column = columns[name] = array.array(typecode)
+            column.frombytes(base64.b64decode(data["columns"][name]))
+            if data["byteorder"] != sys.byteorder:
+                column.byteswap()
+        if len({len(column) for column in columns.values()}) != 1:
+            msg = "Archive columns differ in length"
+            raise ValueError(msg)
+
+        for site in data["sites"]:
+            archive._site_id(site)
+        archive._columns = columns
+        archive._superseded = bytearray(len(columns["site"]))
+        begins, ends = columns["begin"], columns["end"]
+        site_rows: dict[int, list[int]] = {}
+        for row, (site_id, previous) in enumerate(zip(columns["site"], columns["previous"], strict=True)):
+            if previous != -1:
+                archive._superseded[previous] = 1
+            archive._episodes[site_id, _warning_key_of(columns, row)] = row
+            site_rows.setdefault(site_id, []).append(row)
+        for site_id, rows in site_rows.items():
+            rows.sort(key=begins.__getitem__)
+            archive._rows[site_id] = array.array("q", rows)
+            archive._begins[site_id] = array.array("q", (begins[row] for row in rows))
+            archive._max_duration[site_id] = max(ends[row] - begins[row] for row in rows)
+        return archive
+
+    def _site_id(self, site: str) -> int:
+        site_id = self._site_index.get(site)
+        if site_id is None:
+            site_id = self._site_index[site] = len(self._sites)
+            self._sites.append(site)
+            self._begins[site_id] = array.array("q")
+            self._rows[site_id] = array.array("q")
+            self._max_duration[site_id] = 0
+        return site_id
+
+    def _append(self, **values: int) -> int:
+        row = len(self._superseded)
+        for name, column in self._columns.items():
+            column.append(values[name])
+        self._superseded.append(0)
+        if values["previous"] != -1:
+            self._superseded[values["previous"]] = 1
+
+        site_id = values["site"]
+        begins = self._begins[site_id]
+        # rows mostly arrive in begin order, so this is an append in the common case
+        position = bisect.bisect_right(begins, values["begin"])
+        begins.insert(position, values["begin"])
+        self._rows[site_id].insert(position, row)
+        self._max_duration[site_id] = max(self._max_duration[site_id], values["end"] - values["begin"])
+        return row
+
+    def _archived(self, row: int) -> ArchivedWarning:
+        columns = self._columns
+        chain = [row]
+        while (previous := columns["previous"][chain[-1]]) != -1:
+            chain.append(previous)
+        return ArchivedWarning(
+            site=self._sites[columns["site"][row]],
+            warnid=_or_none(columns["warnid"][row]),
+            verlaufid=_or_none(columns["verlaufid"][row]),
+            type=geosphere.WarningType(columns["type"][row]),
+            level=geosphere.WarningLevel(columns["level"][row]),
+            begin_ts=columns["begin"][row],
+            end_ts=columns["end"][row],
+            area=_or_none(columns["area"][row]),
+            chgids=tuple(_or_none(columns["chgid"][revision]) for revision in reversed(chain)),
+            first_seen=columns["seen"][chain[-1]],
+            last_changed=columns["seen"][row],
+        )
+
+
+def _warning_key_of(columns: dict[str, array.array], row: int) -> tuple:
+    # geosphere.warning_key of an archived row
+    warnid = _or_none(columns["warnid"][row])
+    if warnid is None:
+        return (None, geosphere.WarningType(columns["type"][row]), columns["begin"][row])
+    return (warnid, _or_none(columns["verlaufid"][row]))
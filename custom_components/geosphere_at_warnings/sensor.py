@@ -1,32 +1,113 @@
 """Sensor platform for Cookiecutter Home Assistant Custom Component Instance."""
 
+import datetime
 from collections.abc import Callable
+from dataclasses import dataclass
 
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorEntityDescription, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
 
-from. import geosphere, const, entity
+from. import geosphere, const, entity, coordinator
+
+
+def _milliseconds(histogram: geosphere.Histogram | None) -> float | None:
+    if histogram is None or (p95 := histogram.quantile(0.95)) is None:
+        return None
+    return round(p95 * 1000, 1)
+
+
+def _hit_ratio(stats: geosphere.Stats) -> float | None:
+    hits, misses = stats.counters["cache.hit"], stats.counters["cache.miss"]
+    return round(100 * hits / (hits + misses), 1) if hits + misses else None
+
+
+@dataclass(frozen=True, kw_only=True)
+class GeosphereAtDiagnosticSensorDescription(SensorEntityDescription):
+    value_fn: Callable[[coordinator.GeosphereAtWarningsDataUpdateCoordinator], float | None]
+
+
+DIAGNOSTIC_SENSORS = (
+    GeosphereAtDiagnosticSensorDescription(
+        key="fetch_latency",
+        name="Fetch latency (p95)",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator_: _milliseconds(coordinator_.hub.stats.histograms.get("fetch.network")),
+    ),
+    GeosphereAtDiagnosticSensorDescription(
+        key="update_duration",
+        name="Update duration (p95)",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator_: _milliseconds(coordinator_.stats.histograms.get("update")),
+    ),
+    GeosphereAtDiagnosticSensorDescription(
+        key="fetch_errors",
+        name="Fetch errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator_: coordinator_.hub.stats.total("error."),
+    ),
+    GeosphereAtDiagnosticSensorDescription(
+        key="cache_hit_ratio",
+        name="Cache hit ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator_: _hit_ratio(coordinator_.hub.stats),
+    ),
+)
+
+
+LEVEL_NONE = "none"
+LEVEL_OPTIONS = [LEVEL_NONE, *(level.name.lower() for level in geosphere.WarningLevel)]
+
+
+@dataclass(frozen=True, kw_only=True)
+class GeosphereAtTimeSensorDescription(SensorEntityDescription):
+    value_fn: Callable[[geosphere.LocationView], datetime.datetime | None]
+
+
+TIME_SENSORS = (
+    GeosphereAtTimeSensorDescription(
+        key="next_begin",
+        name="next warning begin",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda view: view.next_begin,
+    ),
+    GeosphereAtTimeSensorDescription(
+        key="next_end",
+        name="current warning end",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda view: view.next_end,
+    ),
+)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry, async_add_devices: Callable) -> None:
-    coordinator = hass.data[const.DOMAIN][entry.entry_id]
-    async_add_devices([GeosphereAtWarningsSensor(coordinator, entry)])
+    coordinator_ = hass.data[const.DOMAIN][entry.entry_id]
+    locations = entry.data[const.CONF_LOCATIONS]
+    # entry wide diagnostics are attached to the device of the first location
+    async_add_devices(
+        [
+            *(GeosphereAtWarningsSensor(coordinator_, entry, location) for location in locations),
+            *(GeosphereAtWarningLevelSensor(coordinator_, entry, location, warning_type) for location in locations for warning_type in geosphere.WarningType),
+            *(GeosphereAtTimeSensor(coordinator_, entry, location, description) for location in locations for description in TIME_SENSORS),
+            *(GeosphereAtDiagnosticSensor(coordinator_, entry, locations[0], description) for description in DIAGNOSTIC_SENSORS),
+        ],
+    )
 
 
 class GeosphereAtWarningsSensor(entity.GeosphereAtWarningsEntity):
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
-        return f"{const.DEFAULT_NAME}_{const.SENSOR}"
+        return f"{self.location.get(const.CONF_NAME, const.DEFAULT_NAME)}_{const.SENSOR}"
 
     @property
     def state(self) -> str:
-        warnings: geosphere.GeosphereWarnings | None = self.coordinator.data.get("warnings")
-
-        if warnings:
-            result = warnings.get_relevant(advanced_warning_time=self.config_entry.data["advanced_warning_time"])
-            if result:
-                return f"Warnings: {len(result)}"
+        if self.view.count:
+            return f"Warnings: {self.view.count}"
 
         return "No Warnings"
 
@@ -39,3 +120,84 @@ class GeosphereAtWarningsSensor(entity.GeosphereAtWarningsEntity):
     def device_class(self):
         """Return de device class of the sensor."""
         return "geosphere_at_warnings__sensor__device_class"
+
+
+class GeosphereAtWarningLevelSensor(entity.GeosphereAtWarningsEntity, SensorEntity):
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = LEVEL_OPTIONS
+    _attr_icon = const.ICON
+
+    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry, location: dict, warning_type: geosphere.WarningType) -> None:
+        super().__init__(coordinator_, config_entry, location)
+        self.warning_type = warning_type
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self.location_id}_{self.warning_type.name.lower()}"
+
+    @property
+    def name(self) -> str:
+        return f"{self.location.get(const.CONF_NAME, const.DEFAULT_NAME)} {self.warning_type.name.lower().replace('_', ' ')}"
+
+    @property
+    def native_value(self) -> str:
+        level = self.view.level(self.warning_type)
+        return LEVEL_NONE if level is None else level.name.lower()
+
+
+class GeosphereAtTimeSensor(entity.GeosphereAtWarningsEntity, SensorEntity):
+    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry, location: dict, entity_description: GeosphereAtTimeSensorDescription) -> None:
+        super().__init__(coordinator_, config_entry, location)
+        self.entity_description = entity_description
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self.location_id}_{self.entity_description.key}"
+
+    @property
+    def name(self) -> str:
+        return f"{self.location.get(const.CONF_NAME, const.DEFAULT_NAME)} {self.entity_description.name}"
+
+    @property
+    def native_value(self) -> datetime.datetime | None:
+        return self.entity_description.value_fn(self.view)
+
+
+class GeosphereAtDiagnosticSensor(entity.GeosphereAtWarningsEntity, SensorEntity):
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator_: coordinator.GeosphereAtWarningsDataUpdateCoordinator, config_entry: ConfigEntry, location: dict, entity_description: GeosphereAtDiagnosticSensorDescription) -> None:
+        super().__init__(coordinator_, config_entry, location)
+        self.entity_description = entity_description
+
+    @property
+    def unique_id(self) -> str:
+        return f"{self.config_entry.entry_id}_{self.entity_description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_add_stats_listener(self._handle_stats_update))
+
+    @callback
+    def _handle_stats_update(self) -> None:
+        # written after every refresh, unchanged and failed ones included; a following coordinator update
+        # then finds the view written already
+        self._written_view = self._view()
+        self.async_write_ha_state()
+
+    @property
+    def name(self) -> str:
+        return f"{const.DEFAULT_NAME} {self.entity_description.name}"
+
+    @property
+    def native_value(self) -> float | None:
+        return self.entity_description.value_fn(self.coordinator)
+
+    @property
+    def available(self) -> bool:
+        return self.coordinator.last_update_success
+
+    @property
+    def extra_state_attributes(self) -> None:
+        return None
@@ -0,0 +1,78 @@
+import itertools
+import operator
+
+from custom_components.geosphere_at_warnings import escalations, geosphere
+
+
+def _escalation(type_: geosphere.WarningType, level: geosphere.WarningLevel, warnid: int, previous: geosphere.WarningLevel | None = None) -> list[geosphere.WarningEvent]:
+    def warning(level: geosphere.WarningLevel) -> geosphere.GeosphereWarning:
+        return geosphere.GeosphereWarning(type_, level, begin_ts=1_750_000_000, end_ts=1_750_086_400, warnid=warnid, chgid=1, verlaufid=1)
+
+    if previous is None:
+        return [geosphere.WarningEvent(geosphere.WarningChange.ADDED, warning(level))]
+    return [geosphere.WarningEvent(geosphere.WarningChange.ESCALATED, warning(level), warning(previous))]
+
+
+def test_escalation_dispatcher_batches_by_type_level_and_district() -> None:
+    batches: list[escalations.EscalationBatch] = []
+    dispatcher = escalations.EscalationDispatcher(batches.append, window=60, rate=1, period=60, min_level=geosphere.WarningLevel.ORANGE, grouping=escalations.AreaGrouping.DISTRICT, clock=lambda: 0.0)
+    orange, red = geosphere.WarningLevel.ORANGE, geosphere.WarningLevel.RED
+
+    assert dispatcher.add("a", 30101, _escalation(geosphere.WarningType.STORM, orange, 1), now=0) == 1
+    assert dispatcher.add("b", 30102, _escalation(geosphere.WarningType.STORM, orange, 2), now=10) == 1
+    assert dispatcher.add("c", 30201, _escalation(geosphere.WarningType.STORM, orange, 3), now=10) == 1
+    assert dispatcher.add("d", 30101, _escalation(geosphere.WarningType.RAIN, geosphere.WarningLevel.YELLOW, 4), now=10) == 0
+    # escalating within the window moves the warning to the red group, it is not reported at orange
+    assert dispatcher.add("b", 30102, _escalation(geosphere.WarningType.STORM, red, 2, orange), now=20) == 1
+    assert len(dispatcher) == 3
+    assert dispatcher.next_due() == 60
+
+    assert dispatcher.flush(now=59) == 0
+    # both storm groups of district 301 and the one of 302 are closed, the rate lets one out, red first
+    assert dispatcher.flush(now=80) == 1
+    assert [(batch.level, batch.region, [escalation.site for escalation in batch.escalations]) for batch in batches] == [(red, 301, ["b"])]
+    assert dispatcher.next_due() == 140
+    assert dispatcher.flush(now=140) == 1
+    assert dispatcher.flush(now=200) == 1
+    assert [(batch.level, batch.region, [escalation.site for escalation in batch.escalations]) for batch in batches[1:]] == [(orange, 301, ["a"]), (orange, 302, ["c"])]
+    assert len(dispatcher) == 0
+    assert dispatcher.next_due() is None
+
+
+def test_escalation_dispatcher_coalesces_a_front() -> None:
+    # a front crossing 2000 sites in 20 districts within 200 s: every site gets an orange storm warning that
+    # escalates to red 30 s later, every other one a thunderstorm warning too, and yellow rain below min_level
+    sites = 2000
+    transitions = []
+    for site in range(sites):
+        seen = site * 0.1
+        area = 30000 + (site % 20) * 100 + site % 50
+        transitions.extend(
+            (
+                (seen, site, area, _escalation(geosphere.WarningType.STORM, geosphere.WarningLevel.ORANGE, site)),
+                (seen + 30, site, area, _escalation(geosphere.WarningType.STORM, geosphere.WarningLevel.RED, site, geosphere.WarningLevel.ORANGE)),
+                (seen, site, area, _escalation(geosphere.WarningType.RAIN, geosphere.WarningLevel.YELLOW, sites + site)),
+            ),
+        )
+        if site % 2:
+            transitions.append((seen + 5, site, area, _escalation(geosphere.WarningType.THUNDERSTORM, geosphere.WarningLevel.VIOLET, 2 * sites + site)))
+    transitions.sort(key=operator.itemgetter(0))
+
+    batches: list[escalations.EscalationBatch] = []
+    dispatcher = escalations.EscalationDispatcher(batches.append, window=60, rate=10, period=60, min_level=geosphere.WarningLevel.ORANGE, grouping=escalations.AreaGrouping.DISTRICT, clock=lambda: 0.0)
+    for seen, site, area, events in transitions:
+        dispatcher.add(f"site {site}", area, events, now=seen)
+        dispatcher.flush(now=seen)
+    while (due := dispatcher.next_due()) is not None:
+        dispatcher.flush(now=due)
+
+    assert len(transitions) == 7000
+    assert len(batches) < 150
+    reported = [(batch.type, escalation.event.warning.warnid, batch.level) for batch in batches for escalation in batch.escalations]
+    assert all(batch.type != geosphere.WarningType.RAIN and len({escalation.area // 100 for escalation in batch.escalations}) == 1 for batch in batches)
+    assert {(type_, warnid) for type_, warnid, level in reported if level >= geosphere.WarningLevel.RED} == {(geosphere.WarningType.STORM, site) for site in range(sites)} | {(geosphere.WarningType.THUNDERSTORM, 2 * sites + site) for site in range(1, sites, 2)}
+    # at most the burst plus the rate in any span, and the highest levels first within each flush
+    emitted_at = [batch.emitted_at for batch in batches]
+    assert all(emitted_at.count(at) <= 10 for at in emitted_at)
+    assert all(sum(at <= other < at + 60 for other in emitted_at) <= 20 for at in emitted_at)
+    assert all(first.level >= second.level for first, second in itertools.pairwise(batches) if first.emitted_at == second.emitted_at)
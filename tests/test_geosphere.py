@@ -1,8 +1,18 @@
+import asyncio
+import contextlib
+import copy
 import datetime
+import itertools
+import json
+import math
+from collections.abc import AsyncIterator
 from unittest.mock import patch
 
+import aiohttp
 import geosphere
+import pytest
 import testing_data
+from aiohttp import web
 
 
 def test_get_relevant_warnings() -> None:
@@ -140,3 +150,869 @@ def test_warnings_is_relevant_event_starts_after_advanced_warning_time() -> None
         ).is_relevant(advanced_warning_time=datetime.timedelta(hours=1))
         is False
     )
+
+
+SNAPSHOT_URL = "http://snapshot.invalid/warnings"
+
+
+class FakeContent:
+    def __init__(self, body: bytes, chunk_size: int) -> None:
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def iter_chunked(self, _: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start : start + self.chunk_size]
+
+
+class FakeResponse:
+    def __init__(self, data: dict | None, status: int = 200, headers: dict[str, str] | None = None, chunk_size: int = 1000) -> None:
+        self.status = status
+        self.headers = headers or {}
+        self.content = FakeContent(json.dumps(data).encode(), chunk_size)
+
+    def raise_for_status(self) -> None:
+        pass
+
+    def release(self) -> None:
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses: dict[tuple[float, float], dict] | None = None, delay: float = 0.01, snapshot: dict | None = None, etag: str | None = None) -> None:
+        self.responses = responses or {}
+        self.delay = delay
+        self.snapshot = snapshot
+        self.etag = etag
+        self.urls: list[str] = []
+
+    async def get(self, url: str, headers: dict[str, str] | None = None) -> FakeResponse:
+        self.urls.append(url)
+        await asyncio.sleep(self.delay)
+        if self.etag is not None and (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse(None, status=304)
+        response_headers = {"ETag": self.etag} if self.etag is not None else {}
+        if url.startswith(SNAPSHOT_URL):
+            return FakeResponse(self.snapshot, headers=response_headers)
+        for (latitude, longitude), data in self.responses.items():
+            if f"lat={latitude}&lon={longitude}&" in url:
+                return FakeResponse(data, headers=response_headers)
+        return FakeResponse(testing_data.get_warnings_for_coords_response_data, headers=response_headers)
+
+
+def _response_for_area(gemeindenr: int) -> dict:
+    data = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    data["properties"]["location"]["properties"]["gemeindenr"] = gemeindenr
+    return data
+
+
+def _shifted_response_for_area(gemeindenr: int, offset: int) -> dict:
+    data = _response_for_area(gemeindenr)
+    for polygon in data["geometry"]["coordinates"]:
+        for ring in polygon:
+            for point in ring:
+                point[0] += offset
+    return data
+
+
+def _client(hub: geosphere.Hub, latitude: float, longitude: float) -> geosphere.Client:
+    config = geosphere.ClientConfig(location=geosphere.Location(latitude, longitude), advanced_warning_time=datetime.timedelta(0))
+    return geosphere.Client(config, hub)
+
+
+def test_hub_deduplicates_concurrent_requests_for_same_coordinates() -> None:
+    async def run() -> list[dict]:
+        hub = geosphere.Hub(session)
+        clients = [_client(hub, 48.25, 16.35) for _ in range(20)]
+        return await asyncio.gather(*(client.async_get_data() for client in clients))
+
+    session = FakeSession()
+    results = asyncio.run(run())
+
+    assert len(session.urls) == 1
+    assert all(result["warnings"] is results[0]["warnings"] for result in results)
+    assert len(results[0]["warnings"].warnings) == 7
+
+
+def test_hub_and_client_stats() -> None:
+    class FailingSession(FakeSession):
+        async def get(self, url: str, headers: dict[str, str] | None = None) -> FakeResponse:
+            await super().get(url, headers)
+            raise aiohttp.ClientConnectionError
+
+    async def run() -> None:
+        clients = [_client(hub, 48.25, 16.35) for _ in range(5)]
+        await asyncio.gather(*(client.async_get_data() for client in clients))
+        await asyncio.gather(*(client.async_get_data() for client in clients))
+        with pytest.raises(geosphere.GeosphereError):
+            await _client(failing_hub, 48.25, 16.35).async_get_data()
+
+    hub = geosphere.Hub(FakeSession())
+    failing_hub = geosphere.Hub(FailingSession(), retry_policy=geosphere.RetryPolicy(attempts=1))
+    asyncio.run(run())
+
+    assert hub.stats.counters["cache.miss"] == 5
+    assert hub.stats.counters["cache.hit"] == 5
+    assert hub.stats.counters["request.shared"] == 4
+    assert hub.stats.counters["fetch.ok"] == 1
+    assert hub.stats.counters["fetch.bytes"] == len(json.dumps(testing_data.get_warnings_for_coords_response_data).encode())
+    assert hub.stats.histograms["fetch.network"].count == hub.stats.histograms["fetch.parse"].count == 1
+    assert failing_hub.stats.total("error.") == failing_hub.stats.counters["error.network"] == 1
+
+
+def test_histogram_quantiles() -> None:
+    histogram = geosphere.Histogram()
+    assert histogram.quantile(0.5) is None
+
+    for seconds in (0.0005, 0.003, 0.003, 0.2, 42.0):
+        histogram.observe(seconds)
+
+    assert histogram.count == 5
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.95) == 42.0
+    assert histogram.as_dict()["buckets"]["inf"] == 1
+
+
+def test_hub_shares_cached_result_within_same_municipality() -> None:
+    async def run() -> None:
+        hub = geosphere.Hub(session)
+        await _client(hub, 48.25, 16.35).async_get_data()
+        # the learned municipality polygon resolves the other coordinates without a request
+        await asyncio.gather(_client(hub, 48.25, 16.35).async_get_data(), _client(hub, 48.26, 16.34).async_get_data(), _client(hub, 48.2395, 16.3456).async_get_data())
+
+    session = FakeSession()
+    asyncio.run(run())
+
+    assert len(session.urls) == 1
+
+
+def test_hub_uses_persisted_area_index() -> None:
+    async def run() -> None:
+        hub = geosphere.Hub(session, index=geosphere.AreaIndex.from_dict(index.as_dict()))
+        await asyncio.gather(_client(hub, 48.25, 16.35).async_get_data(), _client(hub, 48.26, 16.34).async_get_data())
+
+    index = geosphere.AreaIndex()
+    index.add(91901, testing_data.get_warnings_for_coords_response_data["geometry"])
+    session = FakeSession()
+    asyncio.run(run())
+
+    assert len(session.urls) == 1
+
+
+def test_hub_fetches_distinct_areas_separately() -> None:
+    async def run() -> None:
+        hub = geosphere.Hub(session)
+        await asyncio.gather(_client(hub, 48.25, 16.35).async_get_data(), _client(hub, 47.07, 15.44).async_get_data())
+        await asyncio.gather(_client(hub, 48.25, 16.35).async_get_data(), _client(hub, 47.07, 15.44).async_get_data())
+
+    session = FakeSession({(47.07, 15.44): _response_for_area(60101)})
+    asyncio.run(run())
+
+    assert len(session.urls) == 2
+
+
+def test_hub_refetches_after_max_age() -> None:
+    async def run() -> None:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+        await _client(hub, 48.25, 16.35).async_get_data()
+        await _client(hub, 48.25, 16.35).async_get_data()
+
+    session = FakeSession()
+    asyncio.run(run())
+
+    assert len(session.urls) == 2
+
+
+def test_area_index_lookup() -> None:
+    index = geosphere.AreaIndex()
+
+    assert index.add(91901, testing_data.get_warnings_for_coords_response_data["geometry"]) is True
+    assert index.add(91901, testing_data.get_warnings_for_coords_response_data["geometry"]) is False
+    assert 91901 in index
+    assert index.lookup(geosphere.Location(48.2566, 16.33)) == 91901
+    assert index.lookup(geosphere.Location(48.21, 16.37)) is None
+    assert index.lookup(geosphere.Location(47.07, 15.44)) is None
+
+
+def test_area_index_round_trip() -> None:
+    index = geosphere.AreaIndex()
+    index.add(91901, testing_data.get_warnings_for_coords_response_data["geometry"])
+
+    restored = geosphere.AreaIndex.from_dict(index.as_dict())
+
+    assert len(restored) == 1
+    assert restored.lookup(geosphere.Location(48.2566, 16.33)) == 91901
+    assert len(geosphere.AreaIndex.from_dict({"crs": "EPSG:31287", "areas": index.as_dict()["areas"]})) == 0
+
+
+def test_austria_lambert_projection() -> None:
+    x, y = geosphere.AUSTRIA_LAMBERT.project(geosphere.Location(47.5, 13 + 20 / 60))
+
+    assert round(x, 3) == 400_000
+    assert round(y, 3) == 400_000
+
+
+def _square(min_x: float, min_y: float, size: float) -> dict:
+    ring = [[min_x, min_y], [min_x + size, min_y], [min_x + size, min_y + size], [min_x, min_y + size], [min_x, min_y]]
+    return {"type": "Polygon", "coordinates": [ring]}
+
+
+def test_nearby_warnings() -> None:
+    index = geosphere.AreaIndex()
+    index.add(1, _square(399_000, 399_000, 2_000))
+    index.add(2, _square(404_000, 399_000, 2_000))
+    index.add(3, _square(450_000, 399_000, 2_000))
+    index.add(4, _square(401_000, 399_000, 2_000))
+    ring_with_hole = {"type": "Polygon", "coordinates": [_square(390_000, 390_000, 20_000)["coordinates"][0], _square(395_000, 395_000, 10_000)["coordinates"][0]]}
+    index.add(5, ring_with_hole)
+
+    def warned(level: geosphere.WarningLevel, end_ts: int = 2000) -> geosphere.GeosphereWarnings:
+        return geosphere.GeosphereWarnings([_warning_at(level, 0, end_ts)])
+
+    areas = {1: warned(geosphere.WarningLevel.YELLOW), 2: warned(geosphere.WarningLevel.RED), 3: warned(geosphere.WarningLevel.VIOLET), 4: warned(geosphere.WarningLevel.VIOLET, end_ts=500), 5: warned(geosphere.WarningLevel.ORANGE), 6: warned(geosphere.WarningLevel.RED)}
+    center = geosphere.Location(47.5, 13 + 20 / 60)
+    far = geosphere.Location(49.5, 13 + 20 / 60)
+
+    nearby = geosphere.nearby_warnings([center, far, center], areas, index, radius=5_000, now=1000)
+
+    assert list(nearby) == [center, far]
+    assert nearby[center].distances.keys() == {1, 2, 5}
+    assert nearby[center].distances[1] == 0
+    assert nearby[center].distances[2] == pytest.approx(4_000, abs=0.01)
+    assert nearby[center].distances[5] == pytest.approx(5_000, abs=0.01)
+    assert nearby[center].highest == geosphere.WarningLevel.RED
+    assert nearby[far] == geosphere.Proximity(distances={}, highest=None)
+    assert geosphere.nearby_warnings([center], areas, index, radius=1_000, now=1000)[center].highest == geosphere.WarningLevel.YELLOW
+
+
+def test_hub_snapshot_mode_fans_out_one_request() -> None:
+    async def run() -> list[dict]:
+        hub = geosphere.Hub(session, snapshot_url=SNAPSHOT_URL)
+        locations = [(48.25, 16.35), (48.26, 16.34), (48.2566, 16.465), (48.21, 16.37)]
+        clients = [_client(hub, latitude, longitude) for latitude, longitude in locations * 25]
+        return await asyncio.gather(*(client.async_get_data() for client in clients))
+
+    doebling = testing_data.get_warnings_for_coords_response_data
+    # the same municipality shape moved 10 km east, carrying a single warning
+    shifted = _shifted_response_for_area(91001, 10_000)
+    shifted["properties"]["warnings"] = shifted["properties"]["warnings"][:1]
+    session = FakeSession(snapshot={"type": "FeatureCollection", "features": [doebling, shifted]})
+    results = asyncio.run(run())
+
+    assert session.urls == [f"{SNAPSHOT_URL}?lang=de"]
+    assert [len(result["warnings"].warnings) for result in results[:4]] == [7, 7, 1, 0]
+
+
+def test_parse_snapshot_skips_features_without_area() -> None:
+    feature = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    del feature["properties"]["location"]
+
+    features = geosphere._parse_snapshot({"type": "FeatureCollection", "features": [testing_data.get_warnings_for_coords_response_data, feature]})
+
+    assert [feature.area for feature in features] == [91901]
+
+
+def test_hub_reuses_warnings_on_not_modified() -> None:
+    async def run() -> list[dict]:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+        client = _client(hub, 48.25, 16.35)
+        return [await client.async_get_data() for _ in range(3)]
+
+    session = FakeSession(etag='"v1"')
+    results = asyncio.run(run())
+
+    assert len(session.urls) == 3
+    assert results[0]["warnings"] is results[1]["warnings"] is results[2]["warnings"]
+    assert results[0] == results[2]
+
+
+def test_hub_reuses_warnings_for_unchanged_change_ids() -> None:
+    async def run() -> list[dict]:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+        client = _client(hub, 48.25, 16.35)
+        results = [await client.async_get_data(), await client.async_get_data()]
+        session.responses[48.25, 16.35] = changed
+        results.append(await client.async_get_data())
+        return results
+
+    changed = _response_for_area(91901)
+    changed["properties"]["warnings"][1]["properties"]["chgid"] = 2
+    session = FakeSession()
+    results = asyncio.run(run())
+
+    assert results[0]["warnings"] is results[1]["warnings"]
+    assert results[2]["warnings"] is not results[1]["warnings"]
+    assert results[2]["warnings"].warnings[1].chgid == 2
+
+
+def _stream_parse(data: dict | str, chunk_size: int, threshold: int = 0, **kwargs: object) -> geosphere._FeatureStreamParser:
+    # the default threshold scans every body, larger ones let small bodies take the json.loads path
+    body = (data if isinstance(data, str) else json.dumps(data)).encode()
+    parser = geosphere._FeatureStreamParser(**kwargs)
+    with patch.object(geosphere, "STREAM_THRESHOLD", threshold):
+        for start in range(0, len(body), chunk_size):
+            parser.feed(body[start : start + chunk_size])
+        parser.close()
+    return parser
+
+
+def test_stream_parser_matches_json_parser() -> None:
+    data = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    # strings that look like structure or end in escapes must not confuse the scanner
+    data["properties"]["warnings"][0]["properties"]["text"] = 'Sturm {"[ \\"ä\\\\ \u00fc\\'
+    data["properties"]["meta"] = {"note": "]}", "values": [1, {"a": "}"}]}
+    expected = geosphere._parse_data(data)
+
+    for chunk_size, threshold in itertools.product((1, 2, 3, 7, 64, 100_000), (0, geosphere.STREAM_THRESHOLD)):
+        parser = _stream_parse(data, chunk_size, threshold)
+        assert len(parser.features) == 1
+        assert parser.features[0].area == 91901
+        assert parser.features[0].geometry is None
+        assert parser.features[0].warnings == expected
+
+
+def test_stream_parser_keeps_geometry_on_request() -> None:
+    parser = _stream_parse(testing_data.get_warnings_for_coords_response_data, 5, keep_geometry=lambda area: area == 91901)
+
+    assert parser.features[0].geometry == testing_data.get_warnings_for_coords_response_data["geometry"]
+
+
+def test_stream_parser_collection() -> None:
+    without_area = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    del without_area["properties"]["location"]
+    data = {"type": "FeatureCollection", "features": [testing_data.get_warnings_for_coords_response_data, without_area, _response_for_area(60101)]}
+
+    for threshold in (0, geosphere.STREAM_THRESHOLD):
+        parser = _stream_parse(data, 13, threshold, collection=True, keep_geometry=lambda area: area == 60101)
+
+        assert [(feature.area, len(feature.warnings), feature.geometry is not None) for feature in parser.features] == [(91901, 7, False), (60101, 7, True)]
+
+
+def test_stream_parser_copies_captured_values_once() -> None:
+    # a geometry spanning many chunks is collected in parts instead of being carried over in the buffer
+    data = _response_for_area(91901)
+    data["geometry"]["coordinates"] = [[[[16.0 + point / 1e5, 48.0] for point in range(20_000)]]]
+    body = json.dumps(data).encode()
+    parser = geosphere._FeatureStreamParser(keep_geometry=lambda _: True)
+    buffered = []
+    with patch.object(geosphere, "STREAM_THRESHOLD", 0):
+        for start in range(0, len(body), 1024):
+            parser.feed(body[start : start + 1024])
+            buffered.append(len(parser._buffer))
+        parser.close()
+
+    assert len(body) > 100 * 1024
+    assert max(buffered) < 2 * 1024
+    assert parser.features[0].geometry == data["geometry"]
+
+
+def test_stream_parser_rejects_incomplete_document() -> None:
+    body = json.dumps(testing_data.get_warnings_for_coords_response_data)
+
+    with pytest.raises(ValueError, match="Incomplete"):
+        _stream_parse(body[:-1], 100)
+    with pytest.raises(ValueError, match="Expecting"):
+        _stream_parse(body[:-1], 100, geosphere.STREAM_THRESHOLD)
+
+
+def test_warning_is_compact_and_frozen() -> None:
+    warning = geosphere._parse_warning(testing_data.get_warnings_for_coords_response_data["properties"]["warnings"][0])
+
+    assert warning.begin_ts == 1750888800
+    assert warning.begin == datetime.datetime.fromisoformat("20250626T00:00+02:00")
+    assert not hasattr(warning, "__dict__")
+    with pytest.raises(AttributeError):
+        warning.level = geosphere.WarningLevel.RED
+
+
+def test_hub_fetches_texts_per_language_once_per_change() -> None:
+    class TranslatingSession(FakeSession):
+        async def get(self, url: str, headers: dict[str, str] | None = None) -> FakeResponse:
+            response = await super().get(url, headers)
+            if "lang=en" in url:
+                data = json.loads(response.content.body)
+                for warning in data["properties"]["warnings"]:
+                    warning["properties"]["text"] = f"translated {warning['properties']['warnid']}"
+                response.content.body = json.dumps(data).encode()
+            return response
+
+    async def run() -> tuple[list[dict], dict[str, int]]:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+        config = geosphere.ClientConfig(location=geosphere.Location(48.25, 16.35), advanced_warning_time=datetime.timedelta(0), language="en")
+        client = geosphere.Client(config, hub)
+        results = [await client.async_get_data(), await client.async_get_data()]
+        session.responses[48.25, 16.35]["properties"]["warnings"][0]["properties"]["chgid"] += 1
+        results.extend([await client.async_get_data(), await _client(hub, 48.25, 16.35).async_get_data()])
+        return results, hub.stats.counters
+
+    session = TranslatingSession(responses={(48.25, 16.35): copy.deepcopy(testing_data.get_warnings_for_coords_response_data)})
+    (first, second, changed, german), counters = asyncio.run(run())
+
+    assert [url.rsplit("=", 1)[1] for url in session.urls] == ["de", "en", "de", "de", "en", "de"]
+    assert (counters["texts.miss"], counters["texts.hit"]) == (2, 1)
+    for data in (first, second, changed):
+        assert len(data["texts"]) == 7
+        for warning in data["warnings"].warnings:
+            assert data["texts"][geosphere.texts_key(warning)].text == f"translated {warning.warnid}"
+            assert data["texts"][geosphere.texts_key(warning)].recommendations == warning.recommendations
+    assert "texts" not in german
+
+
+def test_hub_does_not_refetch_texts_the_translated_feed_lacks() -> None:
+    class LaggingSession(FakeSession):
+        async def get(self, url: str, headers: dict[str, str] | None = None) -> FakeResponse:
+            response = await super().get(url, headers)
+            if "lang=en" in url:
+                data = json.loads(response.content.body)
+                del data["properties"]["warnings"][0]
+                response.content.body = json.dumps(data).encode()
+            return response
+
+    async def run() -> list[dict]:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0))
+        config = geosphere.ClientConfig(location=geosphere.Location(48.25, 16.35), advanced_warning_time=datetime.timedelta(0), language="en")
+        client = geosphere.Client(config, hub)
+        results = [await client.async_get_data(), await client.async_get_data()]
+        with patch.object(geosphere, "TRANSLATION_MISS_TTL", 0.0):
+            results.append(await client.async_get_data())
+        return results
+
+    session = LaggingSession()
+    first, second, expired = asyncio.run(run())
+
+    # the second cycle asks for the warnings only, once the miss expired the texts are requested again
+    assert [url.rsplit("=", 1)[1] for url in session.urls] == ["de", "en", "de", "de", "en"]
+    assert len(first["texts"]) == len(second["texts"]) == len(expired["texts"]) == 6
+
+
+def test_warning_texts_are_shared_between_parses() -> None:
+    first = geosphere._parse_data(copy.deepcopy(testing_data.get_warnings_for_coords_response_data))
+    second = geosphere._parse_data(copy.deepcopy(testing_data.get_warnings_for_coords_response_data))
+
+    assert first == second
+    assert first[0].recommendations is second[0].recommendations
+    assert first[0].effects is second[0].effects
+
+
+def test_text_pool_is_bounded() -> None:
+    pool = geosphere._TextPool(max_size=2)
+    first = pool.intern(json.loads('"ab"'))
+
+    assert pool.intern(json.loads('"ab"')) is first
+    pool.intern("c")
+    pool.intern("d")
+
+    assert len(pool) == 2
+    assert pool.intern(json.loads('"ab"')) is not first
+
+
+def test_text_pool_resolves_text_ids() -> None:
+    pool = geosphere._TextPool(max_size=2)
+    text_id = pool.text_id("ab")
+
+    assert len(text_id) == 2 * geosphere.TEXT_ID_SIZE
+    assert pool.text_id(json.loads('"ab"')) == text_id
+    assert pool.get(text_id) == "ab"
+
+    pool.intern("c")
+    pool.intern("d")
+    assert pool.get(text_id) is None
+
+    warning = geosphere._parse_data(testing_data.get_warnings_for_coords_response_data)[0]
+    assert geosphere.get_text(warning.recommendations_id) is warning.recommendations
+
+
+def _warning_at(level: geosphere.WarningLevel, begin_ts: int, end_ts: int) -> geosphere.GeosphereWarning:
+    return geosphere.GeosphereWarning(type=geosphere.WarningType.STORM, level=level, begin_ts=begin_ts, end_ts=end_ts)
+
+
+def test_warnings_relevance_at_fixed_time() -> None:
+    yellow = _warning_at(geosphere.WarningLevel.YELLOW, 1000, 5000)
+    red = _warning_at(geosphere.WarningLevel.RED, 2000, 3000)
+    orange = _warning_at(geosphere.WarningLevel.ORANGE, 6000, 7000)
+    warnings = geosphere.GeosphereWarnings([orange, red, yellow])
+    advance = datetime.timedelta(seconds=500)
+
+    assert warnings.get_relevant(advance, now=500) == [yellow]
+    assert warnings.get_relevant(advance, now=2500) == [yellow, red]
+    assert warnings.highest_relevant(advance, now=2500) is red
+    assert warnings.get_relevant(advance, now=3500) == [yellow]
+    assert warnings.get_relevant(advance, now=5800) == [orange]
+    assert warnings.get_relevant(advance, now=7001) == []
+    assert warnings.highest_relevant(advance, now=7001) is None
+
+
+def test_warnings_next_boundary() -> None:
+    warnings = geosphere.GeosphereWarnings([_warning_at(geosphere.WarningLevel.YELLOW, 1000, 5000), _warning_at(geosphere.WarningLevel.RED, 2000, 3000)])
+    advance = datetime.timedelta(seconds=500)
+
+    assert warnings.next_boundary(advance, now=0) == 500
+    assert warnings.next_boundary(advance, now=600) == 1500
+    assert warnings.next_boundary(advance, now=2000) > 3000
+    assert warnings.get_relevant(advance, now=3000.5) == [warnings.warnings[0]]
+    assert warnings.next_boundary(advance, now=4000) > 5000
+    assert warnings.next_boundary(advance, now=6000) == math.inf
+
+
+def test_warnings_view() -> None:
+    yellow = _warning_at(geosphere.WarningLevel.YELLOW, 1000, 5000)
+    red = _warning_at(geosphere.WarningLevel.RED, 2000, 3000)
+    heat = geosphere.GeosphereWarning(type=geosphere.WarningType.HEAT, level=geosphere.WarningLevel.ORANGE, begin_ts=2600, end_ts=4000)
+    warnings = geosphere.GeosphereWarnings([yellow, red, heat])
+
+    view = warnings.view(datetime.timedelta(seconds=500), now=2500)
+
+    assert view.level(geosphere.WarningType.STORM) == geosphere.WarningLevel.RED
+    assert view.level(geosphere.WarningType.HEAT) == geosphere.WarningLevel.ORANGE
+    assert view.level(geosphere.WarningType.SNOW) is None
+    assert view.count == 3
+    assert view.highest is red
+    assert view.highest_active is red
+    assert view.next_begin.timestamp() == 2600
+    assert view.next_end.timestamp() == 3000
+    assert view.valid_until == 2600
+
+
+def test_warnings_relevance_is_cached_until_boundary() -> None:
+    warnings = geosphere.GeosphereWarnings([_warning_at(geosphere.WarningLevel.YELLOW, 1000, 5000)])
+    advance = datetime.timedelta(0)
+
+    first = warnings._get_relevance(advance, now=1500)
+
+    assert warnings._get_relevance(advance, now=4999) is first
+    assert warnings._get_relevance(advance, now=5001) is not first
+    assert warnings._get_relevance(advance, now=1200) is not first
+
+
+def test_hub_cache_round_trip() -> None:
+    async def run() -> geosphere.Hub:
+        hub = geosphere.Hub(session, on_update=updates.append)
+        await _client(hub, 48.25, 16.35).async_get_data()
+        return hub
+
+    updates = []
+    session = FakeSession()
+    hub = asyncio.run(run())
+    dumped = json.loads(json.dumps(hub.dump_cache()))
+
+    restored = geosphere.Hub(FakeSession())
+    restored.load_cache(dumped)
+    cached = restored.get_cached(geosphere.Location(48.25, 16.35))
+
+    assert updates == [geosphere.HubUpdate.INDEX, geosphere.HubUpdate.RESULTS]
+    assert cached.warnings == hub.get_cached(geosphere.Location(48.25, 16.35)).warnings
+    assert cached.warnings.warnings[0].recommendations == testing_data.get_warnings_for_coords_response_data["properties"]["warnings"][0]["properties"]["empfehlungen"]
+    assert cached.fetched_at.tzinfo is datetime.UTC
+    assert len(dumped["texts"]) < 3 * len(cached.warnings.warnings)
+    assert restored.get_cached(geosphere.Location(47.07, 15.44)) is None
+
+
+def test_hub_revalidates_loaded_cache() -> None:
+    async def run() -> dict:
+        return await _client(restored, 48.25, 16.35).async_get_data()
+
+    dumped = {
+        "version": geosphere.WARNING_CACHE_VERSION,
+        "saved_at": 0,
+        "snapshot_at": None,
+        "locations": [[48.25, 16.35, 91901]],
+        "results": [[["area", 91901], 0, [[1, 3, 100, 200, 1, 1, 1, 0, None, None]]]],
+        "texts": ["Sturm"],
+    }
+    session = FakeSession()
+    restored = geosphere.Hub(session)
+    restored.load_cache(dumped)
+
+    assert restored.get_cached(geosphere.Location(48.25, 16.35)).warnings.warnings[0].text == "Sturm"
+    assert len(asyncio.run(run())["warnings"].warnings) == 7
+    assert len(session.urls) == 1
+
+
+def test_hub_ignores_cache_of_other_version() -> None:
+    hub = geosphere.Hub(FakeSession())
+    hub.load_cache({"version": geosphere.WARNING_CACHE_VERSION + 1, "locations": [[48.25, 16.35, 91901]]})
+
+    assert hub.get_cached(geosphere.Location(48.25, 16.35)) is None
+
+
+def test_diff_warnings() -> None:
+    old = geosphere.GeosphereWarnings(geosphere._parse_data(testing_data.get_warnings_for_coords_response_data))
+    assert geosphere.diff_warnings(old, old) == []
+
+    data = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    warnings = data["properties"]["warnings"]
+    removed = warnings.pop(0)
+    warnings[0]["properties"]["rawinfo"]["wlevel"] = 3
+    warnings[1]["properties"]["chgid"] += 1
+    added = copy.deepcopy(removed)
+    added["properties"]["verlaufid"] = 99
+    warnings.append(added)
+    new = geosphere.GeosphereWarnings(geosphere._parse_data(data))
+
+    events = geosphere.diff_warnings(old, new)
+
+    assert [(event.change, event.warning.warnid, event.warning.verlaufid) for event in events] == [
+        (geosphere.WarningChange.ESCALATED, 4642, 1),
+        (geosphere.WarningChange.UPDATED, 4643, 2),
+        (geosphere.WarningChange.ADDED, 10, 99),
+        (geosphere.WarningChange.REMOVED, 10, 12),
+    ]
+    assert events[0].previous.level < events[0].warning.level
+
+
+FAST_RETRY_POLICY = geosphere.RetryPolicy(attempts=2, backoff=0.01, backoff_max=0.02, attempt_timeout=1, total_timeout=2, hedge_delay=None, breaker_threshold=2, breaker_cooldown=0.2)
+
+
+@contextlib.asynccontextmanager
+async def _stand_in(handler: web.RequestHandler) -> AsyncIterator[None]:
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    try:
+        with patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{runner.addresses[0][1]}"):
+            yield
+    finally:
+        await runner.cleanup()
+
+
+def test_hub_retries_transient_errors() -> None:
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:  # noqa: RUF029
+        requests.append(request)
+        if len(requests) < 3:
+            return web.Response(status=503)
+        return web.json_response(testing_data.get_warnings_for_coords_response_data)
+
+    async def run() -> dict:
+        async with _stand_in(handler), aiohttp.ClientSession() as session:
+            hub = geosphere.Hub(session, retry_policy=geosphere.RetryPolicy(attempts=3, backoff=0.01, hedge_delay=None))
+            data = await _client(hub, 48.25, 16.35).async_get_data()
+            return data, hub.stats.counters
+
+    data, counters = asyncio.run(run())
+
+    assert len(requests) == 3
+    assert len(data["warnings"].warnings) == 7
+    assert data["stale"] is False
+    assert counters["fetch.retry"] == 2
+    assert counters["error.status"] == 2
+
+
+def test_hub_circuit_breaker_serves_stale_warnings() -> None:
+    requests = []
+    failing = False
+
+    async def handler(request: web.Request) -> web.Response:  # noqa: RUF029
+        requests.append(request)
+        if failing:
+            return web.Response(status=500)
+        return web.json_response(testing_data.get_warnings_for_coords_response_data)
+
+    async def run() -> None:
+        nonlocal failing
+        async with _stand_in(handler), aiohttp.ClientSession() as session:
+            hub = geosphere.Hub(session, max_age=datetime.timedelta(0), retry_policy=FAST_RETRY_POLICY)
+            client = _client(hub, 48.25, 16.35)
+            fresh = await client.async_get_data()
+
+            failing = True
+            stale = [await client.async_get_data() for _ in range(3)]
+            assert len(requests) == 1 + 2 * FAST_RETRY_POLICY.attempts
+            assert all(data["stale"] and data["warnings"] is fresh["warnings"] for data in stale)
+            assert hub.stats.counters["breaker.rejected"] == 1
+
+            failing = False
+            await asyncio.sleep(FAST_RETRY_POLICY.breaker_cooldown)
+            recovered = await client.async_get_data()
+            assert recovered["stale"] is False
+            assert recovered["warnings"] is fresh["warnings"]
+
+    asyncio.run(run())
+
+
+def test_hub_hedges_slow_requests() -> None:
+    requests = []
+    answered = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            # the first request is only answered once the hedge has been
+            await release.wait()
+        answered.append(len(requests))
+        return web.json_response(testing_data.get_warnings_for_coords_response_data)
+
+    async def run() -> tuple[dict, list[int], geosphere.Stats]:
+        async with _stand_in(handler), aiohttp.ClientSession() as session:
+            hub = geosphere.Hub(session, retry_policy=geosphere.RetryPolicy(hedge_delay=0.05))
+            data = await _client(hub, 48.25, 16.35).async_get_data()
+            answered_before = list(answered)
+            release.set()
+            return data, answered_before, hub.stats
+
+    release = asyncio.Event()
+    data, answered_before, stats = asyncio.run(run())
+
+    assert len(data["warnings"].warnings) == 7
+    assert answered_before == [2]
+    assert stats.counters["fetch.hedged"] == 1
+    assert stats.counters["fetch.ok"] == 1
+
+
+def test_hub_queues_requests_beyond_max_concurrency_without_timing_them_out() -> None:
+    # five rounds of two requests take 0.5 s, far beyond the attempt timeout, yet no request is slow itself
+    session = FakeSession(delay=0.1)
+    session.responses = {(47.0 + area / 100, 15.0): _response_for_area(60101 + area) for area in range(10)}
+    locations = list(itertools.starmap(geosphere.Location, session.responses))
+    policy = geosphere.RetryPolicy(attempt_timeout=0.2, total_timeout=0.3, hedge_delay=0.05, breaker_threshold=1)
+    hub = geosphere.Hub(session, max_concurrency=2, retry_policy=policy)
+
+    results = asyncio.run(hub.async_get_warnings_many(locations))
+
+    assert all(warnings is not None for warnings in results.values())
+    assert len(session.urls) == len(locations)
+    assert hub.stats.counters["error.timeout"] == 0
+    assert hub.stats.counters["fetch.hedged"] == 0
+    assert hub.stats.counters["fetch.hedge_skipped"] == len(locations)
+    assert hub.stats.counters["breaker.opened"] == 0
+
+
+def test_hub_jitters_only_client_polls() -> None:
+    # the jitter is recorded instead of slept, bulk requests and texts start right away
+    jitters = []
+
+    def uniform(low: float, high: float) -> float:
+        jitters.append((low, high))
+        return 0.0
+
+    async def run() -> None:
+        hub = geosphere.Hub(session, max_age=datetime.timedelta(0), start_jitter=datetime.timedelta(seconds=2))
+        warnings = (await hub.async_get_warnings_many([geosphere.Location(48.25, 16.35), geosphere.Location(47.07, 15.44)]))[geosphere.Location(48.25, 16.35)]
+        await hub.async_get_texts(geosphere.Location(48.25, 16.35), warnings, "en")
+        await _client(hub, 48.25, 16.35).async_get_data()
+
+    session = FakeSession()
+    session.responses = {(48.25, 16.35): _response_for_area(91901), (47.07, 15.44): _response_for_area(60101)}
+    with patch.object(geosphere.random, "uniform", uniform):
+        asyncio.run(run())
+
+    assert len(session.urls) == 4
+    assert jitters == [(0, 2.0)]
+
+
+def test_hub_get_warnings_many() -> None:
+    session = FakeSession()
+    session.responses = {(48.25, 16.35): _response_for_area(91901), (47.07, 15.44): _response_for_area(60101)}
+    locations = [geosphere.Location(48.25, 16.35), geosphere.Location(47.07, 15.44), geosphere.Location(48.25, 16.35)]
+
+    results = asyncio.run(geosphere.Hub(session).async_get_warnings_many(locations))
+
+    assert len(session.urls) == 2
+    assert list(results) == locations[:2]
+    assert all(len(warnings.warnings) == 7 for warnings in results.values())
+
+
+def test_get_warnings_many_runs_requests_concurrently() -> None:
+    requests = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request)
+        if len(requests) == len(locations):
+            arrived.set()
+        # nothing is answered before all requests are in, which sequential requests would never be
+        await asyncio.wait_for(arrived.wait(), timeout=5)
+        return web.json_response(_response_for_area(len(requests)))
+
+    async def run() -> dict:
+        async with _stand_in(handler):
+            # the blocking wrapper runs its own event loop, so it is called off this one
+            return await asyncio.to_thread(geosphere.get_warnings_many, locations, max_concurrency=len(locations), retry_policy=geosphere.RetryPolicy(attempts=1, hedge_delay=None))
+
+    arrived = asyncio.Event()
+    locations = [geosphere.Location(47 + index / 10, 14.0) for index in range(4)]
+    results = asyncio.run(run())
+
+    assert len(requests) == 4
+    assert list(results) == locations
+    assert all(isinstance(warnings, geosphere.GeosphereWarnings) for warnings in results.values())
+
+
+def test_hub_ingests_pushed_warnings() -> None:
+    async def ingest(request: web.Request) -> web.Response:
+        return web.json_response({"areas": sorted(hub.ingest(await request.json()))})
+
+    async def publish(url: str, data: dict) -> tuple[dict, dict]:
+        async with aiohttp.ClientSession() as publisher, publisher.post(url, json=data) as response:
+            body = await response.json()
+        return body, await client.async_get_data()
+
+    async def run() -> tuple[dict, tuple, tuple, dict]:
+        app = web.Application()
+        app.router.add_post("/ingest", ingest)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/ingest"
+        try:
+            polled = await client.async_get_data()
+            pushed = await publish(url, escalated)
+            collection = await publish(url, {"type": "FeatureCollection", "features": [_response_for_area(60101)]})
+            return polled, pushed, collection, await _client(hub, 48.2566, 16.33).async_get_data()
+        finally:
+            await runner.cleanup()
+
+    session = FakeSession()
+    hub = geosphere.Hub(session, max_age=datetime.timedelta(seconds=1))
+    client = _client(hub, 48.25, 16.35)
+    escalated = _response_for_area(91901)
+    escalated["properties"]["warnings"][0]["properties"]["rawinfo"]["wlevel"] = geosphere.WarningLevel.VIOLET
+    escalated["properties"]["warnings"][0]["properties"]["chgid"] += 1
+    polled, (body, pushed), (collection_body, _), other = asyncio.run(run())
+
+    # pushed warnings are served without another request
+    assert len(session.urls) == 1
+    assert body == {"areas": [91901]}
+    assert collection_body == {"areas": [60101]}
+    assert [event.change for event in geosphere.diff_warnings(polled["warnings"], pushed["warnings"])] == [geosphere.WarningChange.ESCALATED]
+    assert pushed["stale"] is False
+    assert other["warnings"] is pushed["warnings"]
+    assert hub.stats.counters["ingest.areas"] == 2
+
+    snapshot_hub = geosphere.Hub(FakeSession(), snapshot_url=SNAPSHOT_URL)
+    assert snapshot_hub.ingest(escalated) == set()
+
+
+def test_hub_snapshot_keeps_its_age_on_partial_pushes() -> None:
+    async def run() -> tuple[dict, int, float]:
+        await pushed.async_get_data()
+        # the snapshot and every area in it were fetched two minutes ago
+        hub._snapshot.fetched_at -= 120
+        for result in hub._snapshot.areas.values():
+            result.fetched_at -= 120
+        snapshot_at = hub._snapshot.fetched_at
+
+        assert hub.ingest(escalated) == {91901}
+        assert hub._snapshot.fetched_at == snapshot_at
+        data = await pushed.async_get_data()
+        fetches = len(session.urls)
+        await unpushed.async_get_data()
+        return data, fetches, snapshot_at
+
+    shifted = _shifted_response_for_area(91001, 10_000)
+    session = FakeSession(snapshot={"type": "FeatureCollection", "features": [testing_data.get_warnings_for_coords_response_data, shifted]})
+    hub = geosphere.Hub(session, snapshot_url=SNAPSHOT_URL, max_age=datetime.timedelta(minutes=1))
+    pushed = _client(hub, 48.25, 16.35)
+    unpushed = _client(hub, 48.2566, 16.465)
+    escalated = _response_for_area(91901)
+    escalated["properties"]["warnings"][0]["properties"]["rawinfo"]["wlevel"] = geosphere.WarningLevel.VIOLET
+    escalated["properties"]["warnings"][0]["properties"]["chgid"] += 1
+    data, fetches, snapshot_at = asyncio.run(run())
+
+    # the pushed area is served as pushed, the rest of the outdated snapshot is fetched again
+    assert data["warnings"].warnings[0].level == geosphere.WarningLevel.VIOLET
+    assert fetches == 1
+    assert len(session.urls) == 2
+    assert hub._snapshot.fetched_at > snapshot_at
@@ -0,0 +1,44 @@
+import json
+
+from custom_components.geosphere_at_warnings import geosphere, history
+
+
+def test_warning_archive_records_episodes_once() -> None:
+    thunderstorm = geosphere.WarningType.THUNDERSTORM
+    first = geosphere.GeosphereWarning(thunderstorm, geosphere.WarningLevel.ORANGE, begin_ts=1000, end_ts=5000, warnid=1, chgid=10, verlaufid=1)
+    storm = geosphere.GeosphereWarning(geosphere.WarningType.STORM, geosphere.WarningLevel.RED, begin_ts=2000, end_ts=3000, warnid=2, chgid=20, verlaufid=1)
+    escalated = geosphere.GeosphereWarning(thunderstorm, geosphere.WarningLevel.RED, begin_ts=1000, end_ts=6000, warnid=1, chgid=11, verlaufid=1)
+    archive = history.WarningArchive()
+
+    warnings = geosphere.GeosphereWarnings([first, storm])
+    assert archive.record("home", warnings, area=91901, seen_at=900) == 2
+    assert archive.record("home", warnings, seen_at=950) == 0
+    assert archive.record("home", geosphere.GeosphereWarnings([first, storm]), seen_at=960) == 0
+    assert archive.record("home", geosphere.GeosphereWarnings([escalated, storm]), area=91901, seen_at=1100) == 1
+    assert archive.record("cabin", geosphere.GeosphereWarnings([first]), seen_at=900) == 1
+    assert len(archive) == 4
+
+    (episode,) = archive.query("home", types=[thunderstorm], min_level=geosphere.WarningLevel.RED)
+    assert episode.level == geosphere.WarningLevel.RED
+    assert episode.chgids == (10, 11)
+    assert (episode.first_seen, episode.last_changed, episode.area) == (900, 1100, 91901)
+    assert [x.warnid for x in archive.query("home")] == [1, 2]
+    assert [x.site for x in archive.query(types=[thunderstorm])] == ["home", "cabin"]
+    assert archive.query("elsewhere") == []
+
+
+def test_warning_archive_range_query_and_round_trip() -> None:
+    archive = history.WarningArchive()
+    for index in range(1000):
+        begin = index * 3600
+        warning = geosphere.GeosphereWarning(geosphere.WarningType.RAIN, geosphere.WarningLevel(index % 3 + 1), begin_ts=begin, end_ts=begin + 7200, warnid=index, chgid=index)
+        archive.record("home", geosphere.GeosphereWarnings([warning]))
+    archive.record("home", geosphere.GeosphereWarnings([geosphere.GeosphereWarning(geosphere.WarningType.RAIN, geosphere.WarningLevel.RED, begin_ts=0, end_ts=86400 * 100, warnid=5000)]))
+
+    assert [x.warnid for x in archive.query("home", start=36000, end=43200)] == [5000, 9, 10, 11]
+    assert [x.warnid for x in archive.query("home", start=36000, end=43200, min_level=geosphere.WarningLevel.RED)] == [5000, 11]
+
+    restored = history.WarningArchive.from_dict(json.loads(json.dumps(archive.as_dict())))
+    assert len(restored) == len(archive)
+    assert restored.query("home", start=36000, end=43200) == archive.query("home", start=36000, end=43200)
+    assert restored.record("home", geosphere.GeosphereWarnings([geosphere.GeosphereWarning(geosphere.WarningType.RAIN, geosphere.WarningLevel.YELLOW, begin_ts=0, end_ts=7200, warnid=0, chgid=0)])) == 0
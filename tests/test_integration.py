@@ -0,0 +1,412 @@
+import asyncio
+import contextlib
+import copy
+import datetime
+import functools
+import itertools
+import math
+import time
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch
+
+import aiohttp
+import testing_data
+from aiohttp import web
+from homeassistant import bootstrap, config_entries, data_entry_flow, loader
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant
+from homeassistant.helpers import entity_registry
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from custom_components.geosphere_at_warnings import const, coordinator, geosphere
+
+HOME = {const.CONF_LATITUDE: 48.25, const.CONF_LONGITUDE: 16.35}
+OFFICE = {const.CONF_LATITUDE: 47.07, const.CONF_LONGITUDE: 15.44}
+
+
+@contextlib.asynccontextmanager
+async def _hass(config_dir: Path) -> AsyncIterator[HomeAssistant]:
+    hass = HomeAssistant(str(config_dir))
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    await hass.async_start()
+    try:
+        yield hass
+    finally:
+        await hass.async_stop(force=True)
+
+
+def _warnings(level: geosphere.WarningLevel = geosphere.WarningLevel.YELLOW, hours: float = 3) -> geosphere.GeosphereWarnings:
+    now_ = datetime.datetime.now(tz=datetime.UTC)
+    return geosphere.GeosphereWarnings([geosphere.GeosphereWarning(type=geosphere.WarningType.HEAT, level=level, begin=now_ - datetime.timedelta(hours=1), end=now_ + datetime.timedelta(hours=hours))])
+
+
+def _serve(data_for: Callable[[geosphere.Location], geosphere.GeosphereWarnings]) -> contextlib.AbstractContextManager:
+    # stands in for upstream at the client, an exception raised by data_for fails that location
+    async def async_get_data(client: geosphere.Client) -> dict:  # noqa: RUF029
+        return {"warnings": data_for(client.config.location), "stale": False}
+
+    return patch.object(geosphere.Client, "async_get_data", async_get_data)
+
+
+def _coordinator(hass: HomeAssistant, places: dict[str, dict], **kwargs: datetime.timedelta) -> coordinator.GeosphereAtWarningsDataUpdateCoordinator:
+    hub = geosphere.Hub()
+    clients = {location_id: geosphere.Client(geosphere.ClientConfig(location=geosphere.Location(place[const.CONF_LATITUDE], place[const.CONF_LONGITUDE]), advanced_warning_time=datetime.timedelta(0)), hub) for location_id, place in places.items()}
+    return coordinator.GeosphereAtWarningsDataUpdateCoordinator(hass, hub, clients, **kwargs)
+
+
+def _record_timers(scheduled: list[tuple[Callable[[datetime.datetime], None], datetime.datetime]]) -> contextlib.AbstractContextManager:
+    # the coordinator's timers are still scheduled, the recording tells when and lets tests fire them early
+    def track(hass: HomeAssistant, action: Callable[[datetime.datetime], None], point: datetime.datetime) -> CALLBACK_TYPE:
+        scheduled.append((action, point))
+        return async_track_point_in_utc_time(hass, action, point)
+
+    return patch.object(coordinator, "async_track_point_in_utc_time", track)
+
+
+@contextlib.asynccontextmanager
+async def _upstream(requests: list[web.Request], responses: dict[str, dict] | None = None) -> AsyncIterator[None]:
+    # a local getWarningsForCoords for the hub's own session, recording the requests it answered;
+    # responses by language, the recorded response for all others
+    async def handler(request: web.Request) -> web.Response:  # noqa: RUF029
+        requests.append(request)
+        return web.json_response((responses or {}).get(request.query["lang"], testing_data.get_warnings_for_coords_response_data))
+
+    app = web.Application()
+    app.router.add_get("/getWarningsForCoords", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    try:
+        with patch.object(geosphere, "BASE_URL", f"http://127.0.0.1:{runner.addresses[0][1]}"):
+            yield
+    finally:
+        await runner.cleanup()
+
+
+def _entry(version: int, data: dict) -> config_entries.ConfigEntry:
+    return config_entries.ConfigEntry(
+        data=data,
+        discovery_keys=MappingProxyType({}),
+        domain=const.DOMAIN,
+        minor_version=1,
+        options={},
+        source=config_entries.SOURCE_USER,
+        subentries_data=None,
+        title="Home",
+        unique_id=None,
+        version=version,
+    )
+
+
+def test_migrate_entry_keeps_entry_id_as_location_id(tmp_path: Path) -> None:
+    async def run() -> tuple[config_entries.ConfigEntry, str | None]:
+        async with _hass(tmp_path) as hass:
+            entry = _entry(1, {const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 30})
+            # the unique id version 1 entities were registered with
+            entity_registry.async_get(hass).async_get_or_create("binary_sensor", const.DOMAIN, entry.entry_id, suggested_object_id="home")
+            with _serve(lambda _: _warnings()):
+                await hass.config_entries.async_add(entry)
+                await hass.async_block_till_done()
+                return entry, hass.states.get("binary_sensor.home").state
+
+    entry, state = asyncio.run(run())
+
+    assert entry.version == 2
+    assert entry.state is config_entries.ConfigEntryState.LOADED
+    assert dict(entry.data) == {
+        const.CONF_LOCATIONS: [{const.CONF_LOCATION_ID: entry.entry_id, const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 30}],
+    }
+    assert state == "on"
+
+
+def test_config_flow_adds_locations_until_add_another_is_unchecked(tmp_path: Path) -> None:
+    async def run() -> list[data_entry_flow.FlowResult]:
+        async with _hass(tmp_path) as hass:
+            flow = hass.config_entries.flow
+            started = await flow.async_init(const.DOMAIN, context={"source": config_entries.SOURCE_USER})
+            with _serve(lambda _: _warnings()):
+                another = await flow.async_configure(started["flow_id"], {const.CONF_NAME: "Home", "location": HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 30, const.CONF_ADD_ANOTHER: True})
+                created = await flow.async_configure(started["flow_id"], {const.CONF_NAME: "Office", "location": OFFICE, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0, const.CONF_ADD_ANOTHER: False})
+                await hass.async_block_till_done()
+            return [started, another, created]
+
+    started, another, created = asyncio.run(run())
+
+    assert (started["type"], started["step_id"]) == (data_entry_flow.FlowResultType.FORM, "user")
+    assert (another["type"], another["step_id"]) == (data_entry_flow.FlowResultType.FORM, "location")
+    assert created["type"] is data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert created["title"] == "Home"
+    locations = created["data"][const.CONF_LOCATIONS]
+    assert [(location[const.CONF_NAME], location[const.CONF_LATITUDE], location[const.CONF_ADVANCED_WARNING_TIME_MINUTES]) for location in locations] == [("Home", 48.25, 30), ("Office", 47.07, 0)]
+    assert locations[0][const.CONF_LOCATION_ID] != locations[1][const.CONF_LOCATION_ID]
+    assert created["result"].state is config_entries.ConfigEntryState.LOADED
+
+
+def test_update_keeps_previous_data_of_failing_location(tmp_path: Path) -> None:
+    failing: set[float] = set()
+    fetched = {}
+
+    def data_for(location: geosphere.Location) -> geosphere.GeosphereWarnings:
+        if location.latitude in failing:
+            raise aiohttp.ClientError
+        fetched[location.latitude] = _warnings()
+        return fetched[location.latitude]
+
+    async def run() -> None:
+        async with _hass(tmp_path) as hass:
+            coordinator_ = _coordinator(hass, {"home": HOME, "office": OFFICE})
+            with _serve(data_for):
+                # a location that never loaded has nothing to fall back on and stays out until it does
+                failing.add(OFFICE[const.CONF_LATITUDE])
+                await coordinator_.async_refresh()
+                assert list(coordinator_.data) == ["home"]
+
+                failing.clear()
+                await coordinator_.async_refresh()
+                first = coordinator_.data
+
+                failing.add(OFFICE[const.CONF_LATITUDE])
+                await coordinator_.async_refresh()
+                assert coordinator_.last_update_success
+                assert coordinator_.data["home"]["warnings"] is fetched[HOME[const.CONF_LATITUDE]]
+                assert coordinator_.data["home"]["warnings"] is not first["home"]["warnings"]
+                assert coordinator_.data["office"] == {**first["office"], "stale": True}
+                assert coordinator_.stats.counters["update.failed.ClientError"] == 2
+            await coordinator_.async_shutdown()
+
+    asyncio.run(run())
+
+
+def test_poll_interval_doubles_until_a_change_or_an_imminent_boundary(tmp_path: Path) -> None:
+    unchanged = _warnings(hours=5)
+    changed = _warnings(geosphere.WarningLevel.ORANGE, hours=5)
+    # ends within IMMINENT_WINDOW
+    imminent = _warnings(hours=0.5)
+    responses = [unchanged] * 5 + [changed] * 2 + [imminent] * 3
+
+    async def run() -> list[float]:
+        intervals = []
+        async with _hass(tmp_path) as hass:
+            coordinator_ = _coordinator(hass, {"home": HOME}, min_poll_interval=datetime.timedelta(seconds=60), max_poll_interval=datetime.timedelta(seconds=300))
+            with _serve(lambda _: responses[len(intervals)]):
+                for _ in responses:
+                    await coordinator_.async_refresh()
+                    intervals.append(coordinator_.update_interval.total_seconds())
+            await coordinator_.async_shutdown()
+        return intervals
+
+    assert asyncio.run(run()) == [60, 120, 240, 300, 300, 60, 120, 60, 60, 60]
+
+
+def test_partial_failure_flags_the_location_stale_and_polls_at_the_minimum(tmp_path: Path) -> None:
+    unchanged = _warnings(hours=5)
+    failing: set[float] = set()
+
+    def data_for(location: geosphere.Location) -> geosphere.GeosphereWarnings:
+        if location.latitude in failing:
+            raise aiohttp.ClientError
+        return unchanged
+
+    async def run() -> list[tuple[float, bool, bool]]:
+        cycles = []
+        async with _hass(tmp_path) as hass:
+            coordinator_ = _coordinator(hass, {"home": HOME, "office": OFFICE}, min_poll_interval=datetime.timedelta(seconds=60), max_poll_interval=datetime.timedelta(seconds=300))
+            with _serve(data_for):
+                for office_fails in (False, False, True, True, False, False):
+                    failing.clear()
+                    if office_fails:
+                        failing.add(OFFICE[const.CONF_LATITUDE])
+                    await coordinator_.async_refresh()
+                    cycles.append((coordinator_.update_interval.total_seconds(), coordinator_.is_location_stale("home"), coordinator_.is_location_stale("office")))
+            await coordinator_.async_shutdown()
+        return cycles
+
+    # while the office keeps failing it is flagged stale and polled at the minimum, then backs off again
+    assert asyncio.run(run()) == [(60, False, False), (120, False, False), (60, False, True), (60, False, True), (60, False, False), (120, False, False)]
+
+
+def test_boundary_timer_fires_at_valid_until(tmp_path: Path) -> None:
+    # a warning beginning in a second, the view turns on when the timer fires without another fetch
+    begin = math.ceil(time.time()) + 1
+    warning = geosphere.GeosphereWarning(type=geosphere.WarningType.HEAT, level=geosphere.WarningLevel.YELLOW, begin=dt_util.utc_from_timestamp(begin), end=dt_util.utc_from_timestamp(begin + 3600))
+    scheduled = []
+
+    async def run() -> tuple[geosphere.LocationView, geosphere.LocationView, float, coordinator.GeosphereAtWarningsDataUpdateCoordinator]:
+        async with _hass(tmp_path) as hass:
+            coordinator_ = _coordinator(hass, {"home": HOME})
+            notified = asyncio.Event()
+            with _serve(lambda _: geosphere.GeosphereWarnings([warning])), _record_timers(scheduled):
+                await coordinator_.async_refresh()
+                before = coordinator_.views["home"]
+                coordinator_.async_add_listener(notified.set)
+                await asyncio.wait_for(notified.wait(), timeout=10)
+                fired_at = time.time()
+            await coordinator_.async_shutdown()
+        return before, coordinator_.views["home"], fired_at, coordinator_
+
+    before, after, fired_at, coordinator_ = asyncio.run(run())
+
+    assert before.highest_active is None
+    assert before.valid_until == begin
+    assert scheduled[0][1] == dt_util.utc_from_timestamp(begin)
+    assert fired_at >= begin
+    assert after.highest_active == warning
+    assert coordinator_.stats.counters["boundary"] == 1
+    assert coordinator_.stats.counters["update.changed"] == 1
+
+
+def test_location_turns_stale_after_stale_after(tmp_path: Path) -> None:
+    scheduled = []
+    notified = []
+
+    async def run() -> tuple[datetime.datetime, bool, datetime.datetime]:
+        async with _hass(tmp_path) as hass:
+            coordinator_ = _coordinator(hass, {"home": HOME}, max_poll_interval=datetime.timedelta(seconds=300))
+            with _serve(lambda _: geosphere.GeosphereWarnings([])), _record_timers(scheduled):
+                await coordinator_.async_refresh()
+                stale_at = coordinator_.last_success + coordinator_.stale_after
+                fresh = coordinator_.is_location_stale("home")
+                coordinator_.async_add_listener(lambda: notified.append(coordinator_.is_location_stale("home")))
+                with patch.object(dt_util, "utcnow", return_value=stale_at + datetime.timedelta(seconds=1)):
+                    action, point = scheduled[-1]
+                    action(point)
+            await coordinator_.async_shutdown()
+        return stale_at, fresh, point
+
+    stale_at, fresh, point = asyncio.run(run())
+
+    # without warnings the only boundary is the stale one, two maximum poll intervals after the last success
+    assert len(scheduled) == 1
+    assert point == stale_at
+    assert fresh is False
+    assert notified == [True]
+
+
+def test_binary_sensors_of_one_coordinator_fetch_once_per_cycle(tmp_path: Path) -> None:
+    requests = []
+    locations = [{const.CONF_LOCATION_ID: f"site{index}", const.CONF_NAME: f"Site {index}", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0} for index in range(20)]
+
+    def warning_requests() -> int:
+        return sum(request.query["lang"] == geosphere.DEFAULT_LANGUAGE for request in requests)
+
+    async def run() -> tuple[list[str], list[int]]:
+        fetches = []
+        async with _hass(tmp_path) as hass, _upstream(requests):
+            entry = _entry(2, {const.CONF_LOCATIONS: locations})
+            # every refresh is a cycle of its own, not served from the hub's cache
+            with patch.object(const, "FETCH_MAX_AGE", datetime.timedelta(0)), patch.object(const, "FETCH_START_JITTER", datetime.timedelta(0)):
+                await hass.config_entries.async_add(entry)
+                await hass.async_block_till_done(wait_background_tasks=True)
+            fetches.append(warning_requests())
+            coordinator_ = hass.data[const.DOMAIN][entry.entry_id]
+            for _ in range(2):
+                await coordinator_.async_refresh()
+                fetches.append(warning_requests())
+            return [hass.states.get(f"binary_sensor.site_{index}").state for index in range(len(locations))], fetches
+
+    states, fetches = asyncio.run(run())
+
+    # the recorded warnings lie in the past, so every sensor is available and off
+    assert states == ["off"] * len(locations)
+    assert fetches == [1, 2, 3]
+    # the unchanged warnings are translated into the instance language once
+    assert len(requests) - warning_requests() == 1
+
+
+def test_diagnostic_sensor_is_written_after_an_unchanged_refresh(tmp_path: Path) -> None:
+    async def run() -> tuple[str, str, int]:
+        async with _hass(tmp_path) as hass, _upstream([]):
+            entry = _entry(2, {const.CONF_LOCATIONS: [{const.CONF_LOCATION_ID: "home", const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0}]})
+            # diagnostic sensors are disabled by default
+            entity_registry.async_get(hass).async_get_or_create("sensor", const.DOMAIN, f"{entry.entry_id}_update_duration", suggested_object_id="update_duration")
+            with patch.object(const, "FETCH_MAX_AGE", datetime.timedelta(0)), patch.object(const, "FETCH_START_JITTER", datetime.timedelta(0)):
+                await hass.config_entries.async_add(entry)
+                await hass.async_block_till_done(wait_background_tasks=True)
+            before = hass.states.get("sensor.update_duration").state
+            coordinator_ = hass.data[const.DOMAIN][entry.entry_id]
+            # a clock a second further on every reading makes the refresh take seconds
+            with patch.object(coordinator, "time", SimpleNamespace(perf_counter=functools.partial(next, itertools.count()))):
+                await coordinator_.async_refresh()
+            return before, hass.states.get("sensor.update_duration").state, coordinator_.stats.counters["update.unchanged"]
+
+    before, after, unchanged = asyncio.run(run())
+
+    assert unchanged == 1
+    assert float(after) > float(before)
+
+
+def test_reload_keeps_one_close_listener_and_closes_the_hub(tmp_path: Path) -> None:
+    requests = []
+
+    async def run() -> tuple[list[int], list[geosphere.Hub]]:
+        listeners = []
+        hubs = []
+        async with _hass(tmp_path) as hass, _upstream(requests):
+            entry = _entry(2, {const.CONF_LOCATIONS: [{const.CONF_LOCATION_ID: "home", const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0}]})
+            listeners.append(hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_CLOSE, 0))
+            await hass.config_entries.async_add(entry)
+            for _ in range(3):
+                await hass.async_block_till_done()
+                listeners.append(hass.bus.async_listeners()[EVENT_HOMEASSISTANT_CLOSE])
+                hubs.append(await hass.data[const.DOMAIN_DATA])
+                await hass.config_entries.async_reload(entry.entry_id)
+            await hass.config_entries.async_unload(entry.entry_id)
+            listeners.append(hass.bus.async_listeners().get(EVENT_HOMEASSISTANT_CLOSE, 0))
+        return listeners, hubs
+
+    listeners, hubs = asyncio.run(run())
+
+    assert listeners == [listeners[0], listeners[0] + 1, listeners[0] + 1, listeners[0] + 1, listeners[0]]
+    assert len(set(map(id, hubs))) == len(hubs)
+    assert all(hub.session is None for hub in hubs)
+
+
+def test_nearby_warnings_fetch_unknown_points_and_report_incomplete_coverage(tmp_path: Path) -> None:
+    requests = []
+    call = {const.ATTR_RADIUS: 10, const.ATTR_POINTS: [HOME, OFFICE]}
+
+    async def run() -> tuple[dict, list[int]]:
+        fetches = []
+        async with _hass(tmp_path) as hass, _upstream(requests):
+            with patch.object(const, "FETCH_START_JITTER", datetime.timedelta(0)):
+                await hass.config_entries.async_add(_entry(2, {const.CONF_LOCATIONS: [{const.CONF_LOCATION_ID: "home", const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0}]}))
+                await hass.async_block_till_done(wait_background_tasks=True)
+            fetches.append(len(requests))
+            for _ in range(2):
+                response = await hass.services.async_call(const.DOMAIN, const.SERVICE_GET_NEARBY_WARNINGS, call, blocking=True, return_response=True)
+                fetches.append(len(requests))
+        return response, fetches
+
+    response, fetches = asyncio.run(run())
+
+    # the configured location's municipality is known, the other point's is fetched by the first call only
+    assert fetches == [fetches[0], fetches[0] + 1, fetches[0] + 1]
+    assert response["complete"] is False
+    assert [(location["latitude"], location["longitude"]) for location in response["locations"]] == [(48.25, 16.35), (47.07, 15.44)]
+
+
+def test_get_texts_resolves_translated_texts_after_they_left_the_pool(tmp_path: Path) -> None:
+    english = copy.deepcopy(testing_data.get_warnings_for_coords_response_data)
+    english["properties"]["warnings"][0]["properties"]["text"] = "Severe heat stress is expected."
+
+    async def run() -> tuple[str, dict]:
+        async with _hass(tmp_path) as hass, _upstream([], {"en": english}):
+            entry = _entry(2, {const.CONF_LOCATIONS: [{const.CONF_LOCATION_ID: "home", const.CONF_NAME: "Home", **HOME, const.CONF_ADVANCED_WARNING_TIME_MINUTES: 0}]})
+            with patch.object(const, "FETCH_START_JITTER", datetime.timedelta(0)):
+                await hass.config_entries.async_add(entry)
+                await hass.async_block_till_done(wait_background_tasks=True)
+            coordinator_ = hass.data[const.DOMAIN][entry.entry_id]
+            text_id = coordinator_.texts("home", coordinator_.data["home"]["warnings"].warnings[0]).text_id
+            # an empty pool stands in for one the ids were evicted from
+            with patch.object(geosphere, "_TEXT_POOL", geosphere._TextPool()):
+                response = await hass.services.async_call(const.DOMAIN, const.SERVICE_GET_TEXTS, {const.ATTR_TEXT_IDS: [text_id]}, blocking=True, return_response=True)
+        return text_id, response
+
+    text_id, response = asyncio.run(run())
+
+    assert response == {"texts": {text_id: "Severe heat stress is expected."}}